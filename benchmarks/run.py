@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# Benchmarks of the analysis and plotting functions of Performance Explorer on synthetic datasets (see synthetic.py).
+# The results are written as a json baseline, and can be compared with a previous baseline:
+#   python3 benchmarks/run.py --sizes 1e3 1e4 1e5 --output benchmarks/baselines/before.json
+#   python3 benchmarks/run.py --sizes 1e3 1e4 1e5 --compare benchmarks/baselines/before.json
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic import *
+from datasets import parse_contents
+from schema import normalize_schema
+from segmentation import gen_seg_list
+from best_perf import find_best, statistics_best_perf_in_each_segment
+from segment_statistics import log_anslysis, statistics_in_each_segment
+from speedup_versus import PlotConfig, gen_plot_speedup
+from perf_plot import gen_plot_performance
+
+DEFAULT_SIZES = ['1e3', '1e4', '1e5', '1e6', '1e7']
+
+# segmentation of the statistics benchmarks.
+SEGMENT_CONF = 'log:1e2:1e8:7'
+
+
+# Inputs of the benchmarks of one dataset size, and the outputs shared by the benchmarks (e.g. the figures to serialize).
+class BenchmarkCase:
+    def __init__(self, df, strategies: [str]):
+        self.df = df
+        self.strategies = strategies
+        self.segments = gen_seg_list(df, X_COLUMN, Y_COLUMN, SEGMENT_CONF)
+        self.config = PlotConfig('rgba(0,100,80, 0.75)', '#000000', 18, 'NNZ', 'FLOPS', True, 'Algorithms', 1200, 600)
+        self.contents = None
+        self.figures = {}
+
+
+def bench_parse_contents(case: BenchmarkCase):
+    parse_contents(case.contents, 'synthetic.csv', None)
+
+def bench_find_best(case: BenchmarkCase):
+    # the statistics before the segmented engine: one find_best per segment.
+    for i in range(len(case.segments) - 1):
+        find_best(case.df, X_COLUMN, Y_COLUMN, MTX_COLUMN, STRATEGY_COLUMN, case.strategies, DROP_COLUMN, case.segments[i], case.segments[i + 1])
+
+def bench_statistics_best_perf(case: BenchmarkCase):
+    statistics_best_perf_in_each_segment(case.df, X_COLUMN, Y_COLUMN, MTX_COLUMN, STRATEGY_COLUMN, case.strategies, case.segments, DROP_COLUMN)
+
+def bench_log_anslysis(case: BenchmarkCase):
+    # the statistics before the segmented engine: one merge and analysis per segment.
+    for i in range(len(case.segments) - 1):
+        log_anslysis(case.df, case.strategies[0], case.strategies[1], X_COLUMN, Y_COLUMN, MTX_COLUMN, STRATEGY_COLUMN, DROP_COLUMN, case.segments[i], case.segments[i + 1])
+
+def bench_statistics_speedup(case: BenchmarkCase):
+    statistics_in_each_segment(case.df, case.strategies[0], case.strategies[1], X_COLUMN, Y_COLUMN, MTX_COLUMN, STRATEGY_COLUMN, case.segments, DROP_COLUMN)
+
+def bench_gen_plot_speedup(case: BenchmarkCase):
+    case.figures['speedup'] = gen_plot_speedup(case.df, case.strategies[0], case.strategies[1], MTX_COLUMN, X_COLUMN, Y_COLUMN, STRATEGY_COLUMN, DROP_COLUMN, case.config)
+
+def bench_gen_plot_performance(case: BenchmarkCase):
+    case.figures['perf'] = gen_plot_performance(case.df, MTX_COLUMN, STRATEGY_COLUMN, X_COLUMN, Y_COLUMN, case.strategies, DROP_COLUMN, case.config)
+
+def bench_serialize_speedup(case: BenchmarkCase):
+    return dict(payload_bytes=len(case.figures['speedup'].to_json()))
+
+def bench_serialize_performance(case: BenchmarkCase):
+    return dict(payload_bytes=len(case.figures['perf'].to_json()))
+
+
+# benchmarks in running order: the serialization benchmarks use the figures of the plot benchmarks.
+BENCHMARKS = {
+    'parse_contents': bench_parse_contents,
+    'find_best': bench_find_best,
+    'statistics_best_perf_in_each_segment': bench_statistics_best_perf,
+    'log_anslysis': bench_log_anslysis,
+    'statistics_in_each_segment': bench_statistics_speedup,
+    'gen_plot_speedup': bench_gen_plot_speedup,
+    'gen_plot_performance': bench_gen_plot_performance,
+    'serialize_speedup_figure': bench_serialize_speedup,
+    'serialize_performance_figure': bench_serialize_performance,
+}
+
+# the figure (and the benchmark building it) serialized by a benchmark.
+SERIALIZED_FIGURES = {
+    'serialize_speedup_figure': ('speedup', 'gen_plot_speedup'),
+    'serialize_performance_figure': ('perf', 'gen_plot_performance'),
+}
+
+
+# run a benchmark `repeat` times, and return the timings (in seconds) and the values it reports.
+def time_benchmark(bench, case: BenchmarkCase, repeat: int):
+    timings = []
+    values = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        values = bench(case) or {}
+        timings.append(time.perf_counter() - start)
+    return timings, values
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return dict(date=datetime.datetime.now().isoformat(timespec='seconds'), commit=commit, python=platform.python_version(),
+        platform=platform.platform(), processor=platform.processor(), cpu_count=os.cpu_count(),
+        numpy=np.__version__, pandas=pd.__version__, plotly=plotly.__version__)
+
+
+def run(sizes: [int], benchmarks: [str], strategies: int, repetitions: int, failure_rate: float, repeat: int, seed: int):
+    results = []
+    for size in sizes:
+        raw = gen_spmv_results(size, strategies, repetitions, failure_rate, seed)
+        df, _ = normalize_schema(raw)
+        case = BenchmarkCase(df, strategy_names(strategies))
+        if 'parse_contents' in benchmarks:
+            case.contents = to_upload_contents(raw)
+        del raw
+        for name in benchmarks:
+            if name in SERIALIZED_FIGURES and SERIALIZED_FIGURES[name][0] not in case.figures:
+                BENCHMARKS[SERIALIZED_FIGURES[name][1]](case)
+            # the case is large and is generated once: a benchmark runs once on the largest sizes.
+            timings, values = time_benchmark(BENCHMARKS[name], case, repeat if len(df) <= 1e6 else 1)
+            results.append(dict(benchmark=name, size=len(df), seconds=min(timings), median_seconds=statistics.median(timings),
+                runs=len(timings), **values))
+            print('{:>10} {:<40} {:>10.4f} s'.format(len(df), name, min(timings)), flush=True)
+    return results
+
+
+# print the ratio of the current timings over the baseline, and return the regressions above the tolerance.
+def compare(results: [dict], baseline: dict, tolerance: float):
+    base = {(r['benchmark'], r['size']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    print('{:>10} {:<40} {:>10} {:>10} {:>7}'.format('size', 'benchmark', 'baseline', 'current', 'ratio'))
+    for r in results:
+        base_seconds = base.get((r['benchmark'], r['size']))
+        if base_seconds is None:
+            continue
+        ratio = r['seconds'] / base_seconds if base_seconds > 0 else float('inf')
+        flag = ' <- regression' if ratio > tolerance else ''
+        print('{:>10} {:<40} {:>10.4f} {:>10.4f} {:>7.2f}{}'.format(r['size'], r['benchmark'], base_seconds, r['seconds'], ratio, flag))
+        if ratio > tolerance:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Performance Explorer on synthetic SpMV results.')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='numbers of records, e.g. 1e3 1e5')
+    parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument('--strategies', type=int, default=4)
+    parser.add_argument('--repetitions', type=int, default=1, help='repeated records of each (matrix, strategy)')
+    parser.add_argument('--failure-rate', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each benchmark (the fastest is kept), 1 for sizes above 1e6')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='json file of the results (default: benchmarks/baselines/<date>.json)')
+    parser.add_argument('--compare', default=None, help='json file of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=1.2, help='ratio over the baseline reported as a regression')
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(s)) for s in args.sizes]
+    results = run(sizes, args.benchmarks, args.strategies, args.repetitions, args.failure_rate, args.repeat, args.seed)
+    report = dict(environment=environment_info(), config=dict(strategies=args.strategies, repetitions=args.repetitions,
+        failure_rate=args.failure_rate, repeat=args.repeat, seed=args.seed, segments=SEGMENT_CONF), results=results)
+
+    output = args.output
+    if output is None:
+        output = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('results written to', output)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# Cold start of Performance Explorer: the time of importing the app (main.py) in a new interpreter, as a worker process does,
+# with its import-time breakdown by package (from `python -X importtime`), and the time of loading the analysis modules
+# on the first analysis (they are imported lazily by the callbacks).
+#   python3 benchmarks/startup.py
+#   python3 benchmarks/startup.py --repeat 10 --top 20 --output benchmarks/baselines/startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# the modules imported by the first analysis and the first upload (see the callbacks of main.py).
+ANALYSIS_MODULES = ['backends', 'datasets', 'speedup_versus', 'perf_plot', 'pairwise_speedup', 'segment_statistics', 'best_perf', 'chunked_upload']
+
+# heavy packages which must not be imported by the app at startup.
+LAZY_PACKAGES = ['pandas', 'numpy', 'pyarrow', 'plotly.express', 'kaleido', 'duckdb']
+
+_TIMING_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import main
+app_seconds = time.perf_counter() - start
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+analysis_seconds = time.perf_counter() - start
+print(json.dumps(dict(app_seconds=app_seconds, analysis_seconds=analysis_seconds)))
+'''
+
+_LOADED_SCRIPT = '''
+import json, sys
+import main
+print(json.dumps([name for name in {packages!r} if name in sys.modules]))
+'''
+
+
+def run_python(args: [str]):
+    return subprocess.run([sys.executable] + args, capture_output=True, text=True, cwd=SRC_DIR, check=True)
+
+
+# the wall time (in seconds) of importing the app and of loading the analysis modules after it, in a new interpreter.
+def time_startup():
+    result = run_python(['-c', _TIMING_SCRIPT.format(modules=ANALYSIS_MODULES)])
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+# the import time (in seconds) of each top-level package imported by the app, from the `-X importtime` report.
+# The self time of the modules is summed by package, thus the packages add up to the total import time.
+def import_time_breakdown():
+    result = run_python(['-X', 'importtime', '-c', 'import main'])
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1e6
+    return sorted(packages.items(), key=lambda p: p[1], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the cold start of Performance Explorer.')
+    parser.add_argument('--repeat', type=int, default=5, help='new interpreters started (the median is reported)')
+    parser.add_argument('--top', type=int, default=15, help='packages listed in the import-time breakdown')
+    parser.add_argument('--output', default=None, help='json file of the results')
+    args = parser.parse_args(argv)
+
+    timings = [time_startup() for _ in range(args.repeat)]
+    app_seconds = statistics.median(t['app_seconds'] for t in timings)
+    analysis_seconds = statistics.median(t['analysis_seconds'] for t in timings)
+    breakdown = import_time_breakdown()
+    loaded = json.loads(run_python(['-c', _LOADED_SCRIPT.format(packages=LAZY_PACKAGES)]).stdout.splitlines()[-1])
+
+    print('{:<40} {:>10.4f} s'.format('import main (app and layout)', app_seconds))
+    print('{:<40} {:>10.4f} s'.format('first analysis (lazy imports)', analysis_seconds))
+    print('heavy packages imported at startup: {}'.format(', '.join(loaded) or 'none'))
+    print('import time by package (-X importtime, self time):')
+    for package, seconds in breakdown[:args.top]:
+        print('  {:<38} {:>10.4f} s'.format(package, seconds))
+
+    if args.output is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(dict(app_seconds=app_seconds, analysis_seconds=analysis_seconds, loaded_at_startup=loaded,
+                import_time=[dict(package=p, seconds=s) for p, s in breakdown]), f, indent=2)
+        print('results written to', args.output)
+    # a heavy package imported at startup is a regression of the cold start.
+    return 1 if loaded else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
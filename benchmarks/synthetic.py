@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Synthetic SpMV benchmark results, in the same layout as the files uploaded to Performance Explorer:
+# one row per (matrix, strategy, repetition), with nnz, gflops, a verification failure tag and the hover columns.
+# example:
+#   python3 benchmarks/synthetic.py 100000 --strategies 4 --repetitions 2 --output synthetic.csv
+import argparse
+import base64
+
+import numpy as np
+import pandas as pd
+
+MTX_COLUMN = 'csr_mtx'
+X_COLUMN = 'nnz'
+STRATEGY_COLUMN = 'strategy'
+Y_COLUMN = 'gflops'
+DROP_COLUMN = 'failed'
+
+
+def strategy_names(strategies: int):
+    return ['alg{}'.format(i) for i in range(strategies)]
+
+
+# generate rows = matrices * strategies * repetitions records (the number of matrices is rounded down).
+# nnz of the matrices is log-normal (about 10^2 to 10^8, as in the SuiteSparse collection),
+# each strategy has its own throughput curve over nnz, and each repetition has a multiplicative noise.
+# If failure_rate > 0, the column 'failed' tags the records failing the verification (1) and the others (0).
+def gen_spmv_results(rows: int, strategies: int = 4, repetitions: int = 1, failure_rate: float = 0.01, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    matrices = max(1, rows // (strategies * repetitions))
+    nnz = np.clip(10 ** rng.normal(5.0, 1.2, matrices), 10, 1e9).astype(np.int64)
+    nnz_per_row = np.clip(10 ** rng.normal(1.0, 0.5, matrices), 1.0, 1e4)
+
+    # peak throughput, the nnz of half peak throughput and the sensitivity to long rows of each strategy.
+    peak = rng.uniform(10, 40, strategies)
+    half_nnz = 10 ** rng.uniform(3.5, 5.5, strategies)
+    row_sensitivity = rng.uniform(-0.2, 0.2, strategies)
+
+    mtx_idx = np.repeat(np.arange(matrices), strategies * repetitions)
+    strategy_idx = np.tile(np.repeat(np.arange(strategies), repetitions), matrices)
+    x = nnz[mtx_idx]
+    gflops = peak[strategy_idx] * x / (x + half_nnz[strategy_idx]) * nnz_per_row[mtx_idx] ** row_sensitivity[strategy_idx]
+    gflops *= rng.lognormal(0.0, 0.1, len(mtx_idx))
+    calc_cost = 2.0 * x / (gflops * 1e3)  # microseconds
+
+    df = pd.DataFrame({
+        MTX_COLUMN: pd.Categorical.from_codes(mtx_idx, ['mtx{}'.format(i) for i in range(matrices)]),
+        X_COLUMN: x,
+        STRATEGY_COLUMN: pd.Categorical.from_codes(strategy_idx, strategy_names(strategies)),
+        Y_COLUMN: gflops,
+        'nnz/row': nnz_per_row[mtx_idx].round(3),
+        'mid calc cost': calc_cost,
+        'mid total cost': calc_cost * rng.uniform(1.0, 1.3, len(mtx_idx)),
+    })
+    if failure_rate > 0:
+        df.insert(4, DROP_COLUMN, (rng.random(len(df)) < failure_rate).astype(np.int8))
+    return df
+
+
+# the content of the dataframe as uploaded by the browser (a base64 data url of the csv file), for parse_contents.
+def to_upload_contents(df: pd.DataFrame):
+    return 'data:text/csv;base64,' + base64.b64encode(df.to_csv(index=False).encode('utf-8')).decode('ascii')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic SpMV benchmark results.')
+    parser.add_argument('rows', type=float, help='number of records, e.g. 1e6')
+    parser.add_argument('--strategies', type=int, default=4)
+    parser.add_argument('--repetitions', type=int, default=1, help='repeated records of each (matrix, strategy)')
+    parser.add_argument('--failure-rate', type=float, default=0.01, help='0 for no failure column')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='synthetic.csv')
+    args = parser.parse_args(argv)
+    df = gen_spmv_results(int(args.rows), args.strategies, args.repetitions, args.failure_rate, args.seed)
+    df.to_csv(args.output, index=False)
+    print('{} records of {} matrices written to {}'.format(len(df), df[MTX_COLUMN].nunique(), args.output))
+
+
+if __name__ == '__main__':
+    main()
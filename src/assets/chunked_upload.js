@@ -0,0 +1,83 @@
+// Resumable chunked upload of a large file (see chunked_upload.py): the file is streamed to the server in chunks,
+// without base64 encoding it in the page. An interrupted upload continues from the bytes received by the server
+// when the same file is selected again.
+// Once the file is received, its upload id is set to the hidden input 'chunked-upload-id', and the server parses it.
+(function () {
+    const CHUNK_BYTES = 8 * 1024 * 1024;
+    const MAX_RETRIES = 5;
+
+    function setProgress(text) {
+        const progress = document.getElementById('chunked-upload-progress');
+        if (progress) {
+            progress.textContent = text;
+        }
+    }
+
+    // set the value of the input controlled by react, thus dash receives the change.
+    function setUploadId(uploadId) {
+        const input = document.getElementById('chunked-upload-id');
+        const setter = Object.getOwnPropertyDescriptor(window.HTMLInputElement.prototype, 'value').set;
+        // the time makes the value change if the same file is selected again.
+        setter.call(input, uploadId + ':' + Date.now());
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+    }
+
+    async function postJson(url, body) {
+        const response = await fetch(url, {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(body)});
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || response.statusText);
+        }
+        return result;
+    }
+
+    // send a chunk, retried with exponential backoff on network errors.
+    // return the number of bytes received by the server (the offset of the next chunk).
+    async function sendChunk(uploadId, offset, chunk) {
+        for (let attempt = 0; ; attempt++) {
+            let response;
+            try {
+                response = await fetch('/upload/' + uploadId + '?offset=' + offset, {method: 'PUT', body: chunk});
+            } catch (e) {
+                if (attempt >= MAX_RETRIES) {
+                    throw e;
+                }
+                await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+                continue;
+            }
+            const result = await response.json();
+            if (!response.ok) {
+                throw new Error(result.error || response.statusText);
+            }
+            return result.offset;
+        }
+    }
+
+    async function upload(file) {
+        const state = await postJson('/upload/init', {filename: file.name, size: file.size, last_modified: file.lastModified});
+        let offset = state.offset;
+        if (offset > 0 && offset < file.size) {
+            setProgress('Resuming ' + file.name + ' from ' + (offset / 1e6).toFixed(1) + ' MB');
+        }
+        while (offset < file.size) {
+            offset = await sendChunk(state.upload_id, offset, file.slice(offset, offset + CHUNK_BYTES));
+            setProgress('Uploading ' + file.name + ': ' + (100 * offset / file.size).toFixed(1) + '%');
+        }
+        setProgress('Received ' + file.name);
+        setUploadId(state.upload_id);
+    }
+
+    document.addEventListener('click', function (event) {
+        if (!event.target.closest('#chunked-upload-button')) {
+            return;
+        }
+        const picker = document.createElement('input');
+        picker.type = 'file';
+        picker.onchange = function () {
+            if (picker.files.length > 0) {
+                upload(picker.files[0]).catch(e => setProgress('Upload failed: ' + e.message + ' (select the file again to resume)'));
+            }
+        };
+        picker.click();
+    });
+})();
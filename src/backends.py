@@ -0,0 +1,220 @@
+import os
+import threading
+
+import pandas as pd
+
+from datasets import load_dataset, dataset_file, is_dataset_id
+from selection import selection_cache, cached_prepared_records, cached_algorithm_pair, cached_strategy_rows
+from segment_index import best_of_matrices, cached_speedup_index, cached_best_perf_index
+from live_source import live_source
+from repetitions import DEFAULT_REDUCER, TRIM_RATIO
+from instrumentation import stage
+
+try:
+    import duckdb
+    import pyarrow.dataset
+except ImportError:  # duckdb is optional: without it, the datasets are analysed in memory by pandas.
+    duckdb = None
+
+# backend of the analysis: 'pandas' (the dataset is loaded in memory) or 'duckdb' (queries over the dataset file on disk,
+# for datasets larger than the memory). The duckdb backend is used for the datasets having a file (see dataset_file).
+BACKEND = os.environ.get('PERF_EXPLORER_BACKEND', 'pandas')
+
+# memory limit of duckdb (e.g. '8GB'), it spills to disk above the limit. Default: the duckdb default.
+DUCKDB_MEMORY_LIMIT = os.environ.get('PERF_EXPLORER_DUCKDB_MEMORY_LIMIT')
+
+
+# Backend analysing a dataset loaded in memory, by the cached pandas selections (see selection.py).
+# A backend provides the selections of the figures and the indexes, all results are dataframes in memory:
+# strategies, x_range, algorithm_pair, strategy_rows and best_records,
+# and the indexes of the segmented statistics: speedup_index and best_perf_index.
+class PandasBackend:
+    def __init__(self, dataset_id: str, df: pd.DataFrame):
+        self.dataset_id = dataset_id
+        self.df = df
+
+    # the distinct values of the algorithm column, sorted.
+    def strategies(self, alg_column: str):
+        unique_keys = pd.unique(self.df[alg_column]).tolist()
+        unique_keys.sort()
+        return unique_keys
+
+    # (min, max) of x column, as python numbers.
+    def x_range(self, x_column: str):
+        return self.df[x_column].min().item(), self.df[x_column].max().item()
+
+    # drop the failed records and collapse the repeated records (shared by the selections of the dataset).
+    def prepare(self, mtx_column: str, alg_column: str, y_column: str, drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        cached_prepared_records(self.dataset_id, self.df, mtx_column, alg_column, y_column, drop_rows_by_col_value, reducer)
+
+    # see cached_algorithm_pair.
+    def algorithm_pair(self, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return cached_algorithm_pair(self.dataset_id, self.df, alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+
+    # see cached_strategy_rows.
+    def strategy_rows(self, mtx_column: str, alg_column: str, y_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return cached_strategy_rows(self.dataset_id, self.df, mtx_column, alg_column, y_column, selected_strategies, drop_rows_by_col_value, reducer)
+
+    # the best record of each matrix of the selected strategies, see best_of_matrices.
+    def best_records(self, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return best_of_matrices(self.strategy_rows(mtx_column, alg_column, y_column, selected_strategies, drop_rows_by_col_value, reducer),
+            x_column, y_column, mtx_column, alg_column)
+
+    # the index of the segmented speedup statistics of 2 algorithms, see SpeedupIndex.
+    def speedup_index(self, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return cached_speedup_index(self, alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+
+    # the index of the segmented best performance statistics of the selected strategies, see BestPerfIndex.
+    def best_perf_index(self, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return cached_best_perf_index(self, x_column, y_column, mtx_column, alg_column, selected_strategies, drop_rows_by_col_value, reducer)
+
+
+def _quote(column: str):
+    return '"' + str(column).replace('"', '""') + '"'
+
+
+# Backend running the selections as duckdb queries over the dataset file (Arrow or Parquet), without loading the dataset:
+# the projection (the columns in use) and the filters (strategies, failed records) are pushed down into the scan of the
+# file, and the repetitions are collapsed, the pairs joined and the best records found by the query.
+# Only the results (e.g. the records of 2 strategies) are loaded in memory, and are cached in the selection cache.
+# note: the columns other than the y column of collapsed repetitions are taken from any record of the group.
+class DuckDBBackend:
+    def __init__(self, dataset_id: str, path: str, columns: [str]):
+        self.dataset_id = dataset_id
+        self.path = path
+        self.columns = columns  # columns read by the queries
+        self._local = threading.local()
+
+    # a connection of the current thread (a duckdb connection is not shared between threads), with the dataset file
+    # as the view 'records'.
+    def _connection(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = duckdb.connect()
+            if DUCKDB_MEMORY_LIMIT is not None:
+                con.execute("SET memory_limit = '{}'".format(DUCKDB_MEMORY_LIMIT))
+            file_format = 'parquet' if self.path.endswith('.parquet') else 'ipc'
+            con.register('records', pyarrow.dataset.dataset(self.path, format=file_format))
+            self._local.con = con
+        return con
+
+    def _query(self, sql: str, params: list = None):
+        with stage('duckdb query'):
+            return self._connection().execute(sql, params or []).df()
+
+    def strategies(self, alg_column: str):
+        alg = _quote(alg_column)
+        return self._query('SELECT DISTINCT {0} FROM records WHERE {0} IS NOT NULL ORDER BY {0}'.format(alg))[alg_column].tolist()
+
+    def x_range(self, x_column: str):
+        key = ('x-range', self.dataset_id, x_column)
+        x = _quote(x_column)
+        return selection_cache.get_or_compute(key, lambda: tuple(
+            v.item() if hasattr(v, 'item') else v for v in self._query('SELECT min({0}), max({0}) FROM records'.format(x)).iloc[0]))
+
+    # nothing to prepare: the repetitions are collapsed by the query of each selection.
+    def prepare(self, mtx_column: str, alg_column: str, y_column: str, drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        pass
+
+    # the query of the records of the selected strategies without the failed records, with the repeated records of each
+    # (matrix, strategy) collapsed by the reducer (see collapse_repetitions). NaN y values are NULL.
+    # Without selected strategies, the query selects no record (an empty frame of the same columns), without scanning the file.
+    def _collapsed(self, mtx_column: str, alg_column: str, y_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str):
+        mtx, alg, y = _quote(mtx_column), _quote(alg_column), _quote(y_column)
+        others = [c for c in self.columns if c not in (mtx_column, alg_column, y_column, drop_rows_by_col_value)]
+        if len(selected_strategies) == 0:
+            where = 'false'
+        else:
+            where = '{} IN ({})'.format(alg, ', '.join(['?'] * len(selected_strategies)))
+        if drop_rows_by_col_value != None:
+            where += ' AND NOT coalesce(CAST({} AS DOUBLE) > 0, false)'.format(_quote(drop_rows_by_col_value))
+        columns = ', '.join([mtx, alg] + [_quote(c) for c in others])
+        source = "SELECT {}, nullif(CAST({} AS DOUBLE), 'NaN'::DOUBLE) AS {} FROM records WHERE {}".format(columns, y, y, where)
+
+        if reducer == 'trimmed_mean':
+            source = ('SELECT *, row_number() OVER (PARTITION BY {0}, {1} ORDER BY {2}) AS _rank, '
+                'count({2}) OVER (PARTITION BY {0}, {1}) AS _count FROM ({3})').format(mtx, alg, y, source)
+            reduced = 'avg({0}) FILTER (WHERE _rank > floor(_count * {1}) AND _rank <= _count - floor(_count * {1}))'.format(y, TRIM_RATIO)
+        elif reducer == 'median':
+            reduced = 'median({})'.format(y)
+        elif reducer == 'min':
+            reduced = 'min({})'.format(y)
+        elif reducer == 'best':
+            reduced = 'max({})'.format(y)
+        else:
+            raise ValueError('unknown reducer: ' + str(reducer))
+        select = ', '.join([mtx, alg] + ['first({0}) AS {0}'.format(_quote(c)) for c in others] + ['{} AS {}'.format(reduced, y)])
+        return 'SELECT {} FROM ({}) GROUP BY {}, {}'.format(select, source, mtx, alg), list(selected_strategies)
+
+    # the merged records of 2 algorithms (as cached_algorithm_pair), joined by the query.
+    def algorithm_pair(self, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        key = ('pair', self.dataset_id, tuple(self.columns), alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+        def compute():
+            collapsed, params = self._collapsed(mtx_column, alg_column, y_column, [alg_a, alg_b], drop_row_by_col_value, reducer)
+            mtx, alg = _quote(mtx_column), _quote(alg_column)
+            others = [c for c in self.columns if c not in (mtx_column, drop_row_by_col_value)]
+            select = ', '.join(['a.{0} AS {0}'.format(mtx)] + ['a.{} AS {}'.format(_quote(c), _quote(c + '_x')) for c in others] +
+                ['b.{} AS {}'.format(_quote(c), _quote(c + '_y')) for c in others])
+            sql = 'WITH c AS ({}) SELECT {} FROM c AS a JOIN c AS b ON a.{} = b.{} WHERE a.{} = ? AND b.{} = ? ORDER BY a.{}'.format(
+                collapsed, select, mtx, mtx, alg, alg, _quote(x_column))
+            return self._query(sql, params + [alg_a, alg_b])
+        return selection_cache.get_or_compute(key, compute)
+
+    # the records of the selected strategies (as cached_strategy_rows), filtered and collapsed by the query.
+    def strategy_rows(self, mtx_column: str, alg_column: str, y_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        key = ('strategies', self.dataset_id, tuple(self.columns), mtx_column, alg_column, y_column, tuple(selected_strategies), drop_rows_by_col_value, reducer)
+        return selection_cache.get_or_compute(key, lambda: self._query(
+            *self._collapsed(mtx_column, alg_column, y_column, selected_strategies, drop_rows_by_col_value, reducer)))
+
+    # the best record of each matrix of the selected strategies (as best_of_matrices), by a per-matrix argmax of the query.
+    def best_records(self, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        collapsed, params = self._collapsed(mtx_column, alg_column, y_column, selected_strategies, drop_rows_by_col_value, reducer)
+        mtx, alg, x, y = _quote(mtx_column), _quote(alg_column), _quote(x_column), _quote(y_column)
+        sql = ('SELECT {0}, arg_max({1}, {3}) AS {1}, arg_max({2}, {3}) AS {2}, max({3}) AS {3}, count(*) AS group_size '
+            'FROM ({4}) GROUP BY {0} HAVING max({3}) IS NOT NULL').format(mtx, alg, x, y, collapsed)
+        return self._query(sql, params)
+
+    # the index of the segmented speedup statistics of 2 algorithms, see SpeedupIndex.
+    def speedup_index(self, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return cached_speedup_index(self, alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+
+    # the index of the segmented best performance statistics of the selected strategies, see BestPerfIndex.
+    def best_perf_index(self, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return cached_best_perf_index(self, x_column, y_column, mtx_column, alg_column, selected_strategies, drop_rows_by_col_value, reducer)
+
+
+# Backend of the dataset of a followed directory (see live_source.py): the selections of the figures are the pandas
+# selections of the rows read so far, the segmented statistics are maintained incrementally by the live source,
+# thus refreshing them costs the new rows only.
+class LiveBackend(PandasBackend):
+    def __init__(self, source):
+        super().__init__(*source.snapshot())
+        self.source = source
+
+    # the running (min, max) of x column.
+    def x_range(self, x_column: str):
+        return self.source.table.x_range(x_column)
+
+    def speedup_index(self, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return self.source.speedup_statistics(alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+
+    def best_perf_index(self, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        return self.source.best_perf_statistics(x_column, y_column, mtx_column, alg_column, selected_strategies, drop_rows_by_col_value, reducer)
+
+
+# the backend of a dataset, reading the given columns. return None if the dataset is unknown or has been evicted.
+# Any version of the live dataset gets the backend of its latest version.
+def dataset_backend(dataset_id: str, columns: [str]):
+    if not is_dataset_id(dataset_id):
+        return None
+    if live_source is not None and live_source.owns(dataset_id):
+        return LiveBackend(live_source)
+    if BACKEND == 'duckdb' and duckdb is not None:
+        path = dataset_file(dataset_id)
+        if path is not None:
+            available = set(pyarrow.dataset.dataset(path, format='parquet' if path.endswith('.parquet') else 'ipc').schema.names)
+            return DuckDBBackend(dataset_id, path, [c for c in dict.fromkeys(columns) if c in available])
+    df = load_dataset(dataset_id, columns)
+    if df is None:
+        return None
+    return PandasBackend(dataset_id, df)
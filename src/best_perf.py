@@ -5,64 +5,105 @@ from dash.dash_table.Format import Format, Padding, Scheme
 
 percentage = FormatTemplate.percentage(4)
 
+from segmentation import *
+from selection import select_strategy_rows
+from repetitions import DEFAULT_REDUCER, prepare_records
+from instrumentation import record_value
+
 DEBUG_LOG = False
 
+# column in table
+best_perf_table_columns = [
+    dict(id='algo', name='Algorithms'),
+    dict(id='xstart', name='X Start'),
+    dict(id='xend', name='X End (not include)'),
+    dict(id='best_count', name='Best count'),
+    dict(id='total_count', name='Total Count'),
+    dict(id='best_ratio', name='Best Ratio', type='numeric', format=percentage),
+    dict(id='incomplete_count', name='Incomplete Count'),
+]
+
+
+def statistics_best_perf_in_each_segment(df, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_algs: [str], segments: [int], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    records = prepare_records(df, mtx_column, alg_column, y_column, drop_rows_by_col_value, reducer)
+    selected = select_strategy_rows(records, alg_column, selected_algs, None)
+    return statistics_best_perf_of_selection(selected, x_column, y_column, mtx_column, alg_column, len(selected_algs), segments)
 
-def statistics_best_perf_in_each_segment(df, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_algs: [str], segments: [int], drop_rows_by_col_value: str):
-    df1 = pd.DataFrame(columns=['algo', 'xstart', 'xend', 'best_count', 'total_count', 'best_ratio'])
-    seg_num = len(segments)
-    for i in range(seg_num - 1):
-        range_start = segments[i]
-        range_end = segments[i + 1]
-        best_record = find_best(df, x_column, y_column, mtx_column, alg_column, selected_algs, drop_rows_by_col_value, range_start, range_end)
-        if DEBUG_LOG:
-            print_best(best_record)
-        # save the results of the best.
-        best_grouped = best_record.groupby("best_algorithm")
-        for name, group in best_grouped:
-            df1.loc[len(df1)] = [name, range_start, range_end, len(group), len(best_record), len(group) / len(best_record),]
+# segmented best performance statistics of the selected records (see select_strategy_rows).
+def statistics_best_perf_of_selection(selected, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_strategies_num: int, segments: [int]):
+    if is_ascending(segments):
+        best_records = best_of_each_matrix(selected, x_column, y_column, mtx_column, alg_column, segments)
+    else:
+        # the segments may overlap, find the best records of each segment one by one.
+        best_records = pd.concat([
+            best_of_each_matrix(selected, x_column, y_column, mtx_column, alg_column, [segments[i], segments[i + 1]]).assign(seg=i)
+            for i in range(len(segments) - 1)
+        ], ignore_index=True)
+    if DEBUG_LOG:
+        print_best(best_records)
+    df1 = best_count_table(best_records, selected_strategies_num, segments)
     if DEBUG_LOG:
         print(df1)
-    # column in table
-    columns = [
-        dict(id='algo', name='Algorithms'),
-        dict(id='xstart', name='X Start'),
-        dict(id='xend', name='X End (not include)'),
-        dict(id='best_count', name='Best count'),
-        dict(id='total_count', name='Total Count'),
-        dict(id='best_ratio', name='Best Ratio', type='numeric', format=percentage),
-    ]
+    return df1, best_perf_table_columns
 
-    return df1, columns
+# count the best records of each algorithm in each segment.
+# A matrix group is incomplete if it does not have a record for every selected strategy.
+def best_count_table(best_records, selected_strategies_num: int, segments: [int]):
+    # a categorical algorithm column (see normalize_schema) is counted by its observed values only.
+    counts = pd.crosstab(best_records['seg'], best_records['best_algorithm'].astype(object))
+    total_count = best_records.groupby('seg').size()
+    incomplete_count = (best_records['group_size'] != selected_strategies_num).groupby(best_records['seg']).sum()
 
-# find best search the pandas.
-# Find the max performance of each matrix and record the matrix name, algorithm name and performance value.
-def find_best(csr_data, keys_nnz, keys_flops, keys_csr_mtx, keys_strategy, selected_strategies, drop_rows_by_col_value, range_start, range_end):
-    # select nnz first
-    csr_data = csr_data[(csr_data[keys_nnz] >= range_start) & (csr_data[keys_nnz] < range_end)]
-    # ignore cases when verification failed
-    if drop_rows_by_col_value != None:
-        csr_data.drop(csr_data[(csr_data[drop_rows_by_col_value] > 0)].index, inplace=True) # todo:
-    # select strategies
-    df = csr_data[csr_data[keys_strategy].isin(selected_strategies)]
-    grouped = df.groupby(keys_csr_mtx) # group by matrix name
+    table = counts.stack().rename('best_count').reset_index()
+    table = table[table['best_count'] > 0]
+    seg = table['seg'].to_numpy()
+    total = total_count.reindex(seg).to_numpy()
+    return pd.DataFrame({
+        'algo': table['best_algorithm'].to_numpy(),
+        'xstart': [segments[i] for i in seg],
+        'xend': [segments[i + 1] for i in seg],
+        'best_count': table['best_count'].to_numpy(),
+        'total_count': total,
+        'best_ratio': table['best_count'].to_numpy() / total,
+        'incomplete_count': incomplete_count.reindex(seg).to_numpy(),
+    })
+
+# find the best record of each matrix in each segment of x column, from the selected records (see select_strategy_rows).
+# It returns a dataframe of columns ['seg', keys_csr_mtx, 'best_flops', 'best_algorithm', 'group_size'],
+# where 'seg' is the segment index and 'group_size' is the number of records of the matrix in the segment.
+def best_of_each_matrix(selected, keys_nnz, keys_flops, keys_csr_mtx, keys_strategy, segments: [int]):
+    # select nnz
+    seg = assign_segments(selected[keys_nnz].to_numpy(), segments)
+    mask = seg >= 0
+    df = selected.loc[mask, [keys_csr_mtx, keys_strategy, keys_flops]].reset_index(drop=True)
+    df['seg'] = seg[mask]
 
-    print("avaiabled groups:", len(grouped))
-    best_records = pd.DataFrame(columns=[keys_csr_mtx, 'best_flops', 'best_algorithm'])
-    should_discard = 0
-    for name, group in grouped:
-        if len(group) != len(selected_strategies):
-            should_discard = should_discard + 1
-            # continue # still keep the incompleted group
-        _id = group[keys_flops].idxmax()
-        best = group.loc[_id]
-        best_records.loc[len(best_records)] = [best[keys_csr_mtx], best[keys_flops], best[keys_strategy]]
-        # break
-    print("should discarded(incompleted) groups:", should_discard)
+    group_keys = ['seg', keys_csr_mtx]
+    group_size = df.groupby(group_keys, observed=True).size()
+    best_idx = df[df[keys_flops].notna()].groupby(group_keys, observed=True)[keys_flops].idxmax()
+    best = df.loc[best_idx.to_numpy()]
+    best_records = pd.DataFrame({
+        'seg': best['seg'].to_numpy(),
+        keys_csr_mtx: best[keys_csr_mtx].to_numpy(),
+        'best_flops': best[keys_flops].to_numpy(),
+        'best_algorithm': best[keys_strategy].to_numpy(),
+        'group_size': group_size.reindex(best_idx.index).to_numpy(),
+    })
+    record_value('matrix groups', len(group_size))
     return best_records
 
+# find best search the pandas.
+# Find the max performance of each matrix and record the matrix name, algorithm name and performance value.
+def find_best(csr_data, keys_nnz, keys_flops, keys_csr_mtx, keys_strategy, selected_strategies, drop_rows_by_col_value, range_start, range_end, reducer: str = DEFAULT_REDUCER):
+    # ignore cases when verification failed, collapse repetitions and select strategies
+    records = prepare_records(csr_data, keys_csr_mtx, keys_strategy, keys_flops, drop_rows_by_col_value, reducer)
+    selected = select_strategy_rows(records, keys_strategy, selected_strategies, None)
+    best_records = best_of_each_matrix(selected, keys_nnz, keys_flops, keys_csr_mtx, keys_strategy, [range_start, range_end])
+    record_value('incomplete groups', int((best_records['group_size'] != len(selected_strategies)).sum()))
+    return best_records[[keys_csr_mtx, 'best_flops', 'best_algorithm']]
+
 def print_best(df):
-    best_grouped = df.groupby("best_algorithm")
+    best_grouped = df.groupby("best_algorithm", observed=True, dropna=False)
     best_counter = pd.DataFrame(columns=["strategy", "cases_number_of_best"])
     for name, group in best_grouped:
         best_counter.loc[len(best_counter)] = [name, len(group)]
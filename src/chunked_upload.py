@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import re
+import threading
+import time
+
+from datasets import read_data_file, store_dataset, is_registered, dataset_hash
+from instrumentation import stage
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional: without it, zstd-compressed files are not supported.
+    zstandard = None
+
+# the partially received files of the chunked uploads are kept in this directory until they are parsed,
+# thus an interrupted upload is resumed from the received bytes.
+UPLOAD_DIR = os.environ.get('PERF_EXPLORER_UPLOAD_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'performance-explorer', 'uploads'))
+
+# size of the chunks sent by the browser (see assets/chunked_upload.js), a larger chunk is refused.
+UPLOAD_CHUNK_BYTES = 8 * 1024 ** 2
+
+# upper bound (in bytes) of the size of an uploaded file (before decompression).
+UPLOAD_MAX_BYTES = int(os.environ.get('PERF_EXPLORER_UPLOAD_MAX_BYTES', 16 * 1024 ** 3))
+
+# the files of an upload without activity (no chunk received, not selected again) for this time (in seconds) are removed,
+# an upload selected again after it restarts from the beginning.
+UPLOAD_TTL = int(os.environ.get('PERF_EXPLORER_UPLOAD_TTL', 24 * 3600))
+
+# compressed files are decompressed while parsing, by the suffix of the file name.
+COMPRESSION_SUFFIXES = ('.gz', '.xz', '.zst')
+
+_UPLOAD_ID_PATTERN = re.compile('^[0-9a-f]{32}$')
+
+_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    pass
+
+
+# the id of an upload: the same file (name, size and modification time) selected again resumes its upload.
+def gen_upload_id(filename: str, size: int, last_modified):
+    return hashlib.blake2b('{}\0{}\0{}'.format(filename, size, last_modified).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _path(upload_id: str, suffix: str):
+    if not _UPLOAD_ID_PATTERN.match(upload_id):
+        raise UploadError('invalid upload id')
+    return os.path.join(UPLOAD_DIR, upload_id + suffix)
+
+
+def _read_meta(upload_id: str):
+    try:
+        with open(_path(upload_id, '.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise UploadError('unknown upload')
+
+
+def _write_meta(upload_id: str, meta: dict):
+    tmp_path = _path(upload_id, '.json.{}.tmp'.format(os.getpid()))
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _path(upload_id, '.json'))
+
+
+# the time of the last activity of an upload: the modification time of its files.
+def _last_activity(upload_id: str):
+    times = [0.0]
+    for suffix in ('.json', '.part'):
+        try:
+            times.append(os.path.getmtime(_path(upload_id, suffix)))
+        except FileNotFoundError:
+            pass
+    return max(times)
+
+
+# remove the files of the uploads without activity for UPLOAD_TTL seconds (partial files, and the dataset ids of the
+# completed uploads).
+def remove_stale_uploads(now: float = None):
+    now = time.time() if now is None else now
+    for filename in os.listdir(UPLOAD_DIR):
+        upload_id = filename.split('.', 1)[0]
+        if not _UPLOAD_ID_PATTERN.match(upload_id) or now - _last_activity(upload_id) <= UPLOAD_TTL:
+            continue
+        try:
+            os.remove(os.path.join(UPLOAD_DIR, filename))
+        except FileNotFoundError:  # removed by another process
+            pass
+
+
+def _received_bytes(upload_id: str):
+    try:
+        return os.path.getsize(_path(upload_id, '.part'))
+    except FileNotFoundError:
+        return 0
+
+
+# start (or resume) the upload of a file, return the upload id and the number of bytes already received.
+# A file which has been uploaded and parsed before returns its dataset id, and is not sent again.
+def init_upload(filename: str, size: int, last_modified):
+    if not filename or size < 0:
+        raise UploadError('invalid file')
+    if size > UPLOAD_MAX_BYTES:
+        raise UploadError('the file is larger than the upload limit ({} bytes)'.format(UPLOAD_MAX_BYTES))
+    supported_file_type(filename)
+    upload_id = gen_upload_id(filename, size, last_modified)
+    with _lock:
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        remove_stale_uploads()
+        try:
+            meta = _read_meta(upload_id)
+            os.utime(_path(upload_id, '.json'))  # selected again: an activity of the upload
+        except UploadError:
+            meta = dict(filename=filename, size=size, last_modified=last_modified, dataset_id=None)
+            _write_meta(upload_id, meta)
+    if meta['dataset_id'] is not None and is_registered(meta['dataset_id']):
+        return dict(upload_id=upload_id, offset=size, dataset_id=meta['dataset_id'])
+    return dict(upload_id=upload_id, offset=_received_bytes(upload_id), dataset_id=None)
+
+
+# append a chunk of the file at the given offset, and return the number of bytes received.
+# The chunk is ignored if the offset is not the end of the received bytes (e.g. a chunk sent twice after a retry),
+# the browser continues from the returned offset.
+def append_chunk(upload_id: str, offset: int, chunk: bytes):
+    if len(chunk) > UPLOAD_CHUNK_BYTES:
+        raise UploadError('chunk larger than {} bytes'.format(UPLOAD_CHUNK_BYTES))
+    meta = _read_meta(upload_id)
+    with _lock:
+        received = _received_bytes(upload_id)
+        if offset != received:
+            return received
+        if received + len(chunk) > min(meta['size'], UPLOAD_MAX_BYTES):
+            raise UploadError('chunk beyond the end of the file')
+        with open(_path(upload_id, '.part'), 'ab') as f:
+            f.write(chunk)
+        return received + len(chunk)
+
+
+# raise UploadError if the file type (after the compression suffix) can not be parsed.
+def supported_file_type(filename: str):
+    compression, name = split_compression(filename)
+    if compression == '.zst' and zstandard is None:
+        raise UploadError('zstd-compressed files need the zstandard package')
+    if not (name.endswith(('.parquet', '.feather', '.arrow', '.ipc')) or 'csv' in name or 'xls' in name):
+        raise UploadError('unsupported file type: ' + filename)
+
+
+# return the compression suffix of the file name (or None) and the file name without it.
+def split_compression(filename: str):
+    for suffix in COMPRESSION_SUFFIXES:
+        if filename.endswith(suffix):
+            return suffix, filename[:-len(suffix)]
+    return None, filename
+
+
+# open a received file as a stream of its decompressed bytes.
+def open_decompressed(path: str, compression: str):
+    if compression == '.gz':
+        return gzip.open(path, 'rb')
+    if compression == '.xz':
+        return lzma.open(path, 'rb')
+    if compression == '.zst':
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+# parse a completely received file (decompressing it while parsing) into a dataset, and return the dataset id.
+# The received file is removed once the dataset is stored.
+def complete_upload(upload_id: str):
+    meta = _read_meta(upload_id)
+    if meta['dataset_id'] is not None and is_registered(meta['dataset_id']):
+        return meta['dataset_id']
+    path = _path(upload_id, '.part')
+    if _received_bytes(upload_id) != meta['size']:
+        raise UploadError('the upload is not complete')
+
+    with stage('hash'):
+        h = dataset_hash(meta['filename'])  # the same id as the file uploaded by the page (see gen_dataset_id)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b''):
+                h.update(block)
+        dataset_id = h.hexdigest()
+
+    if not is_registered(dataset_id):
+        compression, name = split_compression(meta['filename'])
+        try:
+            with stage('parse'):
+                with open_decompressed(path, compression) as stream:
+                    df = read_data_file(stream, name)
+        except Exception as e:
+            raise UploadError('can not parse {}: {}'.format(meta['filename'], e))
+        store_dataset(dataset_id, df)
+
+    meta['dataset_id'] = dataset_id
+    _write_meta(upload_id, meta)
+    os.remove(path)
+    return dataset_id
+
+
+# the file name and the modification time (in seconds) of an upload, for displaying.
+def upload_file_info(upload_id: str):
+    meta = _read_meta(upload_id)
+    last_modified = meta['last_modified']
+    # the browser sends the modification time in milliseconds.
+    return meta['filename'], last_modified / 1000 if isinstance(last_modified, (int, float)) else time.time()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# Headless batch mode: generate speedup/performance figures and segmented statistics tables without the Dash server.
+# example:
+#   python3 src/cli.py results.csv --mtx csr_mtx --strategy strategy --x nnz --y "GFLOPS(total_time)" --drop failed \
+#       --pair adaptive csr-scalar --pair adaptive csr-vector --perf adaptive csr-scalar csr-vector \
+#       --segments "1000 10000 100000" --output reports/ --figure-format pdf png
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from best_perf import *
+from speedup_versus import *
+from segment_statistics import *
+from perf_plot import *
+from datasets import read_data_files
+from segmentation import gen_seg_list
+from selection import merge_algorithm_pair, select_strategy_rows
+from repetitions import REDUCERS, DEFAULT_REDUCER, prepare_records
+
+TABLE_FORMATS = ['csv', 'json']
+FIGURE_FORMATS = ['pdf', 'svg', 'png']
+
+# dataset of the worker process, loaded once by the initializer of the process pool.
+_dataset = None
+
+
+def _load_worker_dataset(inputs: [str]):
+    global _dataset
+    _dataset = read_data_files(inputs)
+
+
+def _safe_name(name):
+    return re.sub(r'[^\w.-]+', '_', str(name))
+
+
+def _write_table(table, path_prefix: str, table_formats: [str]):
+    paths = []
+    for fmt in table_formats:
+        path = path_prefix + '.' + fmt
+        if fmt == 'csv':
+            table.to_csv(path, index=False)
+        else:
+            table.to_json(path, orient='records', indent=2)
+        paths.append(path)
+    return paths
+
+
+# kaleido is configured here, on the first figure written by the worker process.
+def _write_figure(fig, path_prefix: str, figure_formats: [str]):
+    import plotly.io as pio
+    pio.kaleido.scope.mathjax = None
+    paths = []
+    for fmt in figure_formats:
+        path = path_prefix + '.' + fmt
+        fig.write_image(path)
+        paths.append(path)
+    return paths
+
+
+# run one report job in the worker process and return the paths of the written files.
+# A job is a dict of: type ('speedup' or 'perf'), algorithms, segment lists, column mapping, plot config and output options.
+def run_job(job: dict):
+    df = _dataset
+    mtx, strategy, x, y, drop = job['mtx'], job['strategy'], job['x'], job['y'], job['drop']
+    out_dir = job['output']
+    algs = job['algorithms']
+    paths = []
+    # failed records are dropped and repeated runs are collapsed once, before joining.
+    records = prepare_records(df, mtx, strategy, y, drop, job['reducer'])
+    if job['type'] == 'speedup':
+        name = 'speedup_{}_vs_{}'.format(_safe_name(algs[0]), _safe_name(algs[1]))
+        merged_data = merge_algorithm_pair(records, algs[0], algs[1], mtx, strategy, None).sort_values(by=x + '_x')
+        if job['figure_formats']:
+            fig = gen_plot_speedup_of_merged_pair(merged_data, x, y, job['config'])
+            paths += _write_figure(fig, os.path.join(out_dir, name), job['figure_formats'])
+        for i, segment_conf in enumerate(job['segments']):
+            segments = gen_seg_list(df, x, y, segment_conf)
+            table, _ = statistics_of_merged_pair(merged_data, algs[0], algs[1], x, y, segments)
+            paths += _write_table(table, os.path.join(out_dir, '{}_segments{}'.format(name, i)), job['table_formats'])
+    else:
+        name = 'perf_' + '_'.join(_safe_name(a) for a in algs)
+        selected = select_strategy_rows(records, strategy, algs, None)
+        if job['figure_formats']:
+            fig = gen_plot_performance_of_selection(selected, mtx, strategy, x, y, job['config'])
+            paths += _write_figure(fig, os.path.join(out_dir, name), job['figure_formats'])
+        for i, segment_conf in enumerate(job['segments']):
+            segments = gen_seg_list(df, x, y, segment_conf)
+            table, _ = statistics_best_perf_of_selection(selected, x, y, mtx, strategy, len(algs), segments)
+            paths += _write_table(table, os.path.join(out_dir, '{}_segments{}'.format(name, i)), job['table_formats'])
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Performance Explorer: generate figures and segmented statistics tables in batch.')
+    parser.add_argument('inputs', nargs='+', help='performance files (csv, excel, parquet or arrow), multiple files are concatenated')
+    parser.add_argument('--mtx', required=True, help='matrix name column')
+    parser.add_argument('--strategy', required=True, help='algorithm column')
+    parser.add_argument('--x', required=True, help='x axis column')
+    parser.add_argument('--y', required=True, help='y axis column')
+    parser.add_argument('--drop', default=None, help='drop tag column: records with a positive value are dropped')
+    parser.add_argument('--pair', nargs=2, action='append', default=[], metavar=('ALG1', 'ALG2'), help='algorithm pair for a speedup report (repeatable)')
+    parser.add_argument('--perf', nargs='+', action='append', default=[], metavar='ALG', help='algorithms for a performance report (repeatable)')
+    parser.add_argument('--reducer', default=DEFAULT_REDUCER, choices=[r[0] for r in REDUCERS], help='reducer of repeated runs of the same matrix and algorithm')
+    parser.add_argument('--segments', action='append', default=[], help='segmentation of x axis, e.g. "1000 10000" (repeatable, one table per segmentation)')
+    parser.add_argument('--output', default='.', help='output directory')
+    parser.add_argument('--table-format', nargs='+', default=['csv'], choices=TABLE_FORMATS)
+    parser.add_argument('--figure-format', nargs='*', default=['pdf'], choices=FIGURE_FORMATS, help='no format for tables only')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+    # plot style
+    parser.add_argument('--color', default='rgba(0,100,80, 0.75)')
+    parser.add_argument('--font-color', default='#000000')
+    parser.add_argument('--font-size', type=int, default=18)
+    parser.add_argument('--xaxis-title', default='NNZ')
+    parser.add_argument('--yaxis-title', default='FLOPS')
+    parser.add_argument('--hide-legend', action='store_true')
+    parser.add_argument('--legend-title', default='Algorithms')
+    parser.add_argument('--width', type=int, default=1200)
+    parser.add_argument('--height', type=int, default=600)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.pair and not args.perf:
+        raise SystemExit('nothing to do: give at least one --pair or --perf')
+    os.makedirs(args.output, exist_ok=True)
+    config = PlotConfig(args.color, args.font_color, args.font_size, args.xaxis_title, args.yaxis_title, not args.hide_legend,
+        args.legend_title, args.width, args.height)
+    common = dict(mtx=args.mtx, strategy=args.strategy, x=args.x, y=args.y, drop=args.drop, reducer=args.reducer, segments=args.segments or [''],
+        output=args.output, table_formats=args.table_format, figure_formats=args.figure_format, config=config)
+    jobs = [dict(type='speedup', algorithms=pair, **common) for pair in args.pair]
+    jobs += [dict(type='perf', algorithms=algs, **common) for algs in args.perf]
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(jobs))), initializer=_load_worker_dataset, initargs=(args.inputs,)) as pool:
+        futures = {pool.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                for path in future.result():
+                    print(path)
+            except Exception as e:
+                failed += 1
+                print('{} report of {} failed: {}'.format(job['type'], job['algorithms'], e))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
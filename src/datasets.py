@@ -0,0 +1,456 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from schema import normalize_schema
+from instrumentation import stage
+from shared_store import shared_store
+from settings import SERVER_DATA_DIR, server_data_files
+
+try:
+    import pyarrow.feather as feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional: without it, Parquet/Arrow files and the Arrow cache are not supported.
+    feather = None
+
+# upper bound of the memory (in bytes) used by the parsed datasets kept in the cache.
+DATASET_CACHE_MAX_BYTES = int(os.environ.get('PERF_EXPLORER_CACHE_BYTES', 2 * 1024 ** 3))
+
+# max number of threads for parsing multiple uploaded files.
+PARSE_WORKERS = os.cpu_count() or 1
+
+# when multiple files are uploaded, this column records the file each row comes from.
+SOURCE_FILE_COLUMN = 'source_file'
+
+# each parsed dataset is persisted once into this directory as an uncompressed Arrow IPC (Feather v2) file,
+# later sessions memory-map the file and only read the columns in use.
+ARROW_CACHE_DIR = os.environ.get('PERF_EXPLORER_ARROW_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'performance-explorer', 'arrow'))
+
+# upper bound (in bytes) of the files of the Arrow cache directory: the least recently used files are removed above it.
+# The files registered by register_path are links, they only count for the size of the link.
+ARROW_CACHE_MAX_BYTES = int(os.environ.get('PERF_EXPLORER_ARROW_CACHE_BYTES', 20 * 1024 ** 3))
+
+logger = logging.getLogger(__name__)
+
+# the ids of the datasets: a blake2b digest (see gen_dataset_id and register_path), or a version of the followed directory
+# (see LiveSource.dataset_id). The ids sent back by the page are checked against it before touching the cache directories.
+_DATASET_ID_PATTERN = re.compile('^(?:[0-9a-f]{32}|live-[0-9a-f]{16}-[0-9]+)$')
+
+
+# return True if dataset_id has the form of a dataset id.
+def is_dataset_id(dataset_id):
+    return isinstance(dataset_id, str) and _DATASET_ID_PATTERN.match(dataset_id) is not None
+
+
+# read a performance file (csv, excel, parquet or arrow) from a path or a binary buffer, and return dataframe.
+def read_data_file(source, filename: str):
+    if filename.endswith('.parquet'):
+        return pd.read_parquet(source)
+    elif filename.endswith(('.feather', '.arrow', '.ipc')):
+        return pd.read_feather(source)
+    elif 'csv' in filename:
+        return pd.read_csv(source)
+    elif 'xls' in filename:
+        return pd.read_excel(source)
+    raise ValueError('unsupported file type: ' + filename)
+
+
+# decode the content of a file uploaded by the page (a base64 data url).
+def decode_contents(contents: str):
+    content_type, content_string = contents.split(',')
+    with stage('base64 decode'):
+        return base64.b64decode(content_string)
+
+
+# parse the uploaded performance file (its data url, or its decoded bytes) and return dataframe.
+# return None if the file can not be parsed.
+def parse_contents(contents, filename, date):
+    decoded = contents if isinstance(contents, bytes) else decode_contents(contents)
+    try:
+        with stage('parse'):
+            df = read_data_file(io.BytesIO(decoded), filename)
+    except Exception as e:
+        logger.warning('can not parse %s: %s', filename, e)
+        return None
+    return df
+
+
+# the hash of an uploaded file, to be updated with the bytes of the file (see gen_dataset_id).
+def dataset_hash(filename: str):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(filename.encode('utf-8'))
+    h.update(b'\0')
+    return h
+
+
+# the dataset id is computed from the file name and the bytes of the file (decoded, see decode_contents),
+# thus the same file uploaded twice (or by two users, or by a chunked upload) shares one parsed dataset.
+def gen_dataset_id(decoded: bytes, filename: str):
+    h = dataset_hash(filename)
+    h.update(decoded)
+    return h.hexdigest()
+
+
+# generate the id of a dataset merged from multiple files from the ids of the files.
+def gen_merged_dataset_id(file_ids: [str]):
+    h = hashlib.blake2b(digest_size=16)
+    for file_id in file_ids:
+        h.update(file_id.encode('ascii'))
+    return h.hexdigest()
+
+
+# make the columns of the dataframes from different files compatible before concatenating them:
+# if a column is numeric in some files but not in others (e.g. a counter column written as text),
+# convert it to numeric in all files if possible.
+# Columns missing in some files are filled with NaN by the concatenation.
+def reconcile_schemas(frames: [pd.DataFrame]):
+    columns = []
+    for df in frames:
+        columns.extend(c for c in df.columns if c not in columns)
+    for col in columns:
+        parts = [df for df in frames if col in df.columns]
+        is_numeric = [pd.api.types.is_numeric_dtype(df[col]) for df in parts]
+        if not any(is_numeric) or all(is_numeric):
+            continue
+        try:
+            converted = [df[col] if numeric else pd.to_numeric(df[col]) for df, numeric in zip(parts, is_numeric)]
+        except (ValueError, TypeError):
+            continue  # keep the text values, the column becomes an object column after concatenating.
+        for df, values in zip(parts, converted):
+            df[col] = values
+    return frames
+
+
+# concatenate the dataframes parsed from multiple files into one dataframe,
+# with a column recording the source file of each row.
+def concat_datasets(frames: [pd.DataFrame], list_of_names: [str]):
+    for df, filename in zip(frames, list_of_names):
+        if SOURCE_FILE_COLUMN not in df.columns:
+            df[SOURCE_FILE_COLUMN] = filename
+    return pd.concat(reconcile_schemas(frames), ignore_index=True, sort=False)
+
+
+# parse multiple files concurrently and concatenate them into one dataframe.
+# return None if any file can not be parsed.
+def parse_multiple_contents(list_of_contents, list_of_names, list_of_dates):
+    workers = max(1, min(PARSE_WORKERS, len(list_of_contents)))
+    # the C parser of pandas releases the GIL, thus the files are parsed in parallel by threads.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(parse_contents, list_of_contents, list_of_names, list_of_dates))
+    if any(df is None for df in frames):
+        return None
+    return concat_datasets(frames, list_of_names)
+
+
+# read performance files from disk (concurrently if there are multiple files) and return one normalized dataframe.
+def read_data_files(paths: [str]):
+    if len(paths) == 1:
+        df = read_data_file(paths[0], paths[0])
+    else:
+        workers = max(1, min(PARSE_WORKERS, len(paths)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(read_data_file, paths, paths))
+        df = concat_datasets(frames, [os.path.basename(p) for p in paths])
+    return normalize_schema(df)[0]
+
+
+# Process-wide LRU cache of parsed dataframes, bounded by the memory of the cached dataframes.
+# on_evict(dataset_id) is called for each evicted dataset.
+class DatasetCache:
+    def __init__(self, max_bytes: int, on_evict=None):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.on_evict = on_evict
+        self._entries = OrderedDict()  # dataset id -> (dataframe, bytes)
+        self._lock = threading.Lock()
+
+    def get(self, dataset_id: str):
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(dataset_id)
+            return entry[0]
+
+    # nbytes: the memory of the dataframe counted in the cache (default: all its memory).
+    def put(self, dataset_id: str, df: pd.DataFrame, nbytes: int = None):
+        if nbytes is None:
+            nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            if dataset_id in self._entries:
+                self.total_bytes -= self._entries.pop(dataset_id)[1]
+            self._entries[dataset_id] = (df, nbytes)
+            self.total_bytes += nbytes
+            # evict the least recently used datasets, but always keep the newest one.
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted_id, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+                if self.on_evict is not None:
+                    self.on_evict(evicted_id)
+
+    def __contains__(self, dataset_id: str):
+        with self._lock:
+            return dataset_id in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# memory usage (in bytes) of the datasets parsed in this process, before and after normalizing their schema.
+# The report of a dataset is kept as long as the dataset is in the memory cache.
+schema_reports = {}
+
+
+# a dataset evicted from the memory cache: its schema report is dropped, and its reference to the shared store is released.
+def _evict_dataset(dataset_id: str):
+    schema_reports.pop(dataset_id, None)
+    if shared_store is not None:
+        shared_store.release(dataset_id)
+
+
+dataset_cache = DatasetCache(DATASET_CACHE_MAX_BYTES, _evict_dataset)
+
+
+def arrow_cache_path(dataset_id: str):
+    if not is_dataset_id(dataset_id):
+        raise ValueError('invalid dataset id')
+    return os.path.join(ARROW_CACHE_DIR, dataset_id + '.arrow')
+
+
+# return True if the dataset has been persisted into the Arrow cache directory.
+def in_arrow_cache(dataset_id: str):
+    return feather is not None and is_dataset_id(dataset_id) and os.path.exists(arrow_cache_path(dataset_id))
+
+
+# the columnar file of a dataset on disk: its Arrow cache file, or the Parquet/Arrow file registered by register_path.
+# The modification time of the file (or of the link) is updated, it orders the files by last use (see trim_arrow_cache).
+# return None if the dataset has no file (or pyarrow is not available).
+def dataset_file(dataset_id: str):
+    if feather is None or not is_dataset_id(dataset_id):
+        return None
+    for suffix in ('.arrow', '.parquet'):
+        path = os.path.join(ARROW_CACHE_DIR, dataset_id + suffix)
+        if os.path.exists(path):
+            try:
+                os.utime(path, follow_symlinks=False)
+            except OSError:  # removed by trim_arrow_cache of another process, or a read-only directory.
+                pass
+            return path
+    return None
+
+
+# remove the least recently used files of the Arrow cache directory (by modification time, see dataset_file)
+# until the files fit in ARROW_CACHE_MAX_BYTES. The file of keep_id (e.g. the dataset just persisted) is kept.
+# A removed dataset stays usable while it is in the memory cache, then the page asks to upload it again.
+def trim_arrow_cache(keep_id: str = None):
+    files = []
+    try:
+        with os.scandir(ARROW_CACHE_DIR) as entries:
+            for entry in entries:
+                name, suffix = os.path.splitext(entry.name)
+                if suffix in ('.arrow', '.parquet') and is_dataset_id(name):
+                    st = entry.stat(follow_symlinks=False)
+                    files.append((st.st_mtime, st.st_size, entry.path, name))
+    except FileNotFoundError:
+        return
+    total = sum(size for _, size, _, _ in files)
+    for _, size, path, name in sorted(files):
+        if total <= ARROW_CACHE_MAX_BYTES:
+            break
+        if name == keep_id:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # removed by another process
+            pass
+        total -= size
+
+
+# read the columns (default: all) of a dataset file (see dataset_file), an Arrow file is memory-mapped.
+def read_dataset_file(path: str, columns: [str] = None):
+    if path.endswith('.parquet'):
+        return pyarrow.parquet.read_table(path, columns=columns).to_pandas()
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+# register a Parquet or Arrow file of the server as a dataset, without reading it: the file is linked into the
+# Arrow cache directory and is read in place, thus a dataset larger than the memory can be analysed by an
+# out-of-core backend (see backends.py). Return the dataset id, or None if the file type is not supported.
+def register_path(path: str):
+    path = os.path.abspath(path)
+    if path.endswith('.parquet'):
+        suffix = '.parquet'
+    elif path.endswith(('.feather', '.arrow', '.ipc')):
+        suffix = '.arrow'
+    else:
+        return None
+    if feather is None or not os.path.isfile(path):
+        return None
+    st = os.stat(path)
+    dataset_id = hashlib.blake2b('{}:{}:{}'.format(path, st.st_size, st.st_mtime_ns).encode('utf-8'), digest_size=16).hexdigest()
+    link = os.path.join(ARROW_CACHE_DIR, dataset_id + suffix)
+    if not os.path.exists(link):
+        os.makedirs(ARROW_CACHE_DIR, exist_ok=True)
+        tmp_link = '{}.{}.tmp'.format(link, os.getpid())
+        os.symlink(path, tmp_link)
+        os.replace(tmp_link, link)
+        trim_arrow_cache(dataset_id)
+    return dataset_id
+
+
+# write the dataframe into the Arrow cache directory (if pyarrow is available).
+def persist_dataset(dataset_id: str, df: pd.DataFrame):
+    if feather is None or in_arrow_cache(dataset_id):
+        return
+    path = arrow_cache_path(dataset_id)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        os.makedirs(ARROW_CACHE_DIR, exist_ok=True)
+        # uncompressed, thus the file can be memory-mapped without decoding.
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except Exception as e:  # e.g. an object column of mixed types, the dataset is still usable from the memory cache.
+        logger.warning('can not persist dataset %s: %s', dataset_id, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    trim_arrow_cache(dataset_id)
+
+
+# memory (in bytes) of a dataframe mapped from the shared store which is private to this process: its text columns.
+def private_bytes(df: pd.DataFrame):
+    return int(sum(df[col].memory_usage(index=False, deep=True) for col in df.columns if df[col].dtype == object))
+
+
+# keep a dataframe in the memory cache: in the shared store (if enabled) and mapped from it,
+# thus the worker processes share one copy of the dataset.
+def cache_dataset(dataset_id: str, df: pd.DataFrame):
+    if shared_store is not None:
+        with stage('share'):
+            shared = shared_store.put(dataset_id, df)
+        if shared is not None:
+            dataset_cache.put(dataset_id, shared, private_bytes(shared))
+            return shared
+    dataset_cache.put(dataset_id, df)
+    return df
+
+
+# normalize the schema of a parsed dataset, keep it in the memory cache and persist it into the Arrow cache directory.
+def store_dataset(dataset_id: str, df: pd.DataFrame):
+    with stage('normalize schema'):
+        df, schema_reports[dataset_id] = normalize_schema(df)
+    df = cache_dataset(dataset_id, df)
+    with stage('persist'):
+        persist_dataset(dataset_id, df)
+
+
+# return True if the dataset is kept by this process, the shared store or the Arrow cache directory.
+def is_registered(dataset_id: str):
+    if not is_dataset_id(dataset_id):
+        return False
+    return dataset_id in dataset_cache or (shared_store is not None and dataset_id in shared_store) or dataset_file(dataset_id) is not None
+
+
+# parse the uploaded file (if it is not parsed before) and return its dataset id.
+# return None if the file can not be parsed.
+def register_upload(contents, filename, date):
+    decoded = decode_contents(contents)
+    dataset_id = gen_dataset_id(decoded, filename)
+    if is_registered(dataset_id):
+        return dataset_id
+    df = parse_contents(decoded, filename, date)
+    if df is None:
+        return None
+    store_dataset(dataset_id, df)
+    return dataset_id
+
+
+# parse the uploaded files (if they are not parsed before) and return the id of the dataset merged from them.
+# return None if any file can not be parsed.
+def register_uploads(list_of_contents, list_of_names, list_of_dates):
+    if len(list_of_contents) == 1:
+        return register_upload(list_of_contents[0], list_of_names[0], list_of_dates[0])
+    decoded = [decode_contents(c) for c in list_of_contents]
+    dataset_id = gen_merged_dataset_id([gen_dataset_id(d, n) for d, n in zip(decoded, list_of_names)])
+    if is_registered(dataset_id):
+        return dataset_id
+    df = parse_multiple_contents(decoded, list_of_names, list_of_dates)
+    if df is None:
+        return None
+    store_dataset(dataset_id, df)
+    return dataset_id
+
+
+# get the column names of a dataset, without loading the dataset from the Arrow cache.
+# return None if the dataset is unknown.
+def dataset_columns(dataset_id):
+    if not is_dataset_id(dataset_id):
+        return None
+    df = dataset_cache.get(dataset_id)
+    if df is None and shared_store is not None:
+        df = load_dataset(dataset_id)
+    if df is not None:
+        return df.columns.tolist()
+    path = dataset_file(dataset_id)
+    if path is not None and path.endswith('.parquet'):
+        return pyarrow.parquet.read_schema(path).names
+    if path is not None:
+        with pyarrow.memory_map(path) as source:
+            return pyarrow.ipc.open_file(source).schema.names
+    return None
+
+
+# get the parsed dataframe of a dataset id.
+# If columns are given, the returned dataframe contains at least these columns:
+# a dataset that is not in the memory cache is loaded by memory-mapping its Arrow cache file and only reading these columns,
+# or mapped from the shared store (if enabled) with all its columns.
+# The dataset is loaded in memory, see backends.py for analysing a dataset in place.
+# return None if the dataset is unknown (or the id is not a dataset id) or has been evicted from the caches.
+def load_dataset(dataset_id, columns: [str] = None):
+    if not is_dataset_id(dataset_id):
+        return None
+    df = dataset_cache.get(dataset_id)
+    if df is not None:
+        return df
+    if shared_store is not None:
+        return load_shared_dataset(dataset_id)
+    path = dataset_file(dataset_id)
+    if path is None:
+        return None
+    if columns is None:
+        cache_key = dataset_id
+    else:
+        columns = sorted(set(columns) & set(dataset_columns(dataset_id)))
+        cache_key = dataset_id + '[' + ','.join(columns) + ']'
+        df = dataset_cache.get(cache_key)
+        if df is not None:
+            return df
+    with stage('load arrow'):
+        df = read_dataset_file(path, columns)
+    dataset_cache.put(cache_key, df)
+    return df
+
+
+# map a dataset from the shared store. A dataset which is not in the store (e.g. evicted) is loaded from the Arrow cache
+# directory into the store, with all its columns, thus the other worker processes map it without loading it again.
+def load_shared_dataset(dataset_id):
+    df = shared_store.get(dataset_id)
+    if df is not None:
+        dataset_cache.put(dataset_id, df, private_bytes(df))
+        return df
+    path = dataset_file(dataset_id)
+    if path is None:
+        return None
+    with stage('load arrow'):
+        df = read_dataset_file(path)
+    return cache_dataset(dataset_id, df)
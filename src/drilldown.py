@@ -0,0 +1,194 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from dash.dash_table.Format import Format, Scheme
+
+from segment_statistics import pair_speedup
+from pairwise_speedup import cached_strategy_pivot
+from selection import SelectionCache, selection_cache
+from repetitions import DEFAULT_REDUCER
+from instrumentation import stage
+
+# a filter expression of the DataTable (one part of its filter_query, the parts are joined by '&&'),
+# e.g. `{speedup} < 1`, `{best} contains csr` or `{x} s>= 1e5` (with the case prefix of filter_options).
+_FILTER_PART_PATTERN = re.compile(r'^\s*\{(?P<column>[^}]+)\}\s+[si]?(?P<operator>>=|<=|!=|<|>|=|ge|le|lt|gt|ne|eq|contains|datestartswith)\s+(?P<value>.+?)\s*$')
+
+_FILTER_OPERATORS = {'ge': '>=', 'le': '<=', 'lt': '<', 'gt': '>', 'ne': '!=', 'eq': '='}
+
+_number = Format(precision=4, scheme=Scheme.fixed)
+
+# number of filtered and sorted row lists kept by each drill-down table, thus paging through them does not filter again.
+DRILLDOWN_ROWS_ENTRIES = 4
+
+
+# Per-matrix rows behind the speedup or the performance plot, sorted by x, for the drill-down table.
+# Paging, sorting and filtering run on the server (see rows and page), thus only the shown page is sent to the browser.
+class DrillDownTable:
+    def __init__(self, frame: pd.DataFrame, columns: [dict]):
+        self.frame = frame  # columns: mtx, x, y_a, y_b, speedup, best (and second for the performance plot), sorted by x.
+        self.columns = columns  # column definitions of the DataTable.
+        self.x = frame['x'].to_numpy(dtype=np.float64)
+        self._rows = SelectionCache(DRILLDOWN_ROWS_ENTRIES)
+
+    # the rows of the x range, filtered and sorted (see rows), cached while paging through them.
+    def cached_rows(self, x_range, filter_query: str, sort_by: [dict]):
+        sort_by = self.sort_keys(sort_by)
+        key = (None if x_range == None else tuple(x_range), filter_query if isinstance(filter_query, str) else '', tuple(sort_by))
+        with stage('drill-down filter'):
+            return self._rows.get_or_compute(key, lambda: self.rows(x_range, filter_query, sort_by))
+
+    # the (column, ascending) of the sort_by property of the DataTable, the unknown columns and invalid entries are ignored.
+    def sort_keys(self, sort_by: [dict]):
+        if not isinstance(sort_by, list):
+            return []
+        return [(s['column_id'], s.get('direction') != 'desc') for s in sort_by
+            if isinstance(s, dict) and isinstance(s.get('column_id'), str) and s['column_id'] in self.frame.columns]
+
+    # positions of the rows in the x range (an unbounded range if x_range is None) which match the filter query,
+    # in the order of sort_by (see sort_keys), the rows are in x order if sort_by is empty.
+    # x_range is (start, end, include_end): a segment does not include its end, a box/lasso selection does.
+    def rows(self, x_range, filter_query: str, sort_by: [tuple]):
+        lo, hi = 0, len(self.x)
+        if x_range != None:
+            lo = np.searchsorted(self.x, x_range[0], side='left')
+            hi = max(lo, np.searchsorted(self.x, x_range[1], side='right' if x_range[2] else 'left'))
+        view = self.frame.iloc[lo:hi]
+        mask = np.ones(len(view), dtype=bool)
+        for column, operator, value in parse_filter_query(filter_query):
+            if column in view.columns:
+                mask &= _filter_mask(view[column], operator, value)
+        positions = np.arange(lo, hi)[mask]
+
+        if len(sort_by) > 0:
+            view = self.frame.iloc[positions]
+            order = view.reset_index(drop=True).sort_values(by=[column for column, _ in sort_by],
+                ascending=[ascending for _, ascending in sort_by], kind='stable', na_position='last').index.to_numpy()
+            positions = positions[order]
+        return positions
+
+    # the records of the rows at the positions of one page.
+    def page(self, positions, page_current: int, page_size: int):
+        start = page_current * page_size
+        return self.frame.iloc[positions[start:start + page_size]].to_dict('records')
+
+
+# split a filter query of the DataTable into (column, operator, value) expressions, invalid parts are ignored.
+def parse_filter_query(filter_query: str):
+    expressions = []
+    if not isinstance(filter_query, str):
+        return expressions
+    for part in filter_query.split(' && '):
+        m = _FILTER_PART_PATTERN.match(part)
+        if m is None:
+            continue
+        value = m.group('value')
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1]
+        expressions.append((m.group('column'), _FILTER_OPERATORS.get(m.group('operator'), m.group('operator')), value))
+    return expressions
+
+
+def _filter_mask(values: pd.Series, operator: str, value: str):
+    if operator in ('contains', 'datestartswith'):
+        text = values.astype(str)
+        return (text.str.contains(value, regex=False) if operator == 'contains' else text.str.startswith(value)).to_numpy()
+    if pd.api.types.is_numeric_dtype(values):
+        try:
+            value = float(value)
+        except ValueError:
+            return np.zeros(len(values), dtype=bool)
+        values = values.to_numpy(dtype=np.float64)
+    else:
+        values = values.astype(str).to_numpy()
+    if operator == '=':
+        return values == value
+    if operator == '!=':
+        return values != value
+    if operator == '<':
+        return values < value
+    if operator == '<=':
+        return values <= value
+    if operator == '>':
+        return values > value
+    return values >= value
+
+
+# drill-down rows of the speedup plot: the merged records of 2 algorithms (sorted by x, see cached_algorithm_pair),
+# with the speedup of a over b and the better algorithm of each matrix.
+def speedup_drilldown(sorted_merged_data, alg_a: str, alg_b: str, mtx_column: str, x_column: str, y_column: str):
+    y_a = sorted_merged_data[y_column + '_x'].to_numpy(dtype=np.float64)
+    y_b = sorted_merged_data[y_column + '_y'].to_numpy(dtype=np.float64)
+    best = np.where(np.isnan(y_a) & np.isnan(y_b), None, np.where(np.isnan(y_b) | (y_a >= y_b), alg_a, alg_b))
+    frame = pd.DataFrame({
+        'mtx': sorted_merged_data[mtx_column].to_numpy(),
+        'x': sorted_merged_data[x_column + '_x'].to_numpy(),
+        'y_a': y_a,
+        'y_b': y_b,
+        'speedup': pair_speedup(sorted_merged_data, y_column),
+        'best': best,
+    })
+    columns = [
+        dict(id='mtx', name=mtx_column),
+        dict(id='x', name=x_column, type='numeric'),
+        dict(id='y_a', name='{} ({})'.format(y_column, alg_a), type='numeric', format=_number),
+        dict(id='y_b', name='{} ({})'.format(y_column, alg_b), type='numeric', format=_number),
+        dict(id='speedup', name='Speedup ({} / {})'.format(alg_a, alg_b), type='numeric', format=_number),
+        dict(id='best', name='Best'),
+    ]
+    return DrillDownTable(frame, columns)
+
+
+# drill-down rows of the performance plot: the best and the runner-up strategies of each matrix, from the pivot of the
+# selected strategies (see StrategyPivot), with the speedup of the best over the runner-up.
+def perf_drilldown(pivot, mtx_column: str, x_column: str, y_column: str):
+    n, k = pivot.y.shape
+    order = np.argsort(np.where(np.isnan(pivot.y), np.inf, -pivot.y), axis=1, kind='stable')  # descending y, NaN last.
+    rows = np.arange(n)
+    strategies = np.asarray(pivot.strategies + [None], dtype=object)
+    y = np.concatenate([pivot.y, np.full((n, 1), np.nan)], axis=1)
+    first = order[:, 0] if k > 0 else np.full(n, k)
+    second = order[:, 1] if k > 1 else np.full(n, k)
+    # a strategy without y value on the matrix is neither the best nor the runner-up.
+    first = np.where(np.isnan(y[rows, first]), k, first)
+    second = np.where(np.isnan(y[rows, second]), k, second)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speedup = y[rows, first] / y[rows, second]
+
+    by_x = np.argsort(pivot.x, kind='stable')
+    frame = pd.DataFrame({
+        'mtx': pivot.mtx_names[by_x],
+        'x': pivot.x[by_x],
+        'best': strategies[first[by_x]],
+        'y_a': y[rows, first][by_x],
+        'second': strategies[second[by_x]],
+        'y_b': y[rows, second][by_x],
+        'speedup': speedup[by_x],
+    })
+    columns = [
+        dict(id='mtx', name=mtx_column),
+        dict(id='x', name=x_column, type='numeric'),
+        dict(id='best', name='Best'),
+        dict(id='y_a', name='{} (best)'.format(y_column), type='numeric', format=_number),
+        dict(id='second', name='Runner-up'),
+        dict(id='y_b', name='{} (runner-up)'.format(y_column), type='numeric', format=_number),
+        dict(id='speedup', name='Speedup (best / runner-up)', type='numeric', format=_number),
+    ]
+    return DrillDownTable(frame, columns)
+
+
+# the drill-down tables of a dataset are built from the selections of its backend (see backends.py).
+def cached_speedup_drilldown(backend, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    key = ('speedup-drilldown', backend.dataset_id, alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+    return selection_cache.get_or_compute(key, lambda: speedup_drilldown(
+        backend.algorithm_pair(alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer),
+        alg_a, alg_b, mtx_column, x_column, y_column))
+
+
+def cached_perf_drilldown(backend, mtx_column: str, alg_column: str, x_column: str, y_column: str, selected_algs: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    key = ('perf-drilldown', backend.dataset_id, mtx_column, alg_column, x_column, y_column, tuple(selected_algs), drop_rows_by_col_value, reducer)
+    return selection_cache.get_or_compute(key, lambda: perf_drilldown(
+        cached_strategy_pivot(backend, mtx_column, alg_column, x_column, y_column, selected_algs, drop_rows_by_col_value, reducer),
+        mtx_column, x_column, y_column))
+
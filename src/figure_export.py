@@ -0,0 +1,124 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from instrumentation import stage, record_value
+
+# number of long-lived worker processes running kaleido.
+EXPORT_WORKERS = int(os.environ.get('PERF_EXPLORER_EXPORT_WORKERS', 2))
+
+# upper bound of the memory (in bytes) used by the exported images kept in the cache.
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('PERF_EXPLORER_EXPORT_CACHE_BYTES', 256 * 1024 ** 2))
+
+
+def _init_export_worker():
+    import plotly.io as pio
+    pio.kaleido.scope.mathjax = None
+
+
+# convert the figure (in json) to image bytes, running in the worker process.
+def _figure_to_image(fig_json: str, fmt: str):
+    import plotly.io as pio
+    return pio.to_image(json.loads(fig_json), format=fmt, validate=False)
+
+
+# generate the cache key of an exported figure from the dataset id and the plot parameters (json serializable).
+def export_key(dataset_id: str, fmt: str, **plot_params):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([dataset_id, fmt, plot_params], sort_keys=True, default=str).encode('utf-8'))
+    return h.hexdigest()
+
+
+# Export figures to images by a pool of kaleido worker processes, and cache the exported images.
+# Concurrent requests of the same image wait for one export.
+class FigureExporter:
+    def __init__(self, workers: int, max_bytes: int):
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._pool = None
+        self._images = OrderedDict()  # key -> image bytes
+        self._pending = {}  # key -> future of an export in progress
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        # created on the first export: kaleido is started only if a download is requested.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_export_worker)
+        return self._pool
+
+    # submit the export of a figure, return its future and the pool running it. A broken pool (one of its worker
+    # processes died, e.g. kaleido crashed or was killed) is replaced by a new pool.
+    def _submit(self, fig_json: str, fmt: str):
+        pool = self._get_pool()
+        try:
+            return pool.submit(_figure_to_image, fig_json, fmt), pool
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            pool = self._get_pool()
+            return pool.submit(_figure_to_image, fig_json, fmt), pool
+
+    # shut down a broken pool, the next export creates a new one.
+    def _discard_pool(self, pool):
+        if self._pool is pool:
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # return the image of the figure, build_figure is called to build the figure only if the image is not cached.
+    def export(self, key: str, build_figure, fmt: str = 'pdf'):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+            future = self._pending.get(key)
+        if future is not None:
+            return future.result()
+
+        fig = build_figure()
+        with stage('json serialization'):
+            fig_json = fig.to_json()
+        with self._lock:
+            future, pool = self._pending.get(key), None
+            if future is None:
+                future, pool = self._submit(fig_json, fmt)
+                self._pending[key] = future
+        try:
+            with stage('kaleido export'):
+                try:
+                    image = future.result()
+                except BrokenProcessPool:
+                    # the worker process died during the export: export it once more, by a new pool.
+                    with self._lock:
+                        if pool is not None:
+                            self._discard_pool(pool)
+                        retry = self._pending.get(key)
+                        if retry is None or retry is future:  # not retried yet by another caller
+                            retry, pool = self._submit(fig_json, fmt)
+                            self._pending[key] = retry
+                    image = retry.result()
+            record_value('image_bytes', len(image))
+            self._put(key, image)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        return image
+
+    def _put(self, key: str, image: bytes):
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = image
+            self.total_bytes += len(image)
+            while self.total_bytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+
+figure_exporter = FigureExporter(EXPORT_WORKERS, EXPORT_CACHE_MAX_BYTES)
@@ -0,0 +1,129 @@
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from plotly.io.json import to_json_plotly
+
+# set PERF_EXPLORER_PROFILE=1 to record the wall time and the peak memory of each stage of each callback.
+# Recording the memory (by tracemalloc) slows down the analysis, thus it is disabled by default.
+PROFILE_ENABLED = os.environ.get('PERF_EXPLORER_PROFILE', '') not in ('', '0')
+
+# number of recent callback invocations kept for the debug panel and the metrics endpoint.
+PROFILE_HISTORY = int(os.environ.get('PERF_EXPLORER_PROFILE_HISTORY', 200))
+
+# the record of the callback invocation running in the current context, None outside of an instrumented callback.
+_current_invocation = contextvars.ContextVar('current_invocation', default=None)
+
+_records = deque(maxlen=PROFILE_HISTORY)
+_records_lock = threading.Lock()
+
+
+# Record of one callback invocation: the stages (in order of completion) and the recorded values (e.g. payload sizes).
+class InvocationRecord:
+    def __init__(self, callback: str):
+        self.callback = callback
+        self.start = time.time()
+        self.wall = None
+        self.error = None
+        self.stages = []  # dicts of name, wall (seconds) and peak (bytes allocated above the memory at the start of the stage)
+        self.values = {}
+        self._open_stages = []  # [stage start memory, peak memory seen] of the running (nested) stages
+
+    def to_dict(self):
+        return dict(callback=self.callback, start=self.start, wall=self.wall, error=self.error, stages=self.stages, values=self.values)
+
+
+# measure the wall time and the peak memory of a stage of the current callback invocation, used as `with stage(name):`.
+# It does nothing outside of an instrumented callback (e.g. in the command-line batch mode).
+# note: tracemalloc is process-wide, the memory of concurrent callbacks (in other threads) is also counted.
+@contextlib.contextmanager
+def stage(name: str):
+    record = _current_invocation.get()
+    if record is None:
+        yield
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    # the peak of the outer stages is kept before resetting the peak for this stage.
+    for frame in record._open_stages:
+        frame[1] = max(frame[1], peak)
+    tracemalloc.reset_peak()
+    record._open_stages.append([current, current])
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start
+        start_memory, peak_seen = record._open_stages.pop()
+        peak = max(peak_seen, tracemalloc.get_traced_memory()[1])
+        for frame in record._open_stages:
+            frame[1] = max(frame[1], peak)
+        record.stages.append(dict(name=name, wall=wall, peak=max(0, peak - start_memory)))
+
+
+# record a value (e.g. a payload size in bytes) of the current callback invocation.
+def record_value(name: str, value):
+    record = _current_invocation.get()
+    if record is not None:
+        record.values[name] = value
+
+
+# decorator of a dash callback: record the stages of each invocation, and the size of the json response.
+# It returns the callback itself if profiling is disabled.
+def instrumented_callback(func):
+    if not PROFILE_ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        record = InvocationRecord(func.__name__)
+        token = _current_invocation.set(record)
+        start = time.perf_counter()
+        try:
+            with stage('callback'):
+                result = func(*args, **kwargs)
+            # the response is serialized by dash after the callback, it is serialized here once more for its size.
+            with stage('json serialization'):
+                record_value('payload_bytes', len(to_json_plotly(result)))
+            return result
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            record.wall = time.perf_counter() - start
+            _current_invocation.reset(token)
+            with _records_lock:
+                _records.append(record)
+    return wrapper
+
+
+# the recent callback invocations, the latest first.
+def recent_invocations(limit: int = None):
+    with _records_lock:
+        records = list(_records)
+    records.reverse()
+    return [r.to_dict() for r in records[:limit]]
+
+
+# aggregated wall time and peak memory of each callback and each stage in the recent invocations.
+def metrics_summary():
+    callbacks = {}
+    for r in recent_invocations():
+        entry = callbacks.setdefault(r['callback'], dict(count=0, errors=0, wall_total=0.0, wall_max=0.0, stages={}))
+        entry['count'] += 1
+        entry['errors'] += r['error'] is not None
+        entry['wall_total'] += r['wall']
+        entry['wall_max'] = max(entry['wall_max'], r['wall'])
+        for s in r['stages']:
+            stage_entry = entry['stages'].setdefault(s['name'], dict(count=0, wall_total=0.0, wall_max=0.0, peak_max=0))
+            stage_entry['count'] += 1
+            stage_entry['wall_total'] += s['wall']
+            stage_entry['wall_max'] = max(stage_entry['wall_max'], s['wall'])
+            stage_entry['peak_max'] = max(stage_entry['peak_max'], s['peak'])
+    return dict(enabled=PROFILE_ENABLED, history=PROFILE_HISTORY, callbacks=callbacks)
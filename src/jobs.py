@@ -0,0 +1,275 @@
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import re
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# number of analyses running at the same time, the others wait in the queue.
+JOB_WORKERS = int(os.environ.get('PERF_EXPLORER_JOB_WORKERS', os.cpu_count() or 1))
+
+# finished jobs are removed after this time (in seconds), if their results are not fetched.
+JOB_RESULT_TTL = int(os.environ.get('PERF_EXPLORER_JOB_TTL', 600))
+
+# if set (e.g. when serving by several worker processes), the status and the result of each job are written into this
+# directory, thus the page can poll its job from any worker process, and cancel it from any worker process.
+JOB_DIR = os.environ.get('PERF_EXPLORER_JOB_DIR') or None
+
+# the results published into the job directory are signed by this key (shared by all worker processes), a result file
+# whose signature does not match is not unpickled. Without it, a random key is created once in the job directory.
+JOB_SECRET = os.environ.get('PERF_EXPLORER_JOB_SECRET') or None
+
+# the ids of the jobs (see Job), the ids sent back by the page are checked against it before touching the job directory.
+_JOB_ID_PATTERN = re.compile('^[0-9a-f]{32}$')
+
+
+# return True if job_id has the form of a job id.
+def is_job_id(job_id):
+    return isinstance(job_id, str) and _JOB_ID_PATTERN.match(job_id) is not None
+
+
+# the key signing the results of the job directory: JOB_SECRET, or the key file of the directory (created by the first process).
+def job_secret(directory: str):
+    if JOB_SECRET is not None:
+        return JOB_SECRET.encode('utf-8')
+    path = os.path.join(directory, 'secret.key')
+    if not os.path.exists(path):
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(32))
+        try:
+            os.link(tmp_path, path)  # the key file is complete once it exists, a concurrent process keeps its own.
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# raised (by Job.report) in a job which has been cancelled, to stop it at its next step.
+class JobCancelled(Exception):
+    pass
+
+
+# A background job: its status, progress and result.
+# status: 'queued', 'running', 'done', 'failed' or 'cancelled'.
+# If directory is given, the job is published into it: its status as <id>.json, its result as <id>.pickle
+# (signed by secret, see job_secret), and <id>.cancel requests to cancel it.
+class Job:
+    def __init__(self, job_id: str = None, directory: str = None, secret: bytes = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.directory = directory
+        self.secret = secret
+        self.status = 'queued'
+        self.done_steps = 0
+        self.total_steps = 0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.removed = False
+        self._cancelled = threading.Event()
+
+    # report the progress of the job, and stop the job (by raising JobCancelled) if it has been cancelled.
+    # The job can only be stopped between its steps.
+    def report(self, done_steps: int, total_steps: int, message: str = ''):
+        if self.is_cancelled():
+            raise JobCancelled()
+        self.done_steps = done_steps
+        self.total_steps = total_steps
+        self.message = message
+        self.publish()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.directory is not None:
+            open(self._path('.cancel'), 'w').close()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set() or (self.directory is not None and os.path.exists(self._path('.cancel')))
+
+    def is_finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    # finish the job with a final status. The result and the finish time are set and published before the status,
+    # thus a poll which sees the final status also sees the result.
+    def finish(self, status: str, result=None, error: str = None):
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self.publish(status)
+        self.status = status
+
+    def _path(self, suffix: str):
+        return os.path.join(self.directory, self.id + suffix)
+
+    # write the status (and the result of a done job) into the directory of the job, unless the job has been removed.
+    def publish(self, status: str = None):
+        if self.directory is None or self.removed:
+            return
+        status = status or self.status
+        if status == 'done':
+            data = pickle.dumps(self.result, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(self._path('.pickle.tmp'), 'wb') as f:
+                f.write(_sign(self.secret, data))
+                f.write(data)
+            os.replace(self._path('.pickle.tmp'), self._path('.pickle'))
+        state = dict(status=status, done_steps=self.done_steps, total_steps=self.total_steps, message=self.message,
+            error=self.error, finished_at=self.finished_at)
+        with open(self._path('.json.tmp'), 'w') as f:
+            json.dump(state, f)
+        os.replace(self._path('.json.tmp'), self._path('.json'))
+
+    # the job published into the directory (e.g. by another worker process), None if it is unknown
+    # or if its result is not signed by secret.
+    @staticmethod
+    def load(directory: str, job_id: str, secret: bytes):
+        if not is_job_id(job_id):
+            return None
+        job = Job(job_id, directory, secret)
+        if not job._read_state():
+            return None
+        if job.status == 'done':
+            try:
+                with open(job._path('.pickle'), 'rb') as f:
+                    signature, data = f.read(hashlib.sha256().digest_size), f.read()
+                if not hmac.compare_digest(signature, _sign(secret, data)):
+                    return None
+                job.result = pickle.loads(data)
+            except (OSError, ValueError, EOFError):
+                return None
+        return job
+
+    # set the status fields of the job from its published json file, return False if it is missing or malformed.
+    def _read_state(self):
+        try:
+            with open(self._path('.json')) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(state, dict):
+            return False
+        for key in ('status', 'done_steps', 'total_steps', 'message', 'error', 'finished_at'):
+            setattr(self, key, state.get(key))
+        return True
+
+    # remove the published files of the job, the job is not published again.
+    def unpublish(self):
+        self.removed = True
+        if self.directory is None:
+            return
+        for suffix in ('.json', '.pickle', '.cancel'):
+            try:
+                os.remove(self._path(suffix))
+            except FileNotFoundError:
+                pass
+
+
+def _sign(secret: bytes, data: bytes):
+    return hmac.new(secret or b'', data, hashlib.sha256).digest()
+
+
+# Run jobs in a pool of threads of the server process (no broker), thus the jobs share the dataset and selection caches.
+# With a directory, the jobs are published into it (see Job), and the jobs of the other worker processes are read from it.
+class JobManager:
+    def __init__(self, workers: int, result_ttl: int, directory: str = None):
+        self.result_ttl = result_ttl
+        self.directory = directory
+        self.secret = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.secret = job_secret(directory)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}  # job id -> Job
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+
+    # run fn(job, *args) in the background and return the job id.
+    # The job `supersedes` (e.g. the previous job of the same page) is cancelled.
+    def submit(self, fn, *args, supersedes: str = None):
+        self.cancel(supersedes)
+        job = Job(directory=self.directory, secret=self.secret)
+        job.publish()
+        with self._lock:
+            self._evict_finished()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args)
+        return job.id
+
+    def _run(self, job: Job, fn, args):
+        try:
+            if job.is_cancelled():
+                raise JobCancelled()
+            job.status = 'running'
+            job.publish()
+            job.finish('done', fn(job, *args))
+        except JobCancelled:
+            job.finish('cancelled')
+        except Exception as e:
+            traceback.print_exc()
+            job.finish('failed', error=str(e) or type(e).__name__)
+
+    # the job of the id, None if it is unknown (or the id is not a job id).
+    def get(self, job_id: str):
+        if not is_job_id(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.directory is not None:
+            job = Job.load(self.directory, job_id, self.secret)
+        return job
+
+    # cancel a job (if it is not finished), it stops at its next step.
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job is not None and not job.is_finished():
+            job.cancel()
+
+    # remove a finished job after its result is fetched.
+    def remove(self, job_id: str):
+        if not is_job_id(job_id):
+            return
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is None and self.directory is not None:
+            job = Job(job_id, self.directory)
+        if job is not None:
+            job.unpublish()
+
+    def _evict_finished(self):
+        now = time.time()
+        expired = [k for k, job in self._jobs.items() if job.finished_at is not None and now - job.finished_at > self.result_ttl]
+        for k in expired:
+            self._jobs.pop(k).unpublish()
+        self._sweep_directory(now)
+
+    # remove the files of the expired jobs of the other worker processes (or of exited ones) from the job directory,
+    # at most once a minute. The files left without status file (e.g. by a crash) are removed after the same time.
+    def _sweep_directory(self, now: float):
+        if self.directory is None or now - self._swept_at < min(self.result_ttl, 60):
+            return
+        self._swept_at = now
+        for filename in os.listdir(self.directory):
+            job_id = filename.split('.', 1)[0]
+            if not is_job_id(job_id) or job_id in self._jobs:
+                continue
+            job = Job(job_id, self.directory)
+            path = os.path.join(self.directory, filename)
+            try:
+                if filename == job_id + '.json':
+                    if job._read_state() and isinstance(job.finished_at, (int, float)) and now - job.finished_at > self.result_ttl:
+                        job.unpublish()
+                elif not os.path.exists(job._path('.json')) and now - os.path.getmtime(path) > self.result_ttl:
+                    os.remove(path)
+            except OSError:  # removed by another process
+                pass
+
+
+job_manager = JobManager(JOB_WORKERS, JOB_RESULT_TTL, JOB_DIR)
@@ -0,0 +1,546 @@
+import hashlib
+import heapq
+import io
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from datasets import SOURCE_FILE_COLUMN
+from instrumentation import stage
+from repetitions import DEFAULT_REDUCER, reduce_groups
+from segment_statistics import SEGMENT_TABLE_COLUMNS, bootstrap_mean_ci
+from segmentation import assign_segments
+from settings import LIVE_DATA_DIR, LIVE_REFRESH_INTERVAL
+
+# the followed result files (rows appended as text lines).
+LIVE_FILE_SUFFIXES = ('.csv',)
+
+# initial capacity (in rows) of the columns of a live table, the capacity is doubled when it is full.
+LIVE_TABLE_INITIAL_ROWS = 1024
+
+# max number of incremental statistics (of different pairs, selections or parameters) kept by a live source.
+LIVE_STATISTICS_ENTRIES = 8
+
+
+def _is_numeric(dtype: np.dtype):
+    return dtype.kind in 'biuf'
+
+
+# a column of the type and the capacity, filled with missing values (NaN or None) if the type has them.
+def _allocate(dtype: np.dtype, capacity: int):
+    if dtype.kind == 'f':
+        return np.full(capacity, np.nan, dtype=dtype)
+    return np.empty(capacity, dtype=dtype)
+
+
+# Table of rows appended chunk by chunk: each column is a numpy array with spare capacity (doubled when it is full),
+# thus appending a chunk costs its own rows (amortized), and the dataframe of the rows is a view of the arrays.
+# A column changes its type (e.g. integer to float, or numeric to text) when a chunk needs it, as reconcile_schemas.
+# The running min and max of the numeric columns are kept, for the bounds of the segmentations.
+class LiveTable:
+    def __init__(self):
+        self.rows = 0
+        self.capacity = 0
+        self._columns = OrderedDict()  # column name -> array of the capacity
+        self._min_max = {}  # numeric column name -> (min, max), as python numbers
+        self._frame = None  # dataframe of the rows, built on demand
+
+    def columns(self):
+        return list(self._columns)
+
+    def _reserve(self, rows: int):
+        if rows <= self.capacity:
+            return
+        capacity = max(self.capacity, LIVE_TABLE_INITIAL_ROWS)
+        while capacity < rows:
+            capacity *= 2
+        for name, column in self._columns.items():
+            resized = _allocate(column.dtype, capacity)
+            resized[:self.rows] = column[:self.rows]
+            self._columns[name] = resized
+        self.capacity = capacity
+
+    # change the type of a column, the rows are copied (only when the type of the column changes).
+    def _retype(self, name: str, dtype: np.dtype):
+        column = self._columns[name]
+        retyped = _allocate(dtype, self.capacity)
+        retyped[:self.rows] = column[:self.rows]
+        self._columns[name] = retyped
+        if not _is_numeric(dtype):
+            self._min_max.pop(name, None)
+
+    def append(self, chunk: pd.DataFrame):
+        n = len(chunk)
+        if n == 0:
+            return
+        self._reserve(self.rows + n)
+        for name in chunk.columns:
+            values = chunk[name].to_numpy()
+            if name not in self._columns:  # a new column: missing in the previous rows.
+                dtype = values.dtype if self.rows == 0 else np.dtype(np.float64 if _is_numeric(values.dtype) else object)
+                self._columns[name] = _allocate(dtype, self.capacity)
+            column = self._columns[name]
+            if _is_numeric(column.dtype) and not _is_numeric(values.dtype):
+                converted = pd.to_numeric(chunk[name], errors='coerce')
+                # text values which are not numbers (except missing values) make the column a text column.
+                if converted.notna().sum() == chunk[name].notna().sum():
+                    values = converted.to_numpy()
+            if _is_numeric(column.dtype) and _is_numeric(values.dtype):
+                dtype = np.result_type(column.dtype, values.dtype)
+            else:
+                dtype = np.dtype(object)
+            if dtype != column.dtype:
+                self._retype(name, dtype)
+            self._columns[name][self.rows:self.rows + n] = values
+            if _is_numeric(dtype) and dtype.kind != 'b':
+                self._update_min_max(name, values)
+        for name, column in self._columns.items():
+            if name not in chunk.columns:  # missing in this chunk.
+                if column.dtype.kind in 'biu':
+                    self._retype(name, np.dtype(np.float64))
+                self._columns[name][self.rows:self.rows + n] = np.nan if _is_numeric(self._columns[name].dtype) else None
+        self.rows += n
+        self._frame = None
+
+    def _update_min_max(self, name: str, values):
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        vmin, vmax = values.min().item(), values.max().item()
+        if name in self._min_max:
+            vmin, vmax = min(vmin, self._min_max[name][0]), max(vmax, self._min_max[name][1])
+        self._min_max[name] = (vmin, vmax)
+
+    # (min, max) of a numeric column, as python numbers.
+    def x_range(self, x_column: str):
+        return self._min_max.get(x_column, (np.nan, np.nan))
+
+    # the rows as a dataframe, its columns are views of the arrays of the table (not copied).
+    def frame(self):
+        if self._frame is None:
+            self._frame = pd.DataFrame({name: column[:self.rows] for name, column in self._columns.items()}, copy=False)
+        return self._frame
+
+
+# a result file followed by its byte offset: only the complete lines written after the offset are read.
+class TailedFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.header = None  # column names, from the first line
+        self.inode = None
+
+    # return True if the file has been truncated or replaced since it was read (its rows read before are invalid).
+    def is_rewritten(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return self.inode is not None and (st.st_ino != self.inode or st.st_size < self.offset)
+
+    # read the complete lines written since the last read, return them as a dataframe (None if there is no new line).
+    # A last line without its end of line (still being written) is read by the next read.
+    def read_new_rows(self):
+        with open(self.path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return None
+        self.offset += end
+        data = data[:end]
+        if self.header is None:
+            header_end = data.index(b'\n') + 1
+            self.header = pd.read_csv(io.BytesIO(data[:header_end]), nrows=0).columns.tolist()
+            data = data[header_end:]
+        if data.strip() == b'':
+            return None
+        return pd.read_csv(io.BytesIO(data), header=None, names=self.header)
+
+
+# The collapsed records of the selected strategies of a live table (the same records as prepare_records followed by
+# select_strategy_rows), maintained incrementally: the new rows of the table only update the (matrix, strategy)
+# groups they belong to, the reduced y value of a group is computed from the values of its group.
+class LiveRecords:
+    def __init__(self, mtx_column: str, alg_column: str, x_column: str, y_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str):
+        self.mtx_column = mtx_column
+        self.alg_column = alg_column
+        self.x_column = x_column
+        self.y_column = y_column
+        self.selected_strategies = list(selected_strategies)
+        self.drop_rows_by_col_value = drop_rows_by_col_value
+        self.reducer = reducer
+        self.rows = 0  # rows of the table already consumed
+        self.values = {}  # (matrix, strategy) -> y values of the group (not kept by the min and best reducers)
+        self.reduced = {}  # (matrix, strategy) -> reduced y value
+        self.x = {}  # (matrix, strategy) -> x value of the first record of the group
+        self.order = {}  # (matrix, strategy) -> order of the first record of the group
+
+    # consume the new rows of the table, return the matrices whose records have changed.
+    # The groups of the new rows are reduced at once, the groups having records before are reduced again with them.
+    def update(self, table: LiveTable):
+        if table.rows == self.rows:
+            return set()
+        df = table.frame().iloc[self.rows:]
+        self.rows = table.rows
+        mask = df[self.alg_column].isin(self.selected_strategies)
+        if self.drop_rows_by_col_value != None:
+            mask &= ~(df[self.drop_rows_by_col_value] > 0)
+        df = df[mask]
+        if len(df) == 0:
+            return set()
+
+        group = df.groupby([self.mtx_column, self.alg_column], sort=False, observed=True, dropna=False).ngroup().to_numpy()
+        _, first = np.unique(group, return_index=True)  # groups are numbered in order of their first record.
+        keys = list(zip(df[self.mtx_column].to_numpy()[first].tolist(), df[self.alg_column].to_numpy()[first].tolist()))
+        order = np.argsort(group, kind='stable')
+        values = df[self.y_column].to_numpy(dtype=np.float64)[order]  # the values of the new rows, group by group
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(group, minlength=len(keys)))])
+        reduced = reduce_groups(values, group[order], len(keys), self.reducer)
+
+        running = self.reducer in ('min', 'best')  # reduced from the previous reduced value and the new values.
+        group_values = [values[offsets[i]:offsets[i + 1]] for i in range(len(keys))] if not running else None
+        existing = [i for i, key in enumerate(keys) if key in self.x]
+        if len(existing) > 0:
+            if running:
+                parts = [np.append(values[offsets[i]:offsets[i + 1]], self.reduced[keys[i]]) for i in existing]
+            else:
+                parts = [np.concatenate([self.values[keys[i]], group_values[i]]) for i in existing]
+                for i, part in zip(existing, parts):
+                    group_values[i] = part
+            reduced[existing] = reduce_groups(np.concatenate(parts), np.repeat(np.arange(len(parts)), [len(p) for p in parts]), len(parts), self.reducer)
+
+        new = [i for i, key in enumerate(keys) if key not in self.x]
+        x = df[self.x_column].to_numpy(dtype=np.float64)[first].tolist()
+        base = len(self.order)
+        self.order.update((keys[i], base + j) for j, i in enumerate(new))
+        self.x.update((keys[i], x[i]) for i in new)
+        self.reduced.update(zip(keys, reduced.tolist()))
+        if not running:
+            self.values.update(zip(keys, group_values))
+        return set(key[0] for key in keys)
+
+
+# The speedup statistics of 2 strategies of a live table in each segment (the same table as SpeedupIndex.statistics),
+# maintained incrementally: the speedup of each changed matrix is updated from its records, and the counts, sums and
+# min/max heaps of the segments are updated by the changed matrices only. A new segmentation rebuilds the segments.
+class LiveSpeedupStatistics:
+    def __init__(self, lock, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str):
+        self._lock = lock
+        self.alg_a = alg_a
+        self.alg_b = alg_b
+        self.x_column = x_column
+        self.records = LiveRecords(mtx_column, alg_column, x_column, y_column, [alg_a, alg_b], drop_row_by_col_value, reducer)
+        self.x_range = (np.nan, np.nan)
+        self.speedup = {}  # matrix -> (x, speedup) of the matrices with the records of both strategies
+        self.segments = None
+        self._pending = set()  # matrices changed since the segments were updated
+        self._counted = {}  # matrix -> (segment, speedup, x) counted in the segments
+
+    # consume the new rows of the table (under the lock of the live source).
+    def update(self, table: LiveTable):
+        self.x_range = table.x_range(self.x_column)
+        reduced = self.records.reduced
+        changed = [mtx for mtx in self.records.update(table) if (mtx, self.alg_a) in reduced and (mtx, self.alg_b) in reduced]
+        if len(changed) == 0:
+            return
+        a = np.array([reduced[(mtx, self.alg_a)] for mtx in changed], dtype=np.float64)
+        b = np.array([reduced[(mtx, self.alg_b)] for mtx in changed], dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speedup = (a / b).tolist()
+        self.speedup.update(zip(changed, zip([self.records.x[(mtx, self.alg_a)] for mtx in changed], speedup)))
+        self._pending.update(changed)
+
+    # count all matrices into the segments at once.
+    def _rebuild(self, segments: [float]):
+        self.segments = list(segments)
+        seg_num = len(segments) - 1
+        matrices = list(self.speedup)
+        x = np.array([v[0] for v in self.speedup.values()], dtype=np.float64)
+        speedup = np.array([v[1] for v in self.speedup.values()], dtype=np.float64)
+        inside = np.flatnonzero(assign_segments(x, segments) >= 0)
+        seg, x, speedup = assign_segments(x[inside], segments), x[inside], speedup[inside]
+        finite = np.isfinite(speedup)
+        self._total = np.bincount(seg, minlength=seg_num)
+        self._beat = np.bincount(seg[speedup >= 1.0], minlength=seg_num)
+        self._finite = np.bincount(seg[finite], minlength=seg_num)
+        self._sum = np.bincount(seg[finite], weights=speedup[finite], minlength=seg_num)
+        self._pos_inf = np.bincount(seg[speedup == np.inf], minlength=seg_num)
+        self._neg_inf = np.bincount(seg[speedup == -np.inf], minlength=seg_num)
+        self._counted = dict(zip([matrices[i] for i in inside], zip(seg.tolist(), speedup.tolist(), x.tolist())))
+
+        self._tie = itertools.count()  # heap entries never compare their matrices
+        self._max_heaps = [[] for _ in range(seg_num)]
+        self._min_heaps = [[] for _ in range(seg_num)]
+        for mtx, (i, value, _) in self._counted.items():
+            if not math.isnan(value):
+                tie = next(self._tie)
+                self._max_heaps[i].append((-value, tie, mtx))
+                self._min_heaps[i].append((value, tie, mtx))
+        for heap in self._max_heaps + self._min_heaps:
+            heapq.heapify(heap)
+        self._heap_entries = sum(len(heap) for heap in self._max_heaps)
+        self._pending = set()
+
+    def _account(self, seg: int, speedup: float, sign: int):
+        self._total[seg] += sign
+        if speedup >= 1.0:
+            self._beat[seg] += sign
+        if math.isfinite(speedup):
+            self._finite[seg] += sign
+            self._sum[seg] += sign * speedup
+        elif speedup == np.inf:
+            self._pos_inf[seg] += sign
+        elif speedup == -np.inf:
+            self._neg_inf[seg] += sign
+
+    # move the changed matrices into their segments, the replaced heap entries are dropped when they reach the top.
+    def _apply_pending(self):
+        pending = [mtx for mtx in self._pending if mtx in self.speedup]
+        self._pending = set()
+        segs = assign_segments(np.array([self.speedup[mtx][0] for mtx in pending], dtype=np.float64), self.segments)
+        for mtx, seg in zip(pending, segs.tolist()):
+            old = self._counted.pop(mtx, None)
+            if old is not None:
+                self._account(old[0], old[1], -1)
+            if seg < 0:
+                continue
+            x, speedup = self.speedup[mtx]
+            self._counted[mtx] = (seg, speedup, x)
+            self._account(seg, speedup, 1)
+            if not math.isnan(speedup):
+                tie = next(self._tie)
+                heapq.heappush(self._max_heaps[seg], (-speedup, tie, mtx))
+                heapq.heappush(self._min_heaps[seg], (speedup, tie, mtx))
+                self._heap_entries += 1
+
+    # the top of a heap of a segment, after dropping the entries of the replaced speedups. NaN if the heap is empty.
+    def _top(self, heap: list, seg: int, sign: int):
+        while heap:
+            value, _, mtx = heap[0]
+            counted = self._counted.get(mtx)
+            if counted is not None and counted[0] == seg and counted[1] == sign * value:
+                return sign * value
+            heapq.heappop(heap)
+        return np.nan
+
+    # speedup statistics of each segment, the same table as SpeedupIndex.statistics.
+    # The cost is the number of changed matrices since the last call (the number of matrices for a new segmentation).
+    def statistics(self, segments: [float]):
+        with self._lock:
+            # the segments are rebuilt for a new segmentation, when most of the matrices have changed (e.g. the first rows),
+            # or when most of the heap entries have been replaced.
+            if self.segments != list(segments) or len(self._pending) > len(self._counted) or self._heap_entries > 2 * len(self._counted) + 1024:
+                self._rebuild(segments)
+            self._apply_pending()
+            seg_num = len(segments) - 1
+            max_speedup = [self._top(self._max_heaps[i], i, -1) for i in range(seg_num)]
+            min_speedup = [self._top(self._min_heaps[i], i, 1) for i in range(seg_num)]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean_speedup = self._sum / self._finite
+                beat_ratio = np.where(self._total == 0, 0, self._beat / self._total)
+            pos_inf, neg_inf = self._pos_inf > 0, self._neg_inf > 0
+            mean_speedup = np.where(pos_inf, np.inf, mean_speedup)
+            mean_speedup = np.where(neg_inf, np.where(pos_inf, np.nan, -np.inf), mean_speedup)
+            return pd.DataFrame({
+                'alg1': [self.alg_a] * seg_num,
+                'alg2': [self.alg_b] * seg_num,
+                'xstart': segments[:-1],
+                'xend': segments[1:],
+                'max_speedup': max_speedup,
+                'min_speedup': min_speedup,
+                'mean_speedup': mean_speedup,
+                'beat_count': self._beat.copy(),
+                'total_count': self._total.copy(),
+                'beat_ratio': beat_ratio,
+            }, columns=SEGMENT_TABLE_COLUMNS)
+
+    # bootstrap confidence interval of the mean (finite) speedup of each segment, as SpeedupIndex.mean_speedup_ci.
+    def mean_speedup_ci(self, segments: [float], confidence: float = 0.95):
+        with self._lock:
+            self.statistics(segments)
+            samples = [[] for _ in range(len(segments) - 1)]
+            for seg, speedup, x in self._counted.values():
+                if np.isfinite(speedup):
+                    samples[seg].append((x, speedup))
+        samples = [[s for _, s in sorted(seg_samples, key=lambda sample: sample[0])] for seg_samples in samples]
+        offsets = np.concatenate([[0], np.cumsum([len(s) for s in samples])])
+        return bootstrap_mean_ci(np.array([s for seg_samples in samples for s in seg_samples], dtype=np.float64), offsets, confidence=confidence)
+
+
+# The best performance statistics of the selected strategies of a live table in each segment (the same table as
+# BestPerfIndex.statistics), maintained incrementally: the best strategy of each changed matrix is updated from its
+# records, and the best counts of the segments are updated by the changed matrices only.
+class LiveBestPerfStatistics:
+    def __init__(self, lock, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str):
+        self._lock = lock
+        self.x_column = x_column
+        self.selected_strategies = list(selected_strategies)
+        self.records = LiveRecords(mtx_column, alg_column, x_column, y_column, selected_strategies, drop_rows_by_col_value, reducer)
+        self.x_range = (np.nan, np.nan)
+        self.best = {}  # matrix -> (x, best strategy, incomplete) of the matrices with any y value
+        self.segments = None
+        self._pending = set()
+        self._counted = {}  # matrix -> (segment, best strategy, incomplete) counted in the segments
+
+    # consume the new rows of the table (under the lock of the live source).
+    def update(self, table: LiveTable):
+        self.x_range = table.x_range(self.x_column)
+        for mtx in self.records.update(table):
+            present = [(mtx, alg) for alg in self.selected_strategies if (mtx, alg) in self.records.reduced]
+            candidates = [key for key in present if not math.isnan(self.records.reduced[key])]
+            self._pending.add(mtx)
+            if len(candidates) == 0:
+                self.best.pop(mtx, None)
+                continue
+            # the first record of the best value wins a tie, as best_of_matrices.
+            best = max(sorted(candidates, key=self.records.order.get), key=self.records.reduced.get)
+            self.best[mtx] = (self.records.x[best], best[1], len(present) != len(self.selected_strategies))
+
+    # count all matrices into the segments at once.
+    def _rebuild(self, segments: [float]):
+        self.segments = list(segments)
+        seg_num = len(segments) - 1
+        matrices = list(self.best)
+        x = np.array([v[0] for v in self.best.values()], dtype=np.float64)
+        inside = np.flatnonzero(assign_segments(x, segments) >= 0)
+        seg = assign_segments(x[inside], segments)
+        algorithms = [self.best[matrices[i]][1] for i in inside]
+        incomplete = np.array([self.best[matrices[i]][2] for i in inside], dtype=bool)
+        self._total = np.bincount(seg, minlength=seg_num)
+        self._incomplete = np.bincount(seg[incomplete], minlength=seg_num)
+        self._counted = dict(zip([matrices[i] for i in inside], zip(seg.tolist(), algorithms, incomplete.tolist())))
+        code, uniques = pd.factorize(pd.Series(algorithms, dtype=object))
+        best_count = np.bincount(seg * max(len(uniques), 1) + code, minlength=seg_num * max(len(uniques), 1)).reshape(seg_num, -1)
+        self._best_count = [{uniques[j]: int(count) for j, count in enumerate(row) if count > 0} for row in best_count]
+        self._pending = set()
+
+    def _account(self, seg: int, alg: str, incomplete: bool, sign: int):
+        self._best_count[seg][alg] = self._best_count[seg].get(alg, 0) + sign
+        self._total[seg] += sign
+        self._incomplete[seg] += sign * int(incomplete)
+
+    def _apply_pending(self):
+        pending = list(self._pending)
+        self._pending = set()
+        segs = assign_segments(np.array([self.best[mtx][0] if mtx in self.best else np.nan for mtx in pending], dtype=np.float64), self.segments)
+        for mtx, seg in zip(pending, segs.tolist()):
+            old = self._counted.pop(mtx, None)
+            if old is not None:
+                self._account(*old, -1)
+            if seg < 0:
+                continue
+            _, alg, incomplete = self.best[mtx]
+            self._counted[mtx] = (seg, alg, incomplete)
+            self._account(seg, alg, incomplete, 1)
+
+    # best performance statistics of each segment, the same table as BestPerfIndex.statistics.
+    def statistics(self, segments: [float]):
+        with self._lock:
+            if self.segments != list(segments) or len(self._pending) > len(self._counted):
+                self._rebuild(segments)
+            self._apply_pending()
+            rows = []
+            for seg, best_count in enumerate(self._best_count):
+                for alg in sorted(alg for alg, count in best_count.items() if count > 0):
+                    rows.append((alg, segments[seg], segments[seg + 1], best_count[alg], self._total[seg], best_count[alg] / self._total[seg], self._incomplete[seg]))
+        return pd.DataFrame(rows, columns=['algo', 'xstart', 'xend', 'best_count', 'total_count', 'best_ratio', 'incomplete_count'])
+
+
+# The dataset of a followed directory: the result files of the directory are tailed (see TailedFile) into one live table,
+# with a column recording the source file of each row. Each refresh with new rows is a new version of the dataset
+# (a new dataset id, thus the cached selections of the previous version are not reused), and updates the incremental
+# statistics by the new rows only.
+class LiveSource:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.key = hashlib.blake2b(os.path.abspath(directory).encode('utf-8'), digest_size=8).hexdigest()
+        self.version = 0
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.table = LiveTable()
+        self.updated_at = None
+        self._files = {}  # file name -> TailedFile
+        self._statistics = OrderedDict()  # parameters -> incremental statistics
+
+    # the id of the current version of the dataset.
+    @property
+    def dataset_id(self):
+        return 'live-{}-{}'.format(self.key, self.version)
+
+    # return True if the dataset id is a version of this live dataset.
+    def owns(self, dataset_id: str):
+        return dataset_id is not None and dataset_id.startswith('live-{}-'.format(self.key))
+
+    def files(self):
+        return list(self._files)
+
+    # read the new rows of the result files of the directory (a new file is read from its start),
+    # return the number of new rows.
+    # A rewritten or removed file can not be taken back row by row: the dataset is read again from all files.
+    def refresh(self):
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                return 0
+            names = sorted(f for f in os.listdir(self.directory) if f.endswith(LIVE_FILE_SUFFIXES))
+            rewritten = any(name not in names or tailed.is_rewritten() for name, tailed in self._files.items())
+            if rewritten:
+                self._reset()
+            new_rows = 0
+            for name in names:
+                tailed = self._files.setdefault(name, TailedFile(os.path.join(self.directory, name)))
+                with stage('live read'):
+                    rows = tailed.read_new_rows()
+                if rows is None:
+                    continue
+                if SOURCE_FILE_COLUMN not in rows.columns:
+                    rows[SOURCE_FILE_COLUMN] = name
+                self.table.append(rows)
+                new_rows += len(rows)
+            if new_rows > 0 or rewritten:
+                self.version += 1
+                self.updated_at = time.time()
+            return new_rows
+
+    # the incremental statistics of the parameters (created by create() at first), updated by the new rows.
+    def _cached_statistics(self, key: tuple, create):
+        with self._lock:
+            statistics = self._statistics.get(key)
+            if statistics is None:
+                statistics = self._statistics[key] = create()
+            self._statistics.move_to_end(key)
+            while len(self._statistics) > LIVE_STATISTICS_ENTRIES:
+                self._statistics.popitem(last=False)
+            with stage('live statistics update'):
+                statistics.update(self.table)
+            return statistics
+
+    # the speedup statistics of 2 strategies, with the same interface as SpeedupIndex (x_range, statistics, mean_speedup_ci).
+    def speedup_statistics(self, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        key = ('speedup', alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+        return self._cached_statistics(key, lambda: LiveSpeedupStatistics(
+            self._lock, alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer))
+
+    # the best performance statistics of the selected strategies, with the same interface as BestPerfIndex (x_range, statistics).
+    def best_perf_statistics(self, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_algs: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+        key = ('best-perf', x_column, y_column, mtx_column, alg_column, tuple(selected_algs), drop_rows_by_col_value, reducer)
+        return self._cached_statistics(key, lambda: LiveBestPerfStatistics(
+            self._lock, x_column, y_column, mtx_column, alg_column, selected_algs, drop_rows_by_col_value, reducer))
+
+    # the rows read so far as a dataframe, and the id of their version.
+    def snapshot(self):
+        with self._lock:
+            return self.dataset_id, self.table.frame()
+
+
+live_source = LiveSource(LIVE_DATA_DIR) if LIVE_DATA_DIR != None else None
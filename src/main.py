@@ -1,23 +1,26 @@
 #!/usr/bin/env python3
-import base64
 import datetime
-import io
-import re
+import os
 import time
 
-from dash import Dash, html, dcc, dash_table, ctx
+import flask
+
+from dash import Dash, html, dcc, dash_table, ctx, Patch
 from dash.dependencies import Input, Output, State
 import dash
-import plotly.express as px
-import pandas as pd
 
-from best_perf import *
-from speedup_versus import *
-from segment_statistics import *
-from perf_plot import *
+# the analysis modules (pandas, plotly express) are imported by the callbacks on their first use,
+# thus a worker process builds the layout and starts serving without loading them (see create_app).
+from settings import REDUCERS, DEFAULT_REDUCER, LARGE_DATA_POINTS_THRESHOLD, DRILLDOWN_PAGE_SIZE, SERVER_DATA_DIR, server_data_files, LIVE_DATA_DIR, LIVE_REFRESH_INTERVAL
+from figure_export import figure_exporter, export_key
+from instrumentation import PROFILE_ENABLED, instrumented_callback, stage, recent_invocations, metrics_summary
+from jobs import job_manager, is_job_id
 
 DROP_DEFAULT_NO_DROP = "default"
 
+# interval (in milliseconds) of polling the progress of the background jobs.
+JOB_POLL_INTERVAL = 500
+
 colors = {
     'background': '#111111',
     'text': '#0969da'
@@ -25,10 +28,8 @@ colors = {
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
-app = Dash(__name__, external_stylesheets=external_stylesheets)
-
 
-app.layout = html.Div(children=[
+layout = html.Div(children=[
     html.H1(
         children='Performance Explorer',
         style={
@@ -61,6 +62,28 @@ app.layout = html.Div(children=[
         # Allow multiple files to be uploaded
         multiple=True
     ),
+    # files of the server data directory (PERF_EXPLORER_DATA_DIR), analysed in place without uploading.
+    html.Div(className = "row", style={} if SERVER_DATA_DIR != None else {'display': 'none'}, children = [
+        html.Label("Or select a file of the server:"),
+        dcc.Dropdown(id='server-dataset', options=[{'label': f, 'value': f} for f in server_data_files()], placeholder="Select a Parquet/Arrow file"),
+    ]),
+    # follow the growing result files of the live directory (PERF_EXPLORER_LIVE_DIR): only the new rows are read, on an interval.
+    html.Div(className = "row", style={} if LIVE_DATA_DIR != None else {'display': 'none'}, children = [
+        dcc.Checklist(id='live-follow', options=[{'label': ' Follow the results directory {} (live)'.format(LIVE_DATA_DIR), 'value': 'live'}], value=[], inline=True),
+        html.Span(id='live-status'),
+        dcc.Interval(id='live-refresh', interval=LIVE_REFRESH_INTERVAL, disabled=True),
+    ]),
+    # resumable upload of large (and compressed) files, by chunks (see assets/chunked_upload.js and chunked_upload.py).
+    html.Div(className = "row", children = [
+        html.Button("Upload a large file (resumable, also .csv.gz/.csv.xz/.csv.zst)", id='chunked-upload-button'),
+        html.Span(id='chunked-upload-progress', style={'marginLeft': '10px'}),
+        # set by assets/chunked_upload.js to the id of a completely received upload (followed by ':' and a time).
+        dcc.Input(id='chunked-upload-id', type='text', style={'display': 'none'}),
+    ]),
+    # id of the parsed dataset in the server side cache.
+    dcc.Store(id='dataset-id'),
+    # columns and algorithms of the last analysis, for updating the segmented statistics without re-analysing.
+    dcc.Store(id='analysis-params'),
     dcc.Loading(
         id="loading-file-meta",
         type="default",
@@ -92,6 +115,22 @@ app.layout = html.Div(children=[
                     ],
                     'value': 'perf'
                 },
+                {
+                    'label':
+                    [
+                        html.Img(src="/assets/images/speedup-plot.svg", height=20),
+                        html.Span("Pairwise Speedup", style={'font-size': 15, 'padding-left': 10, "margin-right": 12}),
+                    ],
+                    'value': 'pairwise'
+                },
+                {
+                    'label':
+                    [
+                        html.Img(src="/assets/images/perf-plot.svg", height=30),
+                        html.Span("Performance Profile", style={'font-size': 15, 'padding-left': 10, "margin-right": 12}),
+                    ],
+                    'value': 'profile'
+                },
             ],
             value='speedup'
         )
@@ -125,6 +164,11 @@ app.layout = html.Div(children=[
                         html.Label("Algorithm Column:"),
                         dcc.Dropdown(id='header-selector-strategy', placeholder="Select a Column for Algorithms", style={'margin-top': '0.3rem'}),
                     ]),
+                    html.Div(className = "three columns", children = [
+                        html.Label("Repeated Runs:"),
+                        dcc.Dropdown(id='inp-reducer', options=[{'label': label, 'value': value} for value, label in REDUCERS], value=DEFAULT_REDUCER,
+                            clearable=False, style={'margin-top': '0.3rem'}),
+                    ]),
                 ]),
                 html.B("Select algorithms (for speedup plot):", style={'margin-top': '0.3rem', "margin-bottom": "0.1rem"}),
                 html.Div(className = "row", children = [
@@ -137,7 +181,7 @@ app.layout = html.Div(children=[
                         dcc.Dropdown(id='inp_alg_2', placeholder="Select a Column for Algorithm B", style={'margin-bottom': '0.3rem'}),
                     ]),
                 ]),
-                html.B("Select algorithms (for performance plot):", style={'margin-top': '0.3rem', "margin-bottom": "0.1rem"}),
+                html.B("Select algorithms (for performance, pairwise speedup and performance profile plot):", style={'margin-top': '0.3rem', "margin-bottom": "0.1rem"}),
                 html.Div(className = "row", children = [
                     html.Div(className = "six columns", children = [
                         html.Label("Algorithms:"),
@@ -147,12 +191,13 @@ app.layout = html.Div(children=[
                 html.B("Segmented statistics:", style={'margin-top': '0.3rem', "margin-bottom": "0.1rem"}),
                 html.Div(className = "row", children = [
                     html.Div(className = "twelve columns", children = [
-                        html.Label("Input segmentations, one number per line. We will compare the performance in each segment of x axis and list results in a table."),
+                        html.Label("Input segmentations, one number per line (or log:start:stop:num for log-spaced boundaries). We will compare the performance in each segment of x axis and list results in a table, updated while typing."),
                         dcc.Textarea(
                             id='inp-segmented-statistics',
                             value='',
                             style={'width': '100%', 'height': 100},
                         ),
+                        dcc.Checklist(id='inp-bootstrap-ci', options=[{'label': ' 95% bootstrap confidence interval of the mean speedup', 'value': 'ci'}], value=[]),
                     ]),
                 ]),
                 html.B("Plot Style:", style={'margin-top': '0.3rem', "margin-bottom": "0.1rem"}),
@@ -187,6 +232,10 @@ app.layout = html.Div(children=[
                         html.Label("Font Size:"),
                         dcc.Input(id="plot_style_font_size", value="18", placeholder="Font size. e.g. 18", style={'margin': '0.3rem'}),
                     ]),
+                    html.Div(className = "three columns", children = [
+                        html.Label("Large Data Threshold:"),
+                        dcc.Input(id="plot_style_large_data_threshold", value=str(LARGE_DATA_POINTS_THRESHOLD), placeholder="Points number to switch to WebGL and downsampling", style={'margin': '0.3rem'}),
+                    ]),
                 ]),
                 html.Div(className = "row", children = [
                     html.Div(className = "three columns", children = [
@@ -206,73 +255,96 @@ app.layout = html.Div(children=[
         ]
     ),
 
-    dcc.Loading(
-        id="loading-2",
-        type="default",
-        children=html.Div(id="output-data-upload")
-    ),
+    # the analysis and the export run as background jobs, the id of the job of this page is polled until the job is done.
+    dcc.Store(id='analysis-job'),
+    dcc.Store(id='export-job'),
+    dcc.Interval(id='analysis-poll', interval=JOB_POLL_INTERVAL, disabled=True),
+    dcc.Interval(id='export-poll', interval=JOB_POLL_INTERVAL, disabled=True),
+    html.Div(id="output-data-upload"),
+    html.Div(id="export-progress"),
+    # the graphs are kept in the layout (the one of the analysed plot type is shown),
+    # thus the plot style inputs can patch the shown figure in place.
+    dcc.Graph(id='perf-graph-speedup', style={'display': 'none'}),
+    dcc.Graph(id='perf-graph-perf', style={'display': 'none'}),
+    dcc.Graph(id='perf-graph-pairwise', style={'display': 'none'}),
+    dcc.Graph(id='perf-graph-profile', style={'display': 'none'}),
+    html.Div(id="output-plot-info"),
+    # debug panel: timings of the recent callbacks (enabled by PERF_EXPLORER_PROFILE=1).
+    *([html.Details([
+        html.Summary("Profile of recent callbacks"),
+        dcc.Interval(id='profile-interval', interval=2000),
+        html.Div(id='profile-panel'),
+    ])] if PROFILE_ENABLED else []),
+    html.Div(id="segment-statistics"),
+    # per-matrix rows of a segment or of a box/lasso selection on the plot, paged, sorted and filtered on the server.
+    html.Div(id='drilldown', style={'display': 'none'}, children=[
+        html.H4("Matrices of the Selection:"),
+        html.Div(className = "row", children = [
+            html.Div(className = "six columns", children = [
+                html.Label("Segment (or select points on the plot by box/lasso):"),
+                dcc.Dropdown(id='drilldown-segment', placeholder="All matrices", style={'margin-top': '0.3rem'}),
+            ]),
+        ]),
+        html.P(id='drilldown-info'),
+        dash_table.DataTable(id='drilldown-table', page_action='custom', page_current=0, page_size=DRILLDOWN_PAGE_SIZE,
+            sort_action='custom', sort_mode='multi', sort_by=[], filter_action='custom', filter_query=''),
+        # x range of the selection: [start, end, include_end], or None for all matrices.
+        dcc.Store(id='drilldown-range'),
+        html.Hr(),
+    ]),
     dcc.Download(id="download-plot"),
 ])
 
-# parse the csv performance file and retuen dataframe.
-def parse_contents(contents, filename, date):
-    content_type, content_string = contents.split(',')
+DATASET_EXPIRED_MESSAGE = 'The uploaded dataset is no longer available on the server, please upload the file again.'
+
+INVALID_STYLE_MESSAGE = 'The font size, the width, the height and the large data threshold of the plot must be integers.'
 
-    decoded = base64.b64decode(content_string)
+# the plot style of the page inputs, None if a number input is not an integer (e.g. empty, or a number being typed).
+def plot_config(plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
+    plot_legend_title, plot_width, plot_height, plot_large_data_threshold=None):
+    from speedup_versus import PlotConfig
     try:
-        if 'csv' in filename:
-            # Assume that the user uploaded a CSV file
-            df = pd.read_csv(
-                io.StringIO(decoded.decode('utf-8')))
-        elif 'xls' in filename:
-            # Assume that the user uploaded an excel file
-            df = pd.read_excel(io.BytesIO(decoded))
-    except Exception as e:
-        print(e)
-        return html.Div([
-            'There was an error processing this file.'
-        ])
-    return df
-
-def gen_seg_list(df, x_axis: str, y_axis: str, segment_conf: [str]):
-    segments_split = re.split(r'[;,\s\n]\s*', segment_conf)
-    segments = []
-    for seg in segments_split:
-        if seg.isdigit():
-            segments.append(int(seg))
-    min_x = df[x_axis].min()
-    max_x = df[x_axis].max()
-    segments.append(min_x)
-    segments.append(max_x + 1) # the end range is not included, thus we plus one to it.
-    segments.sort()
-    return segments
+        numbers = [int(plot_font_size), int(plot_width), int(plot_height)]
+        if plot_large_data_threshold is not None:
+            numbers.append(int(plot_large_data_threshold))
+    except (TypeError, ValueError):
+        return None
+    return PlotConfig(plot_color, plot_font_color, numbers[0], plot_xaxis_title, plot_yaxis_title, plot_showlegend == "yes",
+        plot_legend_title, *numbers[1:])
+
+# the column for dropping rows, or None if no row is dropped.
+def drop_column(drop_col_key):
+    if drop_col_key == None or drop_col_key == "" or drop_col_key == DROP_DEFAULT_NO_DROP:
+        return None
+    return drop_col_key
 
+# columns read from the dataset for analysing and plotting.
+def analysis_columns(mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key):
+    return [c for c in [mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key] if c != None and c != DROP_DEFAULT_NO_DROP]
 
 # set strategy dropdown options
-@app.callback(
+@dash.callback(
     Output('inp_alg_1', 'options'), # for speedup plot options
     Output('inp_alg_2', 'options'), # for speedup plot options
     Output('inp_alg_select', 'options'), # performance plot options
     Input('header-selector-strategy', 'value'),
-    State('upload-data', 'contents'),
-    State('upload-data', 'filename'),
-    State('upload-data', 'last_modified'))
-def set_algorithm_options(selected_csv_col, list_of_contents, list_of_names, list_of_dates):
-    if list_of_contents is None:
+    State('dataset-id', 'data'))
+@instrumented_callback
+def set_algorithm_options(selected_csv_col, dataset_id):
+    if selected_csv_col is None:
+        return [], [], []
+    from backends import dataset_backend
+    backend = dataset_backend(dataset_id, [selected_csv_col])
+    if backend is None:
         return [], [], []
     else:
-        # 
-        # todo: parse multiple input files.
-        df = parse_contents(list_of_contents[0], list_of_names[0], list_of_dates[0])
-        
         # todo: check the algorithm cloumn exists.
-        unique_keys = pd.unique(df[selected_csv_col]).tolist()
-        unique_keys.sort()
+        unique_keys = backend.strategies(selected_csv_col)
         options = [{'label': k, 'value': k} for k in unique_keys[:32]] # we allow max 32 different strategy.
         return options, options, options
 
 # set default value for drop dropdown
-@app.callback(
+@dash.callback(
     Output('header-selector-drop', 'value'),
     Input('header-selector-drop', 'options'))
 def set_cities_value(available_options):
@@ -280,12 +352,95 @@ def set_cities_value(available_options):
         return None
     return available_options[0]['value']
 
-# on buttion click, download the performance figure.
-@app.callback(Output("download-plot", "data"),
+# generate the figure of the plot type.
+# the filtered/merged records of the dataset (by its backend) are shared with the tables through the selection cache.
+# The performance profile is also drawn for each segment of the segmentation input.
+def gen_figure(backend, plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_rows_by_col_value, alg_1, alg_2, algs_select, reducer, config: 'PlotConfig', segment_conf: str = None):
+    with stage('figure build'):
+        if plot_type == 'speedup':
+            from speedup_versus import gen_plot_speedup_of_merged_pair
+            merged_data = backend.algorithm_pair(alg_1, alg_2, mtx_name_key, strategy_key, x_axis, y_axis, drop_rows_by_col_value, reducer)
+            return gen_plot_speedup_of_merged_pair(merged_data, x_axis, y_axis, config)
+        elif plot_type == 'pairwise':
+            from pairwise_speedup import cached_strategy_pivot, gen_plot_pairwise_speedup
+            pivot = cached_strategy_pivot(backend, mtx_name_key, strategy_key, x_axis, y_axis, algs_select, drop_rows_by_col_value, reducer)
+            return gen_plot_pairwise_speedup(pivot, config)
+        elif plot_type == 'profile':
+            from pairwise_speedup import cached_strategy_pivot
+            from segmentation import parse_segment_conf, segment_bounds
+            from performance_profile import gen_plot_performance_profile
+            pivot = cached_strategy_pivot(backend, mtx_name_key, strategy_key, x_axis, y_axis, algs_select, drop_rows_by_col_value, reducer)
+            values, _ = parse_segment_conf(segment_conf)
+            segments = segment_bounds(values, *backend.x_range(x_axis)) if len(values) > 0 else None
+            return gen_plot_performance_profile(pivot, config, segments)
+        else:
+            from perf_plot import gen_plot_performance_of_selection
+            selected = backend.strategy_rows(mtx_name_key, strategy_key, y_axis, algs_select, drop_rows_by_col_value, reducer)
+            return gen_plot_performance_of_selection(selected, mtx_name_key, strategy_key, x_axis, y_axis, config)
+
+# the graph of each plot type in the layout.
+PLOT_GRAPH_IDS = {'speedup': 'perf-graph-speedup', 'perf': 'perf-graph-perf', 'pairwise': 'perf-graph-pairwise', 'profile': 'perf-graph-profile'}
+
+# the plot style of a figure as a partial update of the figure: the traces are not rebuilt or sent again.
+def gen_style_patch(plot_type, config: 'PlotConfig'):
+    patched = Patch()
+    patched['layout']['width'] = config.width
+    patched['layout']['height'] = config.height
+    patched['layout']['font']['size'] = config.font_size
+    patched['layout']['font']['color'] = config.font_color
+    if plot_type == 'pairwise':
+        return patched # the heatmap has fixed axis titles and no legend.
+    patched['layout']['showlegend'] = config.showlegend
+    patched['layout']['legend']['title']['text'] = config.legend_title
+    if plot_type == 'profile':
+        return patched # the performance profile has fixed axis titles.
+    patched['layout']['xaxis']['title']['text'] = config.xaxis_title
+    patched['layout']['yaxis']['title']['text'] = config.yaxis_title
+    if plot_type == 'speedup':
+        patched['data'][0]['fillcolor'] = config.color
+    return patched
+
+# the job id kept by a Store of the page, the ids sent by the browser are checked before looking up the job:
+# an invalid id is an unknown job (None).
+def page_job_id(job_id):
+    return job_id if is_job_id(job_id) else None
+
+# the progress of a background job, as a progress bar and the running step.
+def job_progress(job, title: str):
+    return html.Div([
+        html.Span("{}: {} ".format(title, job.message or 'waiting')),
+        html.Progress(value=job.done_steps, max=max(job.total_steps, 1)),
+    ])
+
+# background job of exporting the figure to pdf, the progress is reported to the job before each step.
+@instrumented_callback
+def run_export_job(job, dataset_id, plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key, alg_1, alg_2, algs_select, reducer, config: 'PlotConfig', segment_conf: str = None):
+    key = export_key(dataset_id, 'pdf', plot_type=plot_type, columns=[mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key],
+        algs=[alg_1, alg_2, algs_select], reducer=reducer, config=vars(config), segment_conf=segment_conf if plot_type == 'profile' else None)
+    job.report(0, 2, 'building figure')
+
+    # the figure is built only if it has not been exported before.
+    def build_figure():
+        from backends import dataset_backend
+        from perf_plot import PERFORMANCE_HOVER_COLUMNS
+        backend = dataset_backend(dataset_id, analysis_columns(mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key) + PERFORMANCE_HOVER_COLUMNS)
+        if backend is None:
+            raise LookupError(DATASET_EXPIRED_MESSAGE)
+        fig = gen_figure(backend, plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key, alg_1, alg_2, algs_select, reducer, config, segment_conf)
+        job.report(1, 2, 'exporting pdf')
+        return fig
+
+    image = figure_exporter.export(key, build_figure, 'pdf')
+    return dcc.send_bytes(image, "fig-plot.pdf")
+
+# on buttion click, export the performance figure in a background job (the previous export job of the page is cancelled).
+@dash.callback(Output('export-job', 'data'),
+              Output('export-poll', 'disabled'),
+              Output('export-progress', 'children'),
               Input('dl-button', 'n_clicks'),
-              State('upload-data', 'contents'),
-              State('upload-data', 'filename'),
-              State('upload-data', 'last_modified'),
+              State('export-job', 'data'),
+              State('dataset-id', 'data'),
+              State('plot-type', 'value'),
               State('header-selector-mtx-name', 'value'),
               State('header-selector-strategy', 'value'),
               State('header-selector-x_axis', 'value'),
@@ -293,6 +448,9 @@ def set_cities_value(available_options):
               State('header-selector-drop', 'value'),
               State('inp_alg_1', 'value'),
               State('inp_alg_2', 'value'),
+              State('inp_alg_select', 'value'),
+              State('inp-reducer', 'value'),
+              State('inp-segmented-statistics', 'value'),
               # plot style:
               State("plot_style_color", 'value'),
               State("plot_style_font_color", 'value'),
@@ -303,35 +461,85 @@ def set_cities_value(available_options):
               State("plot_style_legend_title", 'value'),
               State("plot_style_width", 'value'),
               State("plot_style_height", 'value'),
+              State("plot_style_large_data_threshold", 'value'),
             )
-def dl_plot(n_clicks, list_of_contents, list_of_names, list_of_dates, mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key, alg_1, alg_2,
+@instrumented_callback
+def dl_plot(n_clicks, previous_job_id, dataset_id, plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key, alg_1, alg_2, algs_select, reducer, segment_conf,
     plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
-    plot_legend_title, plot_width, plot_height):
+    plot_legend_title, plot_width, plot_height, plot_large_data_threshold):
     button_id = ctx.triggered_id
-    if button_id == None:
-        return dash.no_update
-
-    if drop_col_key == DROP_DEFAULT_NO_DROP:
-        drop_col_key = None
-
-    if button_id == "dl-button":
-        # todo: parse multiple input files.
-        df = parse_contents(list_of_contents[0], list_of_names[0], list_of_dates[0])
-        conf_showlegend = True if plot_showlegend == "yes" else False
-        config = PlotConfig(plot_color, plot_font_color, int(plot_font_size), plot_xaxis_title, plot_yaxis_title, conf_showlegend, plot_legend_title, int(plot_width), int(plot_height))
-        fig = gen_plot_speedup(df, alg_1, alg_2, mtx_name_key, x_axis, y_axis, strategy_key, drop_col_key, config)
-        output_path = "./fig-plot.pdf" # todo: file conflict if we have more than 1 user.
-        fig.write_image(output_path)
-        # download fig
-        return dcc.send_file(output_path)
-    return dash.no_update
-
-# on buttion click, draw the speedup/performance figure.
-@app.callback(Output('output-data-upload', 'children'),
+    if button_id != "dl-button" or dataset_id is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    drop_col_key = drop_column(drop_col_key)
+    config = plot_config(plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
+        plot_legend_title, plot_width, plot_height, plot_large_data_threshold)
+    if config is None:
+        return dash.no_update, dash.no_update, html.Div(["Export failed: " + INVALID_STYLE_MESSAGE])
+    job_id = job_manager.submit(run_export_job, dataset_id, plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key,
+        alg_1, alg_2, algs_select, reducer, config, segment_conf, supersedes=page_job_id(previous_job_id))
+    return job_id, False, html.Span("Export: waiting")
+
+# poll the export job of the page, and download the figure when the job is done.
+@dash.callback(Output("download-plot", "data"),
+              Output('export-progress', 'children', allow_duplicate=True),
+              Output('export-poll', 'disabled', allow_duplicate=True),
+              Input('export-poll', 'n_intervals'),
+              State('export-job', 'data'),
+              prevent_initial_call=True)
+def publish_export(n_intervals, job_id):
+    job_id = page_job_id(job_id)
+    job = None if job_id is None else job_manager.get(job_id)
+    if job is None:
+        return dash.no_update, None, True
+    if not job.is_finished():
+        return dash.no_update, job_progress(job, "Export"), dash.no_update
+    job_manager.remove(job_id)
+    if job.status == 'failed':
+        return dash.no_update, html.Div(["Export failed: " + job.error]), True
+    return (job.result if job.status == 'done' else dash.no_update), None, True
+
+# background job of the analysis: the figure, and the indexes of the segmented statistics.
+# The progress is reported to the job before each step, and the job stops at the next step if a newer analysis is requested.
+@instrumented_callback
+def run_analysis_job(job, dataset_id, plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_rows_by_col_value, alg_1, alg_2, algs_select, reducer, config: 'PlotConfig', segment_conf: str = None):
+    from backends import dataset_backend
+    from perf_plot import PERFORMANCE_HOVER_COLUMNS
+    steps = 4
+    job.report(0, steps, 'loading dataset')
+    backend = dataset_backend(dataset_id, analysis_columns(mtx_name_key, strategy_key, x_axis, y_axis, drop_rows_by_col_value) + PERFORMANCE_HOVER_COLUMNS)
+    if backend is None:
+        raise LookupError(DATASET_EXPIRED_MESSAGE)
+
+    job.report(1, steps, 'dropping failed runs and collapsing repeated runs')
+    backend.prepare(mtx_name_key, strategy_key, y_axis, drop_rows_by_col_value, reducer)
+
+    job.report(2, steps, 'building figure')
+    fig = gen_figure(backend, plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_rows_by_col_value, alg_1, alg_2, algs_select, reducer, config, segment_conf)
+
+    # the indexes are built here, thus the segmented statistics are looked up at once after the analysis.
+    job.report(3, steps, 'indexing segments')
+    if plot_type == 'speedup':
+        backend.speedup_index(alg_1, alg_2, mtx_name_key, strategy_key, x_axis, y_axis, drop_rows_by_col_value, reducer)
+    elif plot_type == 'perf':
+        backend.best_perf_index(x_axis, y_axis, mtx_name_key, strategy_key, algs_select, drop_rows_by_col_value, reducer)
+
+    # the segmented statistics are updated by update_segment_statistics, from the parameters of this analysis.
+    params = dict(dataset_id=dataset_id, plot_type=plot_type, mtx=mtx_name_key, strategy=strategy_key, x=x_axis, y=y_axis,
+        drop=drop_rows_by_col_value, alg_1=alg_1, alg_2=alg_2, algs_select=algs_select, reducer=reducer, segment_conf=segment_conf)
+    plot_info = None
+    if plot_type == 'perf':
+        plot_info = html.P("Drawn {} of {} points.".format(fig.layout.meta['points_drawn'], fig.layout.meta['points_total']))
+    return dict(figure=fig, plot_info=plot_info, params=params)
+
+# on buttion click, start the analysis in a background job (the previous analysis job of the page is cancelled).
+# The server returns at once, the figure is published by publish_analysis when the job is done.
+@dash.callback(Output('analysis-job', 'data'),
+              Output('analysis-poll', 'disabled'),
+              Output('output-data-upload', 'children'),
               Input('submit-button-state', 'n_clicks'),
-              State('upload-data', 'contents'),
-              State('upload-data', 'filename'),
-              State('upload-data', 'last_modified'),
+              State('analysis-job', 'data'),
+              State('dataset-id', 'data'),
               State('plot-type', 'value'),
               State('header-selector-mtx-name', 'value'),
               State('header-selector-strategy', 'value'),
@@ -341,7 +549,7 @@ def dl_plot(n_clicks, list_of_contents, list_of_names, list_of_dates, mtx_name_k
               State('inp_alg_1', 'value'),
               State('inp_alg_2', 'value'),
               State('inp_alg_select', 'value'),
-              # segmented statistics
+              State('inp-reducer', 'value'),
               State('inp-segmented-statistics', 'value'),
               # plot style:
               State("plot_style_color", 'value'),
@@ -353,56 +561,222 @@ def dl_plot(n_clicks, list_of_contents, list_of_names, list_of_dates, mtx_name_k
               State("plot_style_legend_title", 'value'),
               State("plot_style_width", 'value'),
               State("plot_style_height", 'value'),
+              State("plot_style_large_data_threshold", 'value'),
             )
-def update_output(n_clicks, list_of_contents, list_of_names, list_of_dates,
-    plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key, alg_1, alg_2, algs_select, segment_values,
+@instrumented_callback
+def update_output(n_clicks, previous_job_id, dataset_id,
+    plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_col_key, alg_1, alg_2, algs_select, reducer, segment_conf,
     plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
-    plot_legend_title, plot_width, plot_height):
-    if list_of_contents is None:
-        print("NONE")
-    else:
-        # todo: parse multiple input files.
-        df = parse_contents(list_of_contents[0], list_of_names[0], list_of_dates[0])
-
-        drop_rows_by_col_value = None
-        if drop_col_key != None and drop_col_key != "" and drop_col_key != DROP_DEFAULT_NO_DROP:
-            drop_rows_by_col_value = drop_col_key
-
-        conf_showlegend = True if plot_showlegend == "yes" else False
-        config = PlotConfig(plot_color, plot_font_color, int(plot_font_size), plot_xaxis_title, plot_yaxis_title, conf_showlegend, plot_legend_title, int(plot_width), int(plot_height))
-
-        segments = gen_seg_list(df, x_axis, y_axis, segment_values) # get segmented integer array for the input string.
-
+    plot_legend_title, plot_width, plot_height, plot_large_data_threshold):
+    if dataset_id is None:
+        return None, True, None
+
+    drop_rows_by_col_value = drop_column(drop_col_key)
+
+    config = plot_config(plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
+        plot_legend_title, plot_width, plot_height, plot_large_data_threshold)
+    if config is None:
+        return dash.no_update, dash.no_update, html.Div(["Analysis failed: " + INVALID_STYLE_MESSAGE])
+
+    job_id = job_manager.submit(run_analysis_job, dataset_id, plot_type, mtx_name_key, strategy_key, x_axis, y_axis, drop_rows_by_col_value,
+        alg_1, alg_2, algs_select, reducer, config, segment_conf, supersedes=page_job_id(previous_job_id))
+    return job_id, False, html.Span("Analysis: waiting")
+
+# poll the analysis job of the page, and publish the figure when the job is done.
+@dash.callback(Output('output-data-upload', 'children', allow_duplicate=True),
+              Output('perf-graph-speedup', 'figure'),
+              Output('perf-graph-perf', 'figure'),
+              Output('perf-graph-pairwise', 'figure'),
+              Output('perf-graph-profile', 'figure'),
+              Output('perf-graph-speedup', 'style'),
+              Output('perf-graph-perf', 'style'),
+              Output('perf-graph-pairwise', 'style'),
+              Output('perf-graph-profile', 'style'),
+              Output('output-plot-info', 'children'),
+              Output('analysis-params', 'data'),
+              Output('analysis-poll', 'disabled', allow_duplicate=True),
+              Input('analysis-poll', 'n_intervals'),
+              State('analysis-job', 'data'),
+              prevent_initial_call=True)
+def publish_analysis(n_intervals, job_id):
+    unchanged = (dash.no_update,) * (2 * len(PLOT_GRAPH_IDS) + 2)
+    job_id = page_job_id(job_id)
+    job = None if job_id is None else job_manager.get(job_id)
+    if job is None:
+        return (None,) + unchanged + (True,)
+    if not job.is_finished():
+        return (job_progress(job, "Analysis"),) + unchanged + (dash.no_update,)
+    job_manager.remove(job_id)
+    if job.status != 'done':
+        message = None if job.status == 'cancelled' else html.Div(["Analysis failed: " + job.error])
+        return (message,) + unchanged + (True,)
+
+    # render fig: only the graph of the plot type is shown and updated.
+    plot_type = job.result['params']['plot_type']
+    hidden = {'display': 'none'}
+    figures = tuple(job.result['figure'] if t == plot_type else dash.no_update for t in PLOT_GRAPH_IDS)
+    styles = tuple({} if t == plot_type else hidden for t in PLOT_GRAPH_IDS)
+    return (None,) + figures + styles + (job.result['plot_info'], job.result['params'], True)
+
+# on plot style input, restyle the shown figure in the browser by a partial update,
+# without re-analysing the dataset or sending the traces again.
+@dash.callback(Output('perf-graph-speedup', 'figure', allow_duplicate=True),
+              Output('perf-graph-perf', 'figure', allow_duplicate=True),
+              Output('perf-graph-pairwise', 'figure', allow_duplicate=True),
+              Output('perf-graph-profile', 'figure', allow_duplicate=True),
+              Input("plot_style_color", 'value'),
+              Input("plot_style_font_color", 'value'),
+              Input("plot_style_font_size", 'value'),
+              Input("plot_style_xaxis_title", 'value'),
+              Input("plot_style_yaxis_title", 'value'),
+              Input("plot_style_showlegend", 'value'),
+              Input("plot_style_legend_title", 'value'),
+              Input("plot_style_width", 'value'),
+              Input("plot_style_height", 'value'),
+              State('analysis-params', 'data'),
+              prevent_initial_call=True)
+@instrumented_callback
+def restyle_figure(plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
+    plot_legend_title, plot_width, plot_height, params):
+    if params is None:
+        raise dash.exceptions.PreventUpdate
+    config = plot_config(plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
+        plot_legend_title, plot_width, plot_height)
+    if config is None: # a number is being typed.
+        raise dash.exceptions.PreventUpdate
+    plot_type = params['plot_type']
+    return tuple(gen_style_patch(plot_type, config) if t == plot_type else dash.no_update for t in PLOT_GRAPH_IDS)
+
+# on segmentation input (or after an analysis), update the segmented statistics table.
+# The statistics of speedup and performance plots are looked up in the sorted indexes of the analysed records,
+# thus editing the segmentation does not re-scan the dataset.
+@dash.callback(Output('segment-statistics', 'children'),
+              Output('drilldown-segment', 'options'),
+              Input('inp-segmented-statistics', 'value'),
+              Input('inp-bootstrap-ci', 'value'),
+              Input('analysis-params', 'data'))
+@instrumented_callback
+def update_segment_statistics(segment_values, bootstrap_ci, params):
+    if params is None:
+        return None, []
+    from backends import dataset_backend
+    from segmentation import parse_segment_conf, segment_bounds
+    from segment_statistics import speedup_table_columns, mean_speedup_ci_columns
+    from pairwise_speedup import cached_strategy_pivot, statistics_pairwise_in_each_segment
+    from performance_profile import statistics_profile_in_each_segment
+    from best_perf import best_perf_table_columns
+    dataset_id, plot_type, x_axis, y_axis, reducer = params['dataset_id'], params['plot_type'], params['x'], params['y'], params['reducer']
+    backend = dataset_backend(dataset_id, analysis_columns(params['mtx'], params['strategy'], x_axis, y_axis, params['drop']))
+    if backend is None:
+        return html.Div([DATASET_EXPIRED_MESSAGE]), []
+
+    values, invalid_tokens = parse_segment_conf(segment_values)
+    warning = []
+    if len(invalid_tokens) > 0:
+        warning = [html.P("Ignored invalid segmentation input: " + ", ".join(invalid_tokens), style={'color': 'red'})]
+
+    with stage('statistics'):
         if plot_type == 'speedup':
-            fig = gen_plot_speedup(df, alg_1, alg_2, mtx_name_key, x_axis, y_axis, strategy_key, drop_rows_by_col_value, config)
-            seg_table, columns =  statistics_in_each_segment(df, alg_1, alg_2, x_axis, y_axis, mtx_name_key, strategy_key, segments, drop_rows_by_col_value)
-
-            # render fig
-            return html.Div([
-                dcc.Graph(
-                    id='perf-graph-speedup',
-                    figure=fig
-                ),
-                html.Hr(),
-                html.H4("Segmented Statistics:"),
-                dash_table.DataTable(data = seg_table.to_dict('records'), columns = columns),
-                html.Hr(),  # horizontal line
-            ])
+            index = backend.speedup_index(params['alg_1'], params['alg_2'], params['mtx'], params['strategy'], x_axis, y_axis, params['drop'], reducer)
+            segments = segment_bounds(values, index.x_range[0], index.x_range[1])
+            seg_table, columns = index.statistics(segments), speedup_table_columns
+            if 'ci' in (bootstrap_ci or []):
+                seg_table['mean_speedup_ci_low'], seg_table['mean_speedup_ci_high'] = index.mean_speedup_ci(segments)
+                columns = columns + mean_speedup_ci_columns
+            title, table_options = "Segmented Statistics:", {}
+        elif plot_type == 'pairwise':
+            pivot = cached_strategy_pivot(backend, params['mtx'], params['strategy'], x_axis, y_axis, params['algs_select'], params['drop'], reducer)
+            segments = segment_bounds(values, *backend.x_range(x_axis))
+            seg_table, columns = statistics_pairwise_in_each_segment(pivot, segments)
+            title, table_options = "Pairwise Speedup Statistics:", dict(page_size=50, sort_action='native', filter_action='native')
+        elif plot_type == 'profile':
+            pivot = cached_strategy_pivot(backend, params['mtx'], params['strategy'], x_axis, y_axis, params['algs_select'], params['drop'], reducer)
+            segments = segment_bounds(values, *backend.x_range(x_axis))
+            seg_table, columns = statistics_profile_in_each_segment(pivot, segments)
+            title, table_options = "Performance Profile Statistics:", dict(page_size=50, sort_action='native', filter_action='native')
         else:
-            fig = gen_plot_performance(df, mtx_name_key, strategy_key, x_axis, y_axis, algs_select, drop_rows_by_col_value, config)
-            seg_table, columns = statistics_best_perf_in_each_segment(df, x_axis, y_axis, mtx_name_key, strategy_key, algs_select, segments, drop_rows_by_col_value)
-            return html.Div([
-                dcc.Graph(
-                    id='perf-graph-perf',
-                    figure=fig
-                ),
-                html.H4("Segmented Statistics:"),
-                dash_table.DataTable(data = seg_table.to_dict('records'), columns = columns),
-                html.Hr(),
-            ])
-
-
-@app.callback(Output('inp_alg_1', 'disabled'),
+            index = backend.best_perf_index(x_axis, y_axis, params['mtx'], params['strategy'], params['algs_select'], params['drop'], reducer)
+            segments = segment_bounds(values, index.x_range[0], index.x_range[1])
+            seg_table, columns = index.statistics(segments), best_perf_table_columns
+            title, table_options = "Segmented Statistics:", {}
+    # the segments of the drill-down table (the pairwise speedup has no per-matrix rows).
+    segment_options = [] if plot_type == 'pairwise' else [
+        {'label': '[{}, {})'.format(segments[i], segments[i + 1]), 'value': '{!r}:{!r}'.format(float(segments[i]), float(segments[i + 1]))}
+        for i in range(len(segments) - 1)]
+    return html.Div(warning + [
+        html.H4(title),
+        dash_table.DataTable(data = seg_table.to_dict('records'), columns = columns, **table_options),
+        html.Hr(),
+    ]), segment_options
+
+# the x range of the drill-down table: the selected segment, or the x range of a box/lasso selection on the shown plot.
+# The selection is reset to the first page.
+@dash.callback(Output('drilldown-range', 'data'),
+              Output('drilldown-table', 'page_current'),
+              Input('drilldown-segment', 'value'),
+              Input('perf-graph-speedup', 'selectedData'),
+              Input('perf-graph-perf', 'selectedData'),
+              prevent_initial_call=True)
+def select_drilldown_range(segment, speedup_selection, perf_selection):
+    if ctx.triggered_id == 'drilldown-segment':
+        if not segment:
+            return None, 0
+        start, end = segment.split(':')
+        return [float(start), float(end), False], 0
+    selection = speedup_selection if ctx.triggered_id == 'perf-graph-speedup' else perf_selection
+    # the x values of the selection are in data units (also on the log x axis).
+    if selection is None:
+        return None, 0
+    if 'range' in selection:
+        x = selection['range']['x']
+    elif 'lassoPoints' in selection:
+        x = selection['lassoPoints']['x']
+    else:
+        x = [p['x'] for p in selection.get('points', [])]
+    if len(x) == 0:
+        return None, 0
+    return [min(x), max(x), True], 0
+
+# the shown page of the drill-down table. The rows of the analysis are filtered and sorted on the server,
+# and only the rows of the page are sent to the browser.
+@dash.callback(Output('drilldown-table', 'data'),
+              Output('drilldown-table', 'columns'),
+              Output('drilldown-table', 'page_count'),
+              Output('drilldown-info', 'children'),
+              Output('drilldown', 'style'),
+              Input('analysis-params', 'data'),
+              Input('drilldown-range', 'data'),
+              Input('drilldown-table', 'page_current'),
+              Input('drilldown-table', 'page_size'),
+              Input('drilldown-table', 'sort_by'),
+              Input('drilldown-table', 'filter_query'))
+@instrumented_callback
+def update_drilldown_table(params, x_range, page_current, page_size, sort_by, filter_query):
+    hidden = {'display': 'none'}
+    if params is None or params['plot_type'] == 'pairwise':
+        return [], [], 0, None, hidden
+    from backends import dataset_backend
+    from drilldown import cached_speedup_drilldown, cached_perf_drilldown
+    backend = dataset_backend(params['dataset_id'], analysis_columns(params['mtx'], params['strategy'], params['x'], params['y'], params['drop']))
+    if backend is None:
+        return [], [], 0, DATASET_EXPIRED_MESSAGE, {}
+
+    with stage('drill-down'):
+        if params['plot_type'] == 'speedup':
+            table = cached_speedup_drilldown(backend, params['alg_1'], params['alg_2'], params['mtx'], params['strategy'], params['x'], params['y'], params['drop'], params['reducer'])
+        else:
+            table = cached_perf_drilldown(backend, params['mtx'], params['strategy'], params['x'], params['y'], params['algs_select'], params['drop'], params['reducer'])
+        positions = table.cached_rows(x_range, filter_query, sort_by)
+        page_size = page_size or DRILLDOWN_PAGE_SIZE
+        page_count = max(1, -(-len(positions) // page_size))
+        page_current = min(page_current or 0, page_count - 1)
+        data = table.page(positions, page_current, page_size)
+    selection = "all matrices" if x_range is None else "x in [{:g}, {:g}{}".format(x_range[0], x_range[1], ']' if x_range[2] else ')')
+    info = "{} of {} matrices ({}).".format(len(positions), len(table.x), selection)
+    return data, table.columns, page_count, info, {}
+
+
+@dash.callback(Output('inp_alg_1', 'disabled'),
               Output('inp_alg_2', 'disabled'),
               Output('inp_alg_select', 'disabled'),
               Output('plot_style_color', 'disabled'),
@@ -413,28 +787,178 @@ def set_plot_type(plot_type):
     else:
         return True, True, False, True
 
-@app.callback(Output('header-selector-mtx-name', 'options'),
+@dash.callback(Output('header-selector-mtx-name', 'options'),
               Output('header-selector-x_axis', 'options'),
               Output('header-selector-y_axis', 'options'),
               Output('header-selector-drop', 'options'),
               Output('header-selector-strategy', 'options'),
               Output('output-file-metadata', 'children'),
+              Output('dataset-id', 'data'),
               Input('upload-data', 'contents'),
+              Input('server-dataset', 'value'),
+              Input('chunked-upload-id', 'value'),
+              Input('live-follow', 'value'),
               State('upload-data', 'filename'),
               State('upload-data', 'last_modified'))
-def update_output(list_of_contents, list_of_names, list_of_dates):
-    if list_of_contents is not None:
-        headers = [parse_contents(c, n, d).columns.tolist() for c, n, d in zip(list_of_contents, list_of_names, list_of_dates)]
-        dropdown_header = [{'label': header_item, 'value': header_item} for header_item in headers[0]]
-        filename = list_of_names[0] # todo: more files?
-        file_date = list_of_dates[0]
-        file_meta_component = html.Div([html.P(filename), html.P(datetime.datetime.fromtimestamp(file_date))])
-        drop_options = [{"label": "Default (No Drop)", "value": DROP_DEFAULT_NO_DROP}] + dropdown_header
-        return dropdown_header, dropdown_header, dropdown_header, drop_options, dropdown_header, file_meta_component
+@instrumented_callback
+def update_file_headers(list_of_contents, server_file, chunked_upload, live_follow, list_of_names, list_of_dates):
+    if ctx.triggered_id not in ('server-dataset', 'chunked-upload-id', 'live-follow', 'upload-data'):
+        return [], [], [], [], [], None, None
+    from datasets import register_path, register_uploads, dataset_columns, schema_reports
+    from chunked_upload import UploadError, complete_upload, upload_file_info
+    from live_source import live_source
+    if ctx.triggered_id == 'server-dataset' and server_file in server_data_files(): # only the listed files, not any path of the server.
+        path = os.path.join(SERVER_DATA_DIR, server_file)
+        dataset_id = register_path(path)
+        list_of_names, list_of_dates = [server_file], [os.path.getmtime(path)]
+    elif ctx.triggered_id == 'chunked-upload-id' and chunked_upload:
+        upload_id = chunked_upload.split(':')[0]
+        try:
+            dataset_id = complete_upload(upload_id)
+            filename, file_date = upload_file_info(upload_id)
+        except UploadError as e:
+            return [], [], [], [], [], html.Div([str(e)]), None
+        list_of_names, list_of_dates = [filename], [file_date]
+    elif ctx.triggered_id == 'live-follow':
+        if live_source is None or 'live' not in (live_follow or []):
+            raise dash.exceptions.PreventUpdate  # stop following: the rows read so far stay analysed.
+        live_source.refresh()
+        dataset_id = live_source.dataset_id
+        list_of_names, list_of_dates = live_source.files(), [live_source.updated_at or time.time()] * len(live_source.files())
+    elif ctx.triggered_id == 'upload-data' and list_of_contents is not None:
+        dataset_id = register_uploads(list_of_contents, list_of_names, list_of_dates)
     else:
-        return [], [], [], [], [], None
-
-
+        return [], [], [], [], [], None, None
+    headers = live_source.table.columns() if live_source is not None and live_source.owns(dataset_id) else dataset_columns(dataset_id)
+    if headers is None:
+        return [], [], [], [], [], html.Div(['There was an error processing this file.']), None
+    dropdown_header = [{'label': header_item, 'value': header_item} for header_item in headers]
+    file_meta_component = html.Div([
+        html.P("{} ({})".format(filename, datetime.datetime.fromtimestamp(file_date))) for filename, file_date in zip(list_of_names, list_of_dates)
+    ])
+    if dataset_id in schema_reports:
+        bytes_before, bytes_after = schema_reports[dataset_id]
+        file_meta_component.children.append(html.P("Memory: {:.1f} MB (parsed) -> {:.1f} MB (compact schema)".format(bytes_before / 1e6, bytes_after / 1e6)))
+    drop_options = [{"label": "Default (No Drop)", "value": DROP_DEFAULT_NO_DROP}] + dropdown_header
+    return dropdown_header, dropdown_header, dropdown_header, drop_options, dropdown_header, file_meta_component, dataset_id
+
+# follow the live directory while it is checked and the live dataset is analysed.
+@dash.callback(Output('live-refresh', 'disabled'),
+              Input('live-follow', 'value'),
+              Input('dataset-id', 'data'))
+def toggle_live_refresh(live_follow, dataset_id):
+    if LIVE_DATA_DIR == None or 'live' not in (live_follow or []):
+        return True
+    from live_source import live_source
+    return live_source is None or 'live' not in (live_follow or []) or not live_source.owns(dataset_id)
+
+# on the refresh interval, read the new rows of the live directory. If there are new rows, the segmented statistics
+# are updated at once (incrementally, by the new rows only), and the figure is rebuilt by a new analysis job
+# (unless the previous job of the page is still running).
+@dash.callback(Output('dataset-id', 'data', allow_duplicate=True),
+              Output('live-status', 'children'),
+              Output('analysis-params', 'data', allow_duplicate=True),
+              Output('analysis-job', 'data', allow_duplicate=True),
+              Output('analysis-poll', 'disabled', allow_duplicate=True),
+              Input('live-refresh', 'n_intervals'),
+              State('dataset-id', 'data'),
+              State('analysis-params', 'data'),
+              State('analysis-job', 'data'),
+              # plot style:
+              State("plot_style_color", 'value'),
+              State("plot_style_font_color", 'value'),
+              State("plot_style_font_size", 'value'),
+              State("plot_style_xaxis_title", 'value'),
+              State("plot_style_yaxis_title", 'value'),
+              State("plot_style_showlegend", 'value'),
+              State("plot_style_legend_title", 'value'),
+              State("plot_style_width", 'value'),
+              State("plot_style_height", 'value'),
+              State("plot_style_large_data_threshold", 'value'),
+              prevent_initial_call=True)
+@instrumented_callback
+def refresh_live_dataset(n_intervals, dataset_id, params, previous_job_id,
+    plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
+    plot_legend_title, plot_width, plot_height, plot_large_data_threshold):
+    from live_source import live_source
+    if live_source is None or not live_source.owns(dataset_id):
+        raise dash.exceptions.PreventUpdate
+    new_rows = live_source.refresh()
+    status = html.Span(" {} rows from {} files, updated at {}".format(live_source.table.rows, len(live_source.files()),
+        datetime.datetime.fromtimestamp(live_source.updated_at or time.time()).strftime('%H:%M:%S')))
+    if new_rows == 0:
+        return dash.no_update, status, dash.no_update, dash.no_update, dash.no_update
+    dataset_id = live_source.dataset_id
+    if params is None or not live_source.owns(params['dataset_id']):
+        return dataset_id, status, dash.no_update, dash.no_update, dash.no_update
+
+    params = dict(params, dataset_id=dataset_id)
+    previous_job_id = page_job_id(previous_job_id)
+    previous_job = None if previous_job_id is None else job_manager.get(previous_job_id)
+    config = plot_config(plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
+        plot_legend_title, plot_width, plot_height, plot_large_data_threshold)
+    # the figure is rebuilt after the running job of the page, and once the plot style is valid (the statistics are updated).
+    if (previous_job is not None and not previous_job.is_finished()) or config is None:
+        return dataset_id, status, params, dash.no_update, dash.no_update
+    job_id = job_manager.submit(run_analysis_job, dataset_id, params['plot_type'], params['mtx'], params['strategy'], params['x'], params['y'], params['drop'],
+        params['alg_1'], params['alg_2'], params['algs_select'], params['reducer'], config, params.get('segment_conf'))
+    return dataset_id, status, params, job_id, False
+
+if PROFILE_ENABLED:
+    # list the stages of the recent callback invocations in the debug panel.
+    @dash.callback(Output('profile-panel', 'children'),
+                  Input('profile-interval', 'n_intervals'))
+    def update_profile_panel(n_intervals):
+        rows = []
+        for r in recent_invocations(20):
+            for s in r['stages']:
+                rows.append(dict(time=datetime.datetime.fromtimestamp(r['start']).strftime('%H:%M:%S'), callback=r['callback'],
+                    stage=s['name'], wall_ms=round(s['wall'] * 1000, 2), peak_mb=round(s['peak'] / 1e6, 2),
+                    payload_kb=round(r['values'].get('payload_bytes', 0) / 1e3, 1), error=r['error']))
+        return dash_table.DataTable(data=rows, columns=[dict(id=c, name=c) for c in ['time', 'callback', 'stage', 'wall_ms', 'peak_mb', 'payload_kb', 'error']], page_size=20)
+
+# local metrics endpoint: aggregated and recent timings of the callbacks, in json.
+def metrics():
+    if flask.request.remote_addr not in ('127.0.0.1', '::1'):
+        flask.abort(403)
+    return flask.jsonify(summary=metrics_summary(), recent=recent_invocations(int(flask.request.args.get('limit', 20))))
+
+# chunked upload: start (or resume) the upload of a file, json body: filename, size and last_modified.
+# return the upload id and the offset to continue from.
+def chunked_upload_init():
+    from chunked_upload import UploadError, init_upload
+    body = flask.request.get_json(force=True, silent=True) or {}
+    try:
+        return flask.jsonify(init_upload(str(body.get('filename', '')), int(body.get('size', -1)), body.get('last_modified')))
+    except (UploadError, TypeError, ValueError) as e:
+        return flask.jsonify(error=str(e)), 400
+
+# chunked upload: append the request body at the offset, return the offset of the next chunk.
+def chunked_upload_chunk(upload_id):
+    from chunked_upload import UploadError, append_chunk, UPLOAD_CHUNK_BYTES
+    if flask.request.content_length is None or flask.request.content_length > UPLOAD_CHUNK_BYTES:
+        return flask.jsonify(error='chunk larger than {} bytes'.format(UPLOAD_CHUNK_BYTES)), 413
+    try:
+        offset = append_chunk(upload_id, int(flask.request.args.get('offset', -1)), flask.request.get_data())
+    except (UploadError, ValueError) as e:
+        return flask.jsonify(error=str(e)), 400
+    return flask.jsonify(offset=offset)
+
+
+# create the Dash app of the page: the layout, the callbacks (registered by dash.callback above) and the server routes.
+# The analysis modules are not imported here, they are loaded by the first callback using them.
+def create_app():
+    app = Dash(__name__, external_stylesheets=external_stylesheets)
+    app.layout = layout
+    app.server.add_url_rule('/metrics', view_func=metrics)
+    app.server.add_url_rule('/upload/init', view_func=chunked_upload_init, methods=['POST'])
+    app.server.add_url_rule('/upload/<upload_id>', view_func=chunked_upload_chunk, methods=['PUT'])
+    return app
+
+
+app = create_app()
+# the flask server, for serving by a WSGI server with several worker processes, e.g. `gunicorn -w 4 main:server`.
+server = app.server
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from dash.dash_table import FormatTemplate
+from dash.dash_table.Format import Format, Scheme
+
+from speedup_versus import PlotConfig
+from segmentation import *
+from selection import select_strategy_rows, selection_cache
+from repetitions import DEFAULT_REDUCER, prepare_records
+
+percentage = FormatTemplate.percentage(4)
+
+# upper bound of the number of (matrix, strategy, strategy) comparisons in one chunk when counting beats.
+BEAT_CHUNK_ELEMENTS = 1 << 23
+
+
+# y values of the selected strategies on each matrix, as a dense (matrix x strategy) array.
+# Missing records are NaN, and repeated records of the same (matrix, strategy) are averaged.
+class StrategyPivot:
+    def __init__(self, mtx_names, strategies, x, y):
+        self.mtx_names = mtx_names  # N matrix names
+        self.strategies = strategies  # K strategy names
+        self.x = x  # x value of each matrix, shape (N,)
+        self.y = y  # y value of each matrix and strategy, shape (N, K)
+
+
+def pivot_strategies(csr_data, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, algs_select: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    records = prepare_records(csr_data, keys_csr_mtx, keys_strategy, keys_flops, drop_rows_by_col_value, reducer)
+    tab = select_strategy_rows(records, keys_strategy, algs_select, None)
+    return pivot_selection(tab, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, algs_select)
+
+# pivot the selected records (see select_strategy_rows), strategies are ordered as in algs_select.
+# The records without matrix name (NaN) or of another strategy are left out.
+def pivot_selection(tab, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, algs_select: [str]):
+    mtx_code, mtx_names = pd.factorize(tab[keys_csr_mtx])
+    present = set(pd.unique(tab[keys_strategy]))
+    strategies = [a for a in algs_select if a in present]
+    strategy_code = pd.Index(strategies).get_indexer(tab[keys_strategy])
+    n, k = len(mtx_names), len(strategies)
+
+    keep = (mtx_code >= 0) & (strategy_code >= 0)
+    mtx_code, strategy_code = mtx_code[keep], strategy_code[keep]
+    flops = tab[keys_flops].to_numpy(dtype=np.float64)[keep]
+    has_value = ~np.isnan(flops)
+    cell = mtx_code * k + strategy_code
+    sums = np.bincount(cell[has_value], weights=flops[has_value], minlength=n * k)
+    counts = np.bincount(cell[has_value], minlength=n * k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = (sums / counts).reshape(n, k)
+
+    # x value of a matrix: its first record.
+    x = np.full(n, np.nan)
+    codes, first = np.unique(mtx_code, return_index=True)
+    x[codes] = tab[keys_nnz].to_numpy(dtype=np.float64)[keep][first]
+    return StrategyPivot(np.asarray(mtx_names), strategies, x, y)
+
+
+# the pivot of the selected strategies of a dataset (from the selection of its backend, see backends.py),
+# shared by the figure and the tables.
+def cached_strategy_pivot(backend, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, algs_select: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    key = ('pivot', backend.dataset_id, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, tuple(algs_select), drop_rows_by_col_value, reducer)
+    return selection_cache.get_or_compute(key, lambda: pivot_selection(
+        backend.strategy_rows(keys_csr_mtx, keys_strategy, keys_flops, algs_select, drop_rows_by_col_value, reducer),
+        keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, algs_select))
+
+
+# compute the geometric mean speedup and the beat count of every strategy i over every strategy j,
+# on the matrices having valid (positive) y values of both strategies.
+# It returns (geomean, beat_count, total_count), each of shape (K, K).
+def pairwise_speedup(y):
+    valid = np.isfinite(y) & (y > 0)
+    log_y = np.where(valid, np.log(np.where(valid, y, 1.0)), 0.0)
+    valid_f = valid.astype(np.float64)
+
+    # log_sum[i, j]: sum of log(y_i) on matrices where both i and j are valid.
+    log_sum = log_y.T @ valid_f
+    total_count = np.rint(valid_f.T @ valid_f).astype(np.int64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        geomean = np.exp((log_sum - log_sum.T) / total_count)
+
+    # beat_count[i, j]: number of matrices where y_i >= y_j, counted in chunks of matrices to bound the memory.
+    n, k = y.shape
+    beat_count = np.zeros((k, k), dtype=np.int64)
+    chunk = max(1, BEAT_CHUNK_ELEMENTS // max(1, k * k))
+    for start in range(0, n, chunk):
+        y_c = y[start:start + chunk]
+        v_c = valid[start:start + chunk]
+        beat = (y_c[:, :, None] >= y_c[:, None, :]) & v_c[:, :, None] & v_c[:, None, :]
+        beat_count += beat.sum(axis=0)
+    return geomean, beat_count, total_count
+
+
+# pairwise speedup statistics of all strategies in the whole x range and in each segment.
+# Each strategy pair (i, j) with i before j in the selection is listed once: the speedup of j over i is the reciprocal.
+def statistics_pairwise_in_each_segment(pivot: StrategyPivot, segments: [int]):
+    k = len(pivot.strategies)
+    first, second = np.triu_indices(k, 1)
+    ranges = [(segments[0], segments[-1], np.ones(len(pivot.x), dtype=bool))]
+    seg = assign_segments(pivot.x, segments)
+    ranges += [(segments[i], segments[i + 1], seg == i) for i in range(len(segments) - 1)]
+
+    parts = []
+    for range_start, range_end, in_range in ranges:
+        geomean, beat_count, total_count = pairwise_speedup(pivot.y[in_range])
+        total = total_count[first, second]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beat_ratio = np.where(total == 0, 0, beat_count[first, second] / total)
+        parts.append(pd.DataFrame({
+            'alg1': [pivot.strategies[i] for i in first],
+            'alg2': [pivot.strategies[j] for j in second],
+            'xstart': range_start,
+            'xend': range_end,
+            'geomean_speedup': geomean[first, second],
+            'beat_count': beat_count[first, second],
+            'total_count': total,
+            'beat_ratio': beat_ratio,
+        }))
+    df1 = pd.concat(parts, ignore_index=True)
+    # column in table
+    columns = [
+        dict(id='alg1', name='Algorithm 1'),
+        dict(id='alg2', name='Algorithm 2'),
+        dict(id='xstart', name='X Start'),
+        dict(id='xend', name='X End (not include)'),
+        dict(id='geomean_speedup', name='Geomean Speedup', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
+        dict(id='beat_count', name='Beat count'),
+        dict(id='total_count', name='Total Count'),
+        dict(id='beat_ratio', name='Beat Ratio', type='numeric', format=percentage),
+    ]
+    return df1, columns
+
+
+# heatmap of the geometric mean speedup of each strategy (row) over each other strategy (column).
+def gen_plot_pairwise_speedup(pivot: StrategyPivot, config: PlotConfig):
+    geomean, beat_count, total_count = pairwise_speedup(pivot.y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beat_ratio = beat_count / total_count
+    fig = go.Figure(go.Heatmap(
+        z=np.log2(geomean),
+        x=pivot.strategies,
+        y=pivot.strategies,
+        customdata=np.dstack([geomean, beat_ratio]),
+        text=np.char.mod('%.3f', geomean),
+        texttemplate='%{text}',
+        hovertemplate='%{y} vs %{x}<br>geomean speedup: %{customdata[0]:.4f}<br>beat ratio: %{customdata[1]:.2%}<extra></extra>',
+        colorscale='RdBu',
+        zmid=0,
+        colorbar=dict(title='log2 speedup'),
+    ))
+    fig.update_layout(
+        xaxis=dict(title='Baseline Algorithm', tickangle=-45),
+        yaxis=dict(title='Algorithm', autorange='reversed'),
+        plot_bgcolor="rgb(255,255,255)",
+        width=config.width,
+        height=config.height,
+        margin=dict(l=0, r=0, b=0, t=0),
+        font=dict(
+            family="Times New Roman, monospace",
+            size=config.font_size,
+            color=config.font_color
+        )
+    )
+    return fig
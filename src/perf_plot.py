@@ -2,20 +2,64 @@
 
 import plotly.graph_objects as go
 import plotly.express as px
-import plotly.io as pio   
 
+import numpy as np
 import pandas as pd
-pio.kaleido.scope.mathjax = None
 
 from speedup_versus import *
+from selection import select_strategy_rows
+from repetitions import DEFAULT_REDUCER, prepare_records
 
+# columns shown when hovering a point (if the dataset has them).
+PERFORMANCE_HOVER_COLUMNS = ['nnz/row', 'mid calc cost', 'mid total cost']
 
-def gen_plot_performance(csr_data, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, algs_select: [str], drop_rows_by_col_value: str, config: PlotConfig):
-    keys_hover_data = ['nnz/row', 'mid calc cost', 'mid total cost']
-    tab = csr_data[csr_data[keys_strategy].isin(algs_select)]
-    # drop failed records
-    if drop_rows_by_col_value != None:
-        tab.drop(tab[(tab[drop_rows_by_col_value] > 0)].index, inplace=True)
+# Downsample the records for plotting on the log-scaled x axis.
+# For each strategy, the x axis is split into `bins` bins of equal width in log scale (about one pixel per bin),
+# and only the records with the min and the max y in each bin are kept.
+# Thus the outliers and the extremes of each strategy are always drawn.
+# Records which can not be drawn (non-positive x, missing y) are removed.
+def downsample_min_max(tab, keys_strategy, keys_nnz, keys_flops, bins: int):
+    x = tab[keys_nnz].to_numpy(dtype=np.float64)
+    y = tab[keys_flops].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_x = np.log10(x)
+    drawable = np.flatnonzero(np.isfinite(log_x) & ~np.isnan(y))
+    if len(drawable) == 0:
+        return tab.iloc[drawable]
+    log_x = log_x[drawable]
+    y = y[drawable]
+
+    lo, hi = log_x.min(), log_x.max()
+    if hi > lo:
+        x_bin = np.minimum(((log_x - lo) / (hi - lo) * bins).astype(np.int64), bins - 1)
+    else:
+        x_bin = np.zeros(len(log_x), dtype=np.int64)
+    strategy_code = pd.factorize(tab[keys_strategy].to_numpy()[drawable])[0]
+    bin_key = strategy_code.astype(np.int64) * bins + x_bin
+
+    # sort by bin, then by y: the first and the last record of each bin are the min and the max.
+    order = np.lexsort((y, bin_key))
+    sorted_key = bin_key[order]
+    first = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+    last = np.r_[first[1:] - 1, len(order) - 1]
+    keep = np.unique(np.concatenate([order[first], order[last]]))
+    return tab.iloc[drawable[keep]]
+
+def gen_plot_performance(csr_data, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, algs_select: [str], drop_rows_by_col_value: str, config: PlotConfig, reducer: str = DEFAULT_REDUCER):
+    # drop failed records, collapse repetitions and select strategies
+    records = prepare_records(csr_data, keys_csr_mtx, keys_strategy, keys_flops, drop_rows_by_col_value, reducer)
+    tab = select_strategy_rows(records, keys_strategy, algs_select, None)
+    return gen_plot_performance_of_selection(tab, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, config)
+
+# performance plot of the selected records (see select_strategy_rows).
+def gen_plot_performance_of_selection(tab, keys_csr_mtx, keys_strategy, keys_nnz, keys_flops, config: PlotConfig):
+    keys_hover_data = [c for c in PERFORMANCE_HOVER_COLUMNS if c in tab.columns]
+
+    # large data mode: render by WebGL and only send about 2 points per pixel of each strategy to the browser.
+    points_total = len(tab)
+    large_data = points_total > config.large_data_threshold
+    if large_data:
+        tab = downsample_min_max(tab, keys_strategy, keys_nnz, keys_flops, config.width)
 
     fig = px.scatter(tab,
         x=keys_nnz,
@@ -33,6 +77,7 @@ def gen_plot_performance(csr_data, keys_csr_mtx, keys_strategy, keys_nnz, keys_f
         # trendline_options=dict(function="median", window=5),
         # trendline_options=dict(window=10),
         # trendline="expanding",
+        render_mode='webgl' if large_data else 'svg',
         ).update_traces(marker_size=3) # "lines+markers"
 
     # fig.update_traces(marker_size=1)
@@ -41,8 +86,6 @@ def gen_plot_performance(csr_data, keys_csr_mtx, keys_strategy, keys_nnz, keys_f
 
     # remove pointes
     # fig.data = [t for t in fig.data if t.mode == "lines"] #trendlines have showlegend=False by default
-    fig.update_traces(showlegend=config.showlegend) 
-
     fig.update_layout(legend=dict(
         yanchor="top",
         y=0.99,
@@ -81,12 +124,15 @@ def gen_plot_performance(csr_data, keys_csr_mtx, keys_strategy, keys_nnz, keys_f
         margin=dict(l=0, r=0,b=0,t=0),
         width=config.width,
         height=config.height,
+        showlegend=config.showlegend, # in layout (not in traces), thus it can be restyled without the traces.
         legend_title=config.legend_title,
         font=dict(
             family="Times New Roman, monospace",
             size=config.font_size,
             color=config.font_color,
-        )
+        ),
+        # number of points drawn and available, shown under the plot.
+        meta=dict(points_drawn=len(tab), points_total=points_total),
     )
 
     return fig
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.colors
+
+from dash.dash_table import FormatTemplate
+
+from speedup_versus import PlotConfig
+from segmentation import *
+
+percentage = FormatTemplate.percentage(2)
+
+# factors of the best performance listed in the segmented statistics of the performance profile.
+PROFILE_TAUS = [1.0, 1.1, 1.25, 1.5, 2.0]
+
+
+# performance ratios of each matrix and strategy (Dolan and More): the best y of the matrix over the y of the strategy,
+# thus the best strategy has ratio 1 and a strategy within a factor tau of the best has ratio <= tau.
+# y is the (matrix x strategy) array of a StrategyPivot, a higher y is better. A strategy without a valid (positive)
+# y on the matrix has an infinite ratio. The matrices without any valid y are skipped.
+# It returns the ratios of shape (M, K) and the mask of the M kept matrices.
+def performance_ratios(y):
+    valid = np.isfinite(y) & (y > 0)
+    best = np.max(np.where(valid, y, -np.inf), axis=1)
+    kept = np.isfinite(best)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(valid, best[:, None] / y, np.inf)
+    return ratios[kept], kept
+
+
+# Performance profile of each strategy: rho_s(tau), the fraction of the matrices where strategy s is within a factor tau
+# of the best strategy. The ratios of each strategy are sorted once (O(N K log N)), rho_s(tau) is a binary search.
+class PerformanceProfile:
+    def __init__(self, ratios):
+        self.sorted_ratios = np.sort(ratios, axis=0)  # shape (N, K), the infinite ratios are at the end.
+        self.matrices = ratios.shape[0]
+
+    # rho of each tau (rows) and each strategy (columns).
+    def fractions(self, taus):
+        taus = np.asarray(taus, dtype=np.float64)
+        counts = [np.searchsorted(self.sorted_ratios[:, s], taus, side='right') for s in range(self.sorted_ratios.shape[1])]
+        if len(counts) == 0:
+            return np.empty((len(taus), 0))
+        return np.stack(counts, axis=1) / max(1, self.matrices)  # a range without any matrix has no strategy within tau.
+
+    # the max finite ratio of all strategies (at least 1): the profiles are constant after it.
+    def max_ratio(self):
+        finite = self.sorted_ratios[np.isfinite(self.sorted_ratios)]
+        return max(1.0, finite.max()) if len(finite) > 0 else 1.0
+
+    # the steps of the profile of strategy s, as (tau, rho) points up to tau_end.
+    # With more than max_points steps, the profile is sampled on max_points log-spaced taus (about one per pixel).
+    def steps(self, s: int, tau_end: float, max_points: int):
+        ratios = self.sorted_ratios[:, s]
+        ratios = ratios[np.isfinite(ratios)]
+        if len(ratios) > max_points:
+            taus = np.geomspace(1.0, tau_end, max_points)
+            return taus, np.searchsorted(ratios, taus, side='right') / max(1, self.matrices)
+        # the last of the equal ratios is the step: rho counts all the matrices at or below it.
+        last = np.flatnonzero(np.r_[ratios[1:] != ratios[:-1], True]) if len(ratios) > 0 else np.empty(0, dtype=np.int64)
+        taus = np.r_[1.0, ratios[last], tau_end]
+        rho = np.r_[0.0, last + 1, len(ratios)] / max(1, self.matrices)
+        return taus, rho
+
+
+# the performance profile of the matrices of each range: the whole x range, then each segment [segments[i], segments[i + 1]).
+# It returns a list of (range_start, range_end, PerformanceProfile).
+def profiles_in_each_segment(pivot, segments: [float]):
+    ratios, kept = performance_ratios(pivot.y)
+    x = pivot.x[kept]
+    profiles = [(segments[0], segments[-1], PerformanceProfile(ratios))]
+    seg = assign_segments(x, segments)
+    profiles += [(segments[i], segments[i + 1], PerformanceProfile(ratios[seg == i])) for i in range(len(segments) - 1)]
+    return profiles
+
+
+# fraction of the matrices where each strategy is within the factors PROFILE_TAUS of the best, in the whole x range and in each segment.
+def statistics_profile_in_each_segment(pivot, segments: [float]):
+    parts = []
+    for range_start, range_end, profile in profiles_in_each_segment(pivot, segments):
+        rho = profile.fractions(PROFILE_TAUS)
+        part = pd.DataFrame({
+            'algo': pivot.strategies,
+            'xstart': range_start,
+            'xend': range_end,
+            'total_count': profile.matrices,
+        })
+        for i, tau in enumerate(PROFILE_TAUS):
+            part[_tau_column(tau)] = rho[i]
+        parts.append(part)
+    df = pd.concat(parts, ignore_index=True)
+    columns = [
+        dict(id='algo', name='Algorithm'),
+        dict(id='xstart', name='X Start'),
+        dict(id='xend', name='X End (not include)'),
+        dict(id='total_count', name='Total Count'),
+    ] + [dict(id=_tau_column(tau), name='Within {:g}x of Best'.format(tau), type='numeric', format=percentage) for tau in PROFILE_TAUS]
+    return df, columns
+
+
+def _tau_column(tau: float):
+    return 'within_' + '{:g}'.format(tau).replace('.', '_')
+
+
+# performance profile plot: rho_s(tau) of each strategy on a log tau axis.
+# With segments, the profile of each segment is drawn too and a menu of the figure switches between the ranges
+# (the whole x range is shown first). A strategy has the same color in every range.
+def gen_plot_performance_profile(pivot, config: PlotConfig, segments: [float] = None):
+    if segments == None or len(segments) < 3:  # a single segment is the whole range.
+        ranges = [(None, None, PerformanceProfile(performance_ratios(pivot.y)[0]))]
+    else:
+        ranges = profiles_in_each_segment(pivot, segments)
+    tau_end = max(p.max_ratio() for _, _, p in ranges) * 1.05
+    colors = plotly.colors.qualitative.Plotly
+    # the steps of a profile are drawn exactly, unless there are more than about 2 per pixel of the width.
+    max_points = 2 * config.width
+
+    traces = []
+    for r, (range_start, range_end, profile) in enumerate(ranges):
+        for s, strategy in enumerate(pivot.strategies):
+            taus, rho = profile.steps(s, tau_end, max_points)
+            traces.append(go.Scatter(x=taus, y=rho, mode='lines', line=dict(shape='hv', color=colors[s % len(colors)]),
+                name=strategy, legendgroup=strategy, visible=r == 0,
+                hovertemplate=strategy + '<br>within %{x:.3f}x of the best on %{y:.2%} of the matrices<extra></extra>'))
+    fig = go.Figure(traces)
+
+    if len(ranges) > 1:
+        k = len(pivot.strategies)
+        buttons = []
+        for r, (range_start, range_end, profile) in enumerate(ranges):
+            label = 'All matrices' if r == 0 else '[{}, {})'.format(range_start, range_end)
+            visible = [i // k == r for i in range(len(traces))]
+            buttons.append(dict(label='{} ({} matrices)'.format(label, profile.matrices), method='update', args=[{'visible': visible}]))
+        fig.update_layout(updatemenus=[dict(buttons=buttons, direction='down', x=0.01, xanchor='left', y=0.99, yanchor='top')])
+
+    fig.update_layout(
+        xaxis=dict(
+            title='Factor of the best performance (tau)',
+            type='log',
+            ticks="inside",
+            gridcolor="#e8e8e8",
+            gridwidth=0.5,
+        ),
+        yaxis=dict(
+            title='Fraction of matrices',
+            ticks="inside",
+            range=[0, 1.02],
+            tickformat='.0%',
+            gridcolor="#e8e8e8",
+            gridwidth=0.5,
+        ),
+        plot_bgcolor="rgb(255,255,255)",
+        width=config.width,
+        height=config.height,
+        showlegend=config.showlegend,
+        legend_title=config.legend_title,
+        legend=dict(yanchor="bottom", y=0.01, xanchor="right", x=0.99),
+        margin=dict(l=0, r=0, b=0, t=0),
+        font=dict(
+            family="Times New Roman, monospace",
+            size=config.font_size,
+            color=config.font_color
+        )
+    )
+    fig.update_xaxes(showline = True, linecolor = 'black', linewidth = 1, mirror = True)
+    fig.update_yaxes(showline = True, linecolor = 'black', linewidth = 1, mirror = True)
+    return fig
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+from settings import REDUCERS, DEFAULT_REDUCER
+
+# ratio of the records cut from each side of a group by the trimmed mean.
+TRIM_RATIO = 0.1
+
+
+# trimmed mean of the values of each group, values are sorted within each group by one lexsort.
+# NaN values are ignored, the mean of a group without any value is NaN.
+def _trimmed_mean(values, group, n_groups: int, trim_ratio: float):
+    valid = ~np.isnan(values)
+    values, group = values[valid], group[valid]
+    order = np.lexsort((values, group))
+    values, group = values[order], group[order]
+    count = np.bincount(group, minlength=n_groups)
+    start = np.concatenate([[0], np.cumsum(count)[:-1]])
+    rank = np.arange(len(values)) - start[group]
+    cut = np.floor(count * trim_ratio).astype(np.int64)
+    kept = (rank >= cut[group]) & (rank < (count - cut)[group])
+    sums = np.bincount(group[kept], weights=values[kept], minlength=n_groups)
+    kept_count = np.bincount(group[kept], minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sums / kept_count
+
+
+# collapse the repeated records of each (matrix, strategy) into one record, by one groupby:
+# the y value is reduced by the reducer (see REDUCERS), the other columns are taken from the first record.
+# The dataframe is returned as is if there is no repeated record.
+def collapse_repetitions(csr_data, mtx_column: str, alg_column: str, y_column: str, reducer: str = DEFAULT_REDUCER):
+    keys = [mtx_column, alg_column]
+    with stage('collapse repetitions'):
+        if not csr_data.duplicated(subset=keys).any():
+            return csr_data
+        return _collapse(csr_data, keys, y_column, reducer)
+
+
+def _collapse(csr_data, keys: [str], y_column: str, reducer: str):
+    grouped = csr_data.groupby(keys, observed=True, sort=False, dropna=False)
+    group = grouped.ngroup().to_numpy()
+    _, first = np.unique(group, return_index=True)  # groups are numbered in order of their first record.
+    if reducer == 'trimmed_mean':
+        reduced = _trimmed_mean(csr_data[y_column].to_numpy(dtype=np.float64), group, len(first), TRIM_RATIO)
+    elif reducer in ('median', 'min'):
+        reduced = grouped[y_column].agg(reducer).to_numpy()
+    elif reducer == 'best':
+        reduced = grouped[y_column].max().to_numpy()
+    else:
+        raise ValueError('unknown reducer: ' + str(reducer))
+    collapsed = csr_data.iloc[np.sort(first)].copy()
+    collapsed[y_column] = reduced
+    return collapsed
+
+
+# reduce the values of each group by the reducer (see REDUCERS), the same values as collapse_repetitions,
+# where group is the group number (0 to n_groups - 1) of each value. It returns the reduced value of each group.
+# NaN values are ignored, the value of a group without any value is NaN.
+def reduce_groups(values, group, n_groups: int, reducer: str = DEFAULT_REDUCER):
+    values = np.asarray(values, dtype=np.float64)
+    if reducer == 'trimmed_mean':
+        return _trimmed_mean(values, group, n_groups, TRIM_RATIO)
+    elif reducer in ('median', 'min', 'best'):
+        grouped = pd.Series(values).groupby(group)
+        reduced = grouped.max() if reducer == 'best' else grouped.agg(reducer)
+        return reduced.reindex(range(n_groups)).to_numpy()
+    raise ValueError('unknown reducer: ' + str(reducer))
+
+
+# drop the failed records (if drop column is given) and collapse the repeated records (see collapse_repetitions).
+# The failed runs are dropped before collapsing, thus they do not take part in the reduced value.
+def prepare_records(csr_data, mtx_column: str, alg_column: str, y_column: str, drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    if drop_rows_by_col_value != None:
+        csr_data = csr_data[~(csr_data[drop_rows_by_col_value] > 0)]
+    return collapse_repetitions(csr_data, mtx_column, alg_column, y_column, reducer)
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+# a text column is converted to a categorical column if its distinct values are at most this ratio of its rows,
+# e.g. the matrix name column (one row per matrix and strategy) and the strategy column.
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+
+
+# memory usage of a dataframe, in bytes.
+def memory_bytes(df: pd.DataFrame):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# downcast a float column to float32 if all its values are exactly representable in float32.
+def _downcast_float(s: pd.Series):
+    if s.dtype == np.float32:
+        return s
+    values = s.to_numpy()
+    with np.errstate(over='ignore', invalid='ignore'):
+        f32 = values.astype(np.float32)
+    if np.array_equal(f32.astype(values.dtype), values, equal_nan=True):
+        return pd.Series(f32, index=s.index, name=s.name)
+    return s
+
+
+# Normalize the column types of a parsed dataset:
+# text columns of repeated values (e.g. matrix names, strategies) become categorical,
+# integer columns are downcast to the smallest integer type and float columns to float32 if no precision is lost.
+# The categories of a column are shared by all its rows, thus selections and joins of the same column compare codes.
+# It returns the normalized dataframe and the memory usage (in bytes) before and after.
+def normalize_schema(df: pd.DataFrame):
+    bytes_before = memory_bytes(df)
+    columns = {}
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object:
+            if s.nunique(dropna=True) <= CATEGORICAL_MAX_UNIQUE_RATIO * len(s):
+                s = s.astype('category')
+        elif pd.api.types.is_integer_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+            s = pd.to_numeric(s, downcast='integer')
+        elif pd.api.types.is_float_dtype(s.dtype):
+            s = _downcast_float(s)
+        columns[col] = s
+    df = pd.DataFrame(columns, index=df.index)
+    return df, (bytes_before, memory_bytes(df))
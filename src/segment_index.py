@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+from segment_statistics import SEGMENT_TABLE_COLUMNS, pair_speedup, bootstrap_mean_ci
+from selection import selection_cache
+from repetitions import DEFAULT_REDUCER
+
+# block size of RangeMinMax: a query scans at most 2 partial blocks.
+RANGE_BLOCK_SIZE = 256
+
+
+# start (included) and end (not included) positions of each segment [segments[i], segments[i + 1]) in the sorted x values.
+def segment_positions(sorted_x, segments: [float]):
+    bounds = np.asarray(segments, dtype=np.float64)
+    lo = np.searchsorted(sorted_x, bounds[:-1], side='left')
+    hi = np.searchsorted(sorted_x, bounds[1:], side='left')
+    return lo, np.maximum(lo, hi) # a segment with its end before its start is empty.
+
+
+# max and min of any range of an array in O(block size) time:
+# the max/min of whole blocks come from a sparse table over the blocks, the partial blocks are scanned.
+# NaN values are ignored, the max/min of a range without any value is NaN.
+class RangeMinMax:
+    def __init__(self, values):
+        isnan = np.isnan(values)
+        self.max_values = np.where(isnan, -np.inf, values)
+        self.min_values = np.where(isnan, np.inf, values)
+        self.valid_prefix = np.concatenate([[0], np.cumsum(~isnan)])
+
+        n_blocks = len(values) // RANGE_BLOCK_SIZE
+        whole = n_blocks * RANGE_BLOCK_SIZE
+        self.max_table = [self.max_values[:whole].reshape(n_blocks, RANGE_BLOCK_SIZE).max(axis=1)]
+        self.min_table = [self.min_values[:whole].reshape(n_blocks, RANGE_BLOCK_SIZE).min(axis=1)]
+        step = 1
+        while 2 * step <= n_blocks:
+            self.max_table.append(np.maximum(self.max_table[-1][:-step], self.max_table[-1][step:]))
+            self.min_table.append(np.minimum(self.min_table[-1][:-step], self.min_table[-1][step:]))
+            step *= 2
+
+    # max and min of values[lo:hi].
+    def query(self, lo: int, hi: int):
+        if self.valid_prefix[hi] - self.valid_prefix[lo] == 0:
+            return np.nan, np.nan
+        first_block = -(-lo // RANGE_BLOCK_SIZE)
+        end_block = hi // RANGE_BLOCK_SIZE
+        if first_block >= end_block:
+            return self.max_values[lo:hi].max(), self.min_values[lo:hi].min()
+        level = int(end_block - first_block).bit_length() - 1
+        vmax = max(self.max_table[level][first_block], self.max_table[level][end_block - (1 << level)])
+        vmin = min(self.min_table[level][first_block], self.min_table[level][end_block - (1 << level)])
+        block_lo, block_hi = first_block * RANGE_BLOCK_SIZE, end_block * RANGE_BLOCK_SIZE
+        if lo < block_lo:
+            vmax = max(vmax, self.max_values[lo:block_lo].max())
+            vmin = min(vmin, self.min_values[lo:block_lo].min())
+        if block_hi < hi:
+            vmax = max(vmax, self.max_values[block_hi:hi].max())
+            vmin = min(vmin, self.min_values[block_hi:hi].min())
+        return vmax, vmin
+
+
+# Index of the speedup of 2 algorithms sorted by x, with cumulative counts, sums and win counts,
+# thus the statistics of any segmentation are resolved in O(segments * log N) without touching the records.
+class SpeedupIndex:
+    def __init__(self, sorted_merged_data, alg_a: str, alg_b: str, x_column: str, y_column: str, x_range):
+        self.alg_a = alg_a
+        self.alg_b = alg_b
+        self.x_range = x_range  # (min, max) of x column of the whole dataset, for the first and last boundaries.
+        self.x = sorted_merged_data[x_column + '_x'].to_numpy(dtype=np.float64)
+        speedup = pair_speedup(sorted_merged_data, y_column)
+
+        finite = np.isfinite(speedup)
+        self.sum_prefix = np.concatenate([[0.0], np.cumsum(np.where(finite, speedup, 0.0))])
+        self.finite_prefix = np.concatenate([[0], np.cumsum(finite)])
+        self.pos_inf_prefix = np.concatenate([[0], np.cumsum(speedup == np.inf)])
+        self.neg_inf_prefix = np.concatenate([[0], np.cumsum(speedup == -np.inf)])
+        self.beat_prefix = np.concatenate([[0], np.cumsum(speedup >= 1.0)])
+        self.min_max = RangeMinMax(speedup)
+        self.speedup = speedup
+
+    # speedup statistics of each segment, the same table as statistics_of_merged_pair.
+    def statistics(self, segments: [float]):
+        lo, hi = segment_positions(self.x, segments)
+        total_count = hi - lo
+        beat_count = self.beat_prefix[hi] - self.beat_prefix[lo]
+        finite_count = self.finite_prefix[hi] - self.finite_prefix[lo]
+        pos_inf = (self.pos_inf_prefix[hi] - self.pos_inf_prefix[lo]) > 0
+        neg_inf = (self.neg_inf_prefix[hi] - self.neg_inf_prefix[lo]) > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_speedup = (self.sum_prefix[hi] - self.sum_prefix[lo]) / finite_count
+            beat_ratio = np.where(total_count == 0, 0, beat_count / total_count)
+        mean_speedup = np.where(pos_inf, np.inf, mean_speedup)
+        mean_speedup = np.where(neg_inf, np.where(pos_inf, np.nan, -np.inf), mean_speedup)
+        min_max = [self.min_max.query(l, h) for l, h in zip(lo, hi)]
+        seg_num = len(segments) - 1
+        return pd.DataFrame({
+            'alg1': [self.alg_a] * seg_num,
+            'alg2': [self.alg_b] * seg_num,
+            'xstart': segments[:-1],
+            'xend': segments[1:],
+            'max_speedup': [m[0] for m in min_max],
+            'min_speedup': [m[1] for m in min_max],
+            'mean_speedup': mean_speedup,
+            'beat_count': beat_count,
+            'total_count': total_count,
+            'beat_ratio': beat_ratio,
+        }, columns=SEGMENT_TABLE_COLUMNS)
+
+
+    # bootstrap confidence interval of the mean (finite) speedup of each segment.
+    def mean_speedup_ci(self, segments: [float], confidence: float = 0.95):
+        lo, hi = segment_positions(self.x, segments)
+        samples = [self.speedup[l:h] for l, h in zip(lo, hi)]
+        samples = [s[np.isfinite(s)] for s in samples]
+        offsets = np.concatenate([[0], np.cumsum([len(s) for s in samples])])
+        return bootstrap_mean_ci(np.concatenate(samples), offsets, confidence=confidence)
+
+
+# the best record of each matrix of the selected records (see select_strategy_rows), the matrices without any y value are
+# skipped. It returns a dataframe of columns [mtx_column, alg_column, x_column, y_column, 'group_size'],
+# where 'group_size' is the number of records of the matrix.
+def best_of_matrices(selected, x_column: str, y_column: str, mtx_column: str, alg_column: str):
+    df = selected[[mtx_column, alg_column, x_column, y_column]].reset_index(drop=True)
+    group_size = df.groupby(mtx_column, observed=True).size()
+    best_idx = df[df[y_column].notna()].groupby(mtx_column, observed=True)[y_column].idxmax()
+    best = df.loc[best_idx.to_numpy()].reset_index(drop=True)
+    best['group_size'] = group_size.reindex(best_idx.index).to_numpy()
+    return best
+
+
+# Index of the best strategy of each matrix sorted by x, with cumulative best counts of each strategy,
+# thus the best performance statistics of any segmentation are resolved in O(segments * log N).
+# The best records are given by best_of_matrices (or the same query of a backend).
+# note: the x value of a matrix is the x of its best record, the index assumes x is a property of the matrix (e.g. nnz).
+class BestPerfIndex:
+    def __init__(self, best, x_column: str, alg_column: str, selected_strategies_num: int, x_range):
+        self.x_range = x_range
+        incomplete = best['group_size'].to_numpy() != selected_strategies_num
+
+        order = np.argsort(best[x_column].to_numpy(dtype=np.float64), kind='stable')
+        self.x = best[x_column].to_numpy(dtype=np.float64)[order]
+        algorithm_code, self.algorithms = pd.factorize(best[alg_column].to_numpy()[order], sort=True)
+        one_hot = np.zeros((len(order) + 1, len(self.algorithms)), dtype=np.int64)
+        one_hot[np.arange(1, len(order) + 1), algorithm_code] = 1
+        self.best_prefix = np.cumsum(one_hot, axis=0)
+        self.incomplete_prefix = np.concatenate([[0], np.cumsum(incomplete[order])])
+
+    # best performance statistics of each segment, the same table as statistics_best_perf_of_selection.
+    def statistics(self, segments: [float]):
+        lo, hi = segment_positions(self.x, segments)
+        best_count = self.best_prefix[hi] - self.best_prefix[lo]  # shape: (segments, algorithms)
+        total_count = hi - lo
+        incomplete_count = self.incomplete_prefix[hi] - self.incomplete_prefix[lo]
+        seg, alg = np.nonzero(best_count)
+        return pd.DataFrame({
+            'algo': np.asarray(self.algorithms)[alg],
+            'xstart': [segments[i] for i in seg],
+            'xend': [segments[i + 1] for i in seg],
+            'best_count': best_count[seg, alg],
+            'total_count': total_count[seg],
+            'best_ratio': best_count[seg, alg] / total_count[seg],
+            'incomplete_count': incomplete_count[seg],
+        })
+
+
+# the indexes of a dataset are built from the selections of its backend (see backends.py).
+def cached_speedup_index(backend, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    key = ('speedup-index', backend.dataset_id, alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+    return selection_cache.get_or_compute(key, lambda: SpeedupIndex(
+        backend.algorithm_pair(alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer),
+        alg_a, alg_b, x_column, y_column, backend.x_range(x_column)))
+
+
+def cached_best_perf_index(backend, x_column: str, y_column: str, mtx_column: str, alg_column: str, selected_algs: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    key = ('best-perf-index', backend.dataset_id, x_column, y_column, mtx_column, alg_column, tuple(selected_algs), drop_rows_by_col_value, reducer)
+    return selection_cache.get_or_compute(key, lambda: BestPerfIndex(
+        backend.best_records(x_column, y_column, mtx_column, alg_column, selected_algs, drop_rows_by_col_value, reducer),
+        x_column, alg_column, len(selected_algs), backend.x_range(x_column)))
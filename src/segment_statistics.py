@@ -1,3 +1,6 @@
+import statistics
+
+import numpy as np
 import pandas as pd
 
 from dash.dash_table import DataTable, FormatTemplate
@@ -5,42 +8,157 @@ from dash.dash_table.Format import Format, Padding, Scheme
 
 percentage = FormatTemplate.percentage(4)
 
+from segmentation import *
+from selection import merge_algorithm_pair
+from repetitions import DEFAULT_REDUCER, prepare_records
+
 DEBUG_LOG = False
 
-def statistics_in_each_segment(df, alg_1: str, alg_2: str, x_column: str, y_column: str, mtx_column: str, alg_column: str, segments: [int], drop_row_by_col_value: str):
-    df1 = pd.DataFrame(columns=['alg1', 'alg2', 'xstart', 'xend', 'max_speedup', 'min_speedup', 'mean_speedup', 'beat_count', 'total_count', 'beat_ratio'])
-    seg_num = len(segments)
-    for i in range(seg_num - 1):
-        range_start = segments[i]
-        range_end = segments[i + 1]
-        df1.loc[len(df1)] = log_anslysis(df.copy(), alg_1, alg_2, x_column, y_column, mtx_column, alg_column, drop_row_by_col_value, range_start, range_end)
+# number of bootstrap resamples for the confidence interval of the mean speedup.
+BOOTSTRAP_RESAMPLES = 1000
+
+# upper bound of the number of resampled values drawn at once when bootstrapping.
+BOOTSTRAP_CHUNK_ELEMENTS = 1 << 24
+
+# groups larger than this are not resampled: the bootstrap distribution of their mean is normal
+# (central limit theorem), thus the interval is computed from the standard error.
+BOOTSTRAP_MAX_GROUP_SIZE = 10000
+
+# column in table
+speedup_table_columns = [
+    dict(id='alg1', name='Algorithm 1'),
+    dict(id='alg2', name='Algorithm 2'),
+    dict(id='xstart', name='X Start'),
+    dict(id='xend', name='X End (not include)'),
+    dict(id='max_speedup', name='Max Speedup', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
+    dict(id='min_speedup', name='Min Speedup', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
+    dict(id='mean_speedup', name='Mean speedup', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
+    dict(id='beat_count', name='Beat count'),
+    dict(id='total_count', name='Total Count'),
+    dict(id='beat_ratio', name='Beat Ratio', type='numeric', format=percentage),
+]
+
+# columns of the bootstrap confidence interval of the mean speedup (see bootstrap_mean_ci), appended to the table on demand.
+mean_speedup_ci_columns = [
+    dict(id='mean_speedup_ci_low', name='Mean Speedup CI Low', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
+    dict(id='mean_speedup_ci_high', name='Mean Speedup CI High', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
+]
+
+SEGMENT_TABLE_COLUMNS = ['alg1', 'alg2', 'xstart', 'xend', 'max_speedup', 'min_speedup', 'mean_speedup', 'beat_count', 'total_count', 'beat_ratio']
+
+def statistics_in_each_segment(df, alg_1: str, alg_2: str, x_column: str, y_column: str, mtx_column: str, alg_column: str, segments: [int], drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    records = prepare_records(df, mtx_column, alg_column, y_column, drop_row_by_col_value, reducer)
+    merged_data = merge_algorithm_pair(records, alg_1, alg_2, mtx_column, alg_column, None)
+    return statistics_of_merged_pair(merged_data, alg_1, alg_2, x_column, y_column, segments)
+
+# segmented statistics of the merged records of 2 algorithms (see merge_algorithm_pair).
+def statistics_of_merged_pair(merged_data, alg_1: str, alg_2: str, x_column: str, y_column: str, segments: [int]):
+    if is_ascending(segments):
+        df1 = segment_speedup_table(merged_data, alg_1, alg_2, x_column, y_column, segments)
+    else:
+        # the segments may overlap, analyse them one by one.
+        df1 = pd.concat([
+            segment_speedup_table(merged_data, alg_1, alg_2, x_column, y_column, [segments[i], segments[i + 1]])
+            for i in range(len(segments) - 1)
+        ], ignore_index=True)
     if DEBUG_LOG:
         print(df1)
-    # column in table
-    columns = [
-        dict(id='alg1', name='Algorithm 1'),
-        dict(id='alg2', name='Algorithm 2'),
-        dict(id='xstart', name='X Start'),
-        dict(id='xend', name='X End (not include)'),
-        dict(id='max_speedup', name='Max Speedup', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
-        dict(id='min_speedup', name='Min Speedup', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
-        dict(id='mean_speedup', name='Mean speedup', type='numeric', format=Format(precision=4, scheme=Scheme.fixed)),
-        dict(id='beat_count', name='Beat count'),
-        dict(id='total_count', name='Total Count'),
-        dict(id='beat_ratio', name='Beat Ratio', type='numeric', format=percentage),
-    ]
-
-    return df1, columns
+    return df1, speedup_table_columns
+
+# speedup of algorithm a over algorithm b for each record of the merged data.
+def pair_speedup(merged_data, y_column: str):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return merged_data[y_column + '_x'].to_numpy(dtype=np.float64) / merged_data[y_column + '_y'].to_numpy(dtype=np.float64)
+
+# compute the speedup statistics of all segments in one pass over the merged data of 2 algorithms.
+# note: the segments must be in ascending order, and each range does not include its end.
+def segment_speedup_table(merged_data, alg_a: str, alg_b: str, x_column: str, y_column: str, segments: [int]):
+    seg = assign_segments(merged_data[x_column + '_x'].to_numpy(), segments)
+    speedup = pair_speedup(merged_data, y_column)
+    in_range = seg >= 0
+    records = pd.DataFrame({'seg': seg[in_range], 'speedup': speedup[in_range]})
+    records['beat'] = records['speedup'] >= 1.0
+
+    seg_num = len(segments) - 1
+    stats = records.groupby('seg').agg(
+        max_speedup=('speedup', 'max'),
+        min_speedup=('speedup', 'min'),
+        mean_speedup=('speedup', 'mean'),
+        beat_count=('beat', 'sum'),
+        total_count=('speedup', 'size'),
+    ).reindex(range(seg_num))
+    beat_count = stats['beat_count'].fillna(0).astype(np.int64).to_numpy()
+    total_count = stats['total_count'].fillna(0).astype(np.int64).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beat_ratio = np.where(total_count == 0, 0, beat_count / total_count)
+
+    return pd.DataFrame({
+        'alg1': [alg_a] * seg_num,
+        'alg2': [alg_b] * seg_num,
+        'xstart': segments[:-1],
+        'xend': segments[1:],
+        'max_speedup': stats['max_speedup'].to_numpy(),
+        'min_speedup': stats['min_speedup'].to_numpy(),
+        'mean_speedup': stats['mean_speedup'].to_numpy(),
+        'beat_count': beat_count,
+        'total_count': total_count,
+        'beat_ratio': beat_ratio,
+    }, columns=SEGMENT_TABLE_COLUMNS)
+
+# bootstrap confidence interval of the mean of each group of values,
+# where group i is values[offsets[i]:offsets[i + 1]] (the values are concatenated group by group).
+# All groups are resampled together: each resample of all groups is one row of random indices,
+# and the resampled sums of the groups are reduced from the rows at once.
+# It returns the lower and upper bounds of each group (NaN for an empty group).
+def bootstrap_mean_ci(values, offsets, resamples: int = BOOTSTRAP_RESAMPLES, confidence: float = 0.95, seed: int = 0):
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    count = np.diff(offsets)
+    n_groups = len(count)
+    lower = np.full(n_groups, np.nan)
+    upper = np.full(n_groups, np.nan)
+    alpha = (1 - confidence) / 2
+
+    # large groups: normal interval from the standard error.
+    large = np.flatnonzero(count > BOOTSTRAP_MAX_GROUP_SIZE)
+    if len(large) > 0:
+        group = np.repeat(np.arange(n_groups), count)
+        sums = np.bincount(group, weights=values, minlength=n_groups)[large]
+        squares = np.bincount(group, weights=values * values, minlength=n_groups)[large]
+        mean = sums / count[large]
+        std_error = np.sqrt(np.maximum(squares / count[large] - mean * mean, 0) / count[large])
+        z = statistics.NormalDist().inv_cdf(1 - alpha)
+        lower[large], upper[large] = mean - z * std_error, mean + z * std_error
+
+    # other groups: resampled, only their values take part in the resampling.
+    small = np.flatnonzero((count > 0) & (count <= BOOTSTRAP_MAX_GROUP_SIZE))
+    if len(small) == 0:
+        return lower, upper
+    small_count = count[small]
+    small_offsets = np.concatenate([[0], np.cumsum(small_count)])
+    small_values = np.concatenate([values[offsets[i]:offsets[i + 1]] for i in small])
+    start = np.repeat(small_offsets[:-1], small_count)
+    size = np.repeat(small_count, small_count)
+
+    rng = np.random.default_rng(seed)
+    means = np.empty((resamples, len(small)))
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // len(small_values))
+    for first in range(0, resamples, chunk):
+        rows = min(chunk, resamples - first)
+        idx = start + (rng.random((rows, len(small_values))) * size).astype(np.int64)
+        means[first:first + rows] = np.add.reduceat(small_values[idx], small_offsets[:-1], axis=1) / small_count
+    lower[small], upper[small] = np.quantile(means, [alpha, 1 - alpha], axis=0)
+    return lower, upper
 
 # anslysis the speedup cases of 2 algorithm.
 # note: for range, it does not include range_end.
-def log_anslysis(csr_data, alg_a: str, alg_b: str, x_column: str, y_column: str, mtx_column: str, alg_column: str, drop_row_by_col_value: str, range_start: int, range_end: int):
+def log_anslysis(csr_data, alg_a: str, alg_b: str, x_column: str, y_column: str, mtx_column: str, alg_column: str, drop_row_by_col_value: str, range_start: int, range_end: int, reducer: str = DEFAULT_REDUCER):
+    # drop failed records and collapse repetitions before joining: repeated records would be joined pairwise.
+    csr_data = prepare_records(csr_data, mtx_column, alg_column, y_column, drop_row_by_col_value, reducer)
     our_data = csr_data[csr_data[alg_column] == alg_a]
     other_data = csr_data[csr_data[alg_column] == alg_b]
 
     merged_data = pd.merge(our_data, other_data, how='inner', on=mtx_column) # inner join
-    if drop_row_by_col_value != None: # drop by column value
-        merged_data.drop(merged_data[(merged_data[drop_row_by_col_value + '_x'] > 0) | (merged_data[drop_row_by_col_value + '_y'] > 0)].index, inplace=True)
     sort_merged_data = merged_data.sort_values(by=x_column + '_x')
 
     df = sort_merged_data[(sort_merged_data[x_column + '_x'] >= range_start) & (sort_merged_data[x_column + '_x'] < range_end)].copy()
@@ -0,0 +1,72 @@
+import re
+
+import numpy as np
+
+
+# return True if the segment boundaries are in ascending order (repeated boundaries are allowed).
+def is_ascending(segments: [float]):
+    bounds = np.asarray(segments, dtype=np.float64)
+    return bool(np.all(bounds[1:] >= bounds[:-1]))
+
+
+# assign each value in x to the segment [segments[i], segments[i + 1]) containing it.
+# It returns the segment index of each value, or -1 if the value is not in any segment.
+# note: the segment boundaries must be in ascending order.
+def assign_segments(x, segments: [float]):
+    bounds = np.asarray(segments, dtype=np.float64)
+    seg = np.searchsorted(bounds, np.asarray(x, dtype=np.float64), side='right') - 1
+    # values before the first boundary get -1, values at or after the last boundary get len(bounds) - 1.
+    seg[seg >= len(bounds) - 1] = -1
+    return seg
+
+
+# a log-spaced segmentation in the input: 'log:start:stop:num' gives num boundaries from start to stop (included).
+LOG_SPACED_PATTERN = re.compile(r'^log:([^:]+):([^:]+):(\d+)$')
+
+
+# a boundary number of the input: integers are kept as int, thus they are shown without decimals.
+def _boundary_value(v: float):
+    v = float('%.12g' % v)
+    return int(v) if v.is_integer() else v
+
+
+# parse the segmentation input: numbers (e.g. 1000, 2.5, 1e4) or log-spaced segmentations (e.g. log:1e3:1e7:5),
+# separated by spaces, commas, semicolons or new lines.
+# It returns the boundaries in the input and the tokens which can not be parsed.
+def parse_segment_conf(segment_conf: str):
+    values = []
+    invalid_tokens = []
+    for token in re.split(r'[;,\s]+', segment_conf or ''):
+        if token == '':
+            continue
+        log_spaced = LOG_SPACED_PATTERN.match(token)
+        try:
+            if log_spaced:
+                start, stop, num = float(log_spaced.group(1)), float(log_spaced.group(2)), int(log_spaced.group(3))
+                if start <= 0 or stop <= 0:
+                    raise ValueError(token)
+                values.extend(_boundary_value(v) for v in np.logspace(np.log10(start), np.log10(stop), num))
+            else:
+                v = float(token)
+                if not np.isfinite(v):
+                    raise ValueError(token)
+                values.append(_boundary_value(v))
+        except ValueError:
+            invalid_tokens.append(token)
+    return values, invalid_tokens
+
+
+# add the min and max of x column as the first and last boundaries of the segmentation.
+def segment_bounds(values: [float], min_x, max_x):
+    segments = list(values)
+    segments.append(min_x)
+    segments.append(max_x + 1) # the end range is not included, thus we plus one to it.
+    segments.sort()
+    return segments
+
+
+# parse the segmentation input (see parse_segment_conf),
+# and add the min and max of x column as the first and last boundaries.
+def gen_seg_list(df, x_axis: str, y_axis: str, segment_conf: [str]):
+    segments, _ = parse_segment_conf(segment_conf)
+    return segment_bounds(segments, df[x_axis].min().item(), df[x_axis].max().item()) # python number: no overflow of small integer types when plusing one.
@@ -0,0 +1,136 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+from repetitions import DEFAULT_REDUCER, prepare_records
+
+# max number of selections (filtered or merged views of datasets) kept in the cache.
+SELECTION_CACHE_ENTRIES = 16
+
+# upper bound (in bytes) of the memory of the cached selections, the same budget as the dataset cache
+# (PERF_EXPLORER_CACHE_BYTES, see datasets.py), counted apart from the datasets.
+SELECTION_CACHE_MAX_BYTES = int(os.environ.get('PERF_EXPLORER_CACHE_BYTES', 2 * 1024 ** 3))
+
+
+# inner join the records of 2 algorithms on the matrix column, and drop the failed records (if drop column is given).
+# columns of algorithm a get suffix '_x' and columns of algorithm b get suffix '_y'.
+def merge_algorithm_pair(csr_data, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, drop_row_by_col_value: str):
+    with stage('merge'):
+        our_data = csr_data[csr_data[alg_column] == alg_a]
+        other_data = csr_data[csr_data[alg_column] == alg_b]
+
+        merged_data = pd.merge(our_data, other_data, how='inner', on=mtx_column) # inner join
+        if drop_row_by_col_value != None: # drop by column value
+            merged_data = merged_data[~((merged_data[drop_row_by_col_value + '_x'] > 0) | (merged_data[drop_row_by_col_value + '_y'] > 0))]
+    return merged_data
+
+
+# select the records of the given strategies, and drop the failed records (if drop column is given).
+def select_strategy_rows(csr_data, alg_column: str, selected_strategies: [str], drop_rows_by_col_value: str):
+    with stage('filter'):
+        mask = csr_data[alg_column].isin(selected_strategies)
+        if drop_rows_by_col_value != None:
+            mask &= ~(csr_data[drop_rows_by_col_value] > 0)
+        return csr_data[mask]
+
+
+# memory (in bytes) of a cached value: the memory of its dataframes, series and arrays (deep, as the dataset cache counts it),
+# also of those held by its items (tuple, list, dict) or its attributes (e.g. an index of segments).
+def value_bytes(value, depth: int = 0):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if depth >= 3:
+        return 0
+    if isinstance(value, (tuple, list)):
+        return sum(value_bytes(v, depth + 1) for v in value)
+    if isinstance(value, dict):
+        return sum(value_bytes(v, depth + 1) for v in value.values())
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sum(value_bytes(v, depth + 1) for v in vars(value).values())
+    return 0
+
+
+# LRU cache of the selections built from datasets, thus the figure and the tables of one click
+# (and the later downloads and re-segmentations) share one filter/join of the dataset.
+# It is bounded by the number of entries, and by their memory (see value_bytes) if max_bytes is given.
+# A key is computed once even by concurrent callers (e.g. the analysis job and the table callback):
+# the later callers wait for the result of the first one.
+class SelectionCache:
+    def __init__(self, max_entries: int, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, bytes)
+        self._computing = {}  # key -> Future of the value being computed
+        self._lock = threading.Lock()
+
+    # return the cached value of the key, or compute (and cache) it by calling compute().
+    # If compute() raises, the callers waiting for the key get the same exception, and the key is not cached.
+    def get_or_compute(self, key: tuple, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            future = self._computing.get(key)
+            if future is None:
+                future = self._computing[key] = Future()
+                computing = True
+            else:
+                computing = False
+        if not computing:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._computing[key]
+            future.set_exception(e)
+            raise
+        nbytes = 0 if self.max_bytes is None else value_bytes(value)
+        with self._lock:
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            # evict the least recently used selections, but always keep the newest one.
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                              (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+                self.total_bytes -= self._entries.popitem(last=False)[1][1]
+            del self._computing[key]
+        future.set_result(value)
+        return value
+
+
+selection_cache = SelectionCache(SELECTION_CACHE_ENTRIES, SELECTION_CACHE_MAX_BYTES)
+
+
+# the records of a dataset without the failed records, with the repeated records of each (matrix, strategy) collapsed.
+# The keys of the selections include the columns of csr_data: a dataset may be loaded with different columns
+# (see load_dataset), and a selection keeps all the columns it is built from.
+def cached_prepared_records(dataset_id: str, csr_data, mtx_column: str, alg_column: str, y_column: str, drop_rows_by_col_value: str, reducer: str):
+    key = ('prepared', dataset_id, tuple(csr_data.columns), mtx_column, alg_column, y_column, drop_rows_by_col_value, reducer)
+    return selection_cache.get_or_compute(key, lambda: prepare_records(csr_data, mtx_column, alg_column, y_column, drop_rows_by_col_value, reducer))
+
+
+# the merged records of 2 algorithms of a dataset (after collapsing the repetitions), sorted by the x column of algorithm a.
+def cached_algorithm_pair(dataset_id: str, csr_data, alg_a: str, alg_b: str, mtx_column: str, alg_column: str, x_column: str, y_column: str, drop_row_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    key = ('pair', dataset_id, tuple(csr_data.columns), alg_a, alg_b, mtx_column, alg_column, x_column, y_column, drop_row_by_col_value, reducer)
+    return selection_cache.get_or_compute(key, lambda: merge_algorithm_pair(
+        cached_prepared_records(dataset_id, csr_data, mtx_column, alg_column, y_column, drop_row_by_col_value, reducer),
+        alg_a, alg_b, mtx_column, alg_column, None).sort_values(by=x_column + '_x'))
+
+
+# the records of the selected strategies of a dataset (after collapsing the repetitions).
+def cached_strategy_rows(dataset_id: str, csr_data, mtx_column: str, alg_column: str, y_column: str, selected_strategies: [str], drop_rows_by_col_value: str, reducer: str = DEFAULT_REDUCER):
+    key = ('strategies', dataset_id, tuple(csr_data.columns), mtx_column, alg_column, y_column, tuple(selected_strategies), drop_rows_by_col_value, reducer)
+    return selection_cache.get_or_compute(key, lambda: select_strategy_rows(
+        cached_prepared_records(dataset_id, csr_data, mtx_column, alg_column, y_column, drop_rows_by_col_value, reducer),
+        alg_column, selected_strategies, None))
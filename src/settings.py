@@ -0,0 +1,39 @@
+import importlib.util
+import os
+
+# Settings of the page, read by the layout of the app (see create_app in main.py).
+# This module imports no analysis module (pandas, plotly express, kaleido), thus a worker process builds the layout
+# and starts serving before the analysis modules are loaded (on the first callback using them).
+
+# reducers of the repeated records of the same (matrix, strategy), as (value, label) of the options.
+REDUCERS = [
+    ('median', 'Median'),
+    ('min', 'Min (worst run)'),
+    ('best', 'Best of (max)'),
+    ('trimmed_mean', 'Trimmed mean (10%)'),
+]
+DEFAULT_REDUCER = 'median'
+
+# above this number of points, the performance plot is rendered by WebGL and downsampled.
+LARGE_DATA_POINTS_THRESHOLD = 100000
+
+# rows of a page of the drill-down table (the rows are paged on the server, see drilldown.py).
+DRILLDOWN_PAGE_SIZE = 25
+
+# the Parquet/Arrow files of this directory of the server can be analysed in place, without uploading (see register_path).
+SERVER_DATA_DIR = os.environ.get('PERF_EXPLORER_DATA_DIR') or None
+
+# directory of growing result files (e.g. the CSVs appended by running benchmark jobs), followed by the page:
+# only the rows appended since the last refresh (and the new files) are read.
+LIVE_DATA_DIR = os.environ.get('PERF_EXPLORER_LIVE_DIR') or None
+
+# interval (in milliseconds) of reading the new rows of the followed directory.
+LIVE_REFRESH_INTERVAL = int(os.environ.get('PERF_EXPLORER_LIVE_INTERVAL', 5000))
+
+
+# the Parquet/Arrow files of the server data directory, sorted by name.
+# pyarrow is looked up without importing it: the files are read by datasets.py.
+def server_data_files():
+    if SERVER_DATA_DIR is None or importlib.util.find_spec('pyarrow') is None or not os.path.isdir(SERVER_DATA_DIR):
+        return []
+    return sorted(f for f in os.listdir(SERVER_DATA_DIR) if f.endswith(('.parquet', '.feather', '.arrow', '.ipc')))
@@ -0,0 +1,297 @@
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import stat
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # not POSIX: the datasets are only kept in the memory of each process.
+    fcntl = None
+
+# the shared memory blocks are files of this directory (on Linux), the blocks are mapped read-only from these files,
+# and its free space is checked before creating a block.
+SHM_DIR = '/dev/shm'
+
+# set PERF_EXPLORER_SHARED_STORE=1 (e.g. when serving by several worker processes) to load each dataset once
+# into shared memory, and map it in every worker process without copying.
+SHARED_STORE_ENABLED = fcntl is not None and os.path.isdir(SHM_DIR) and os.environ.get('PERF_EXPLORER_SHARED_STORE', '') not in ('', '0')
+
+# upper bound of the shared memory (in bytes) used by the datasets of the store.
+SHARED_STORE_MAX_BYTES = int(os.environ.get('PERF_EXPLORER_SHARED_STORE_BYTES', 4 * 1024 ** 3))
+
+# directory of the manifests (columns, memory blocks and referencing processes of each dataset) and the lock of the store,
+# it must be owned by the user of the server and not accessible by other users.
+SHARED_STORE_DIR = os.environ.get('PERF_EXPLORER_SHARED_STORE_DIR', os.path.join(tempfile.gettempdir(), 'performance-explorer-shm'))
+
+
+# a shared memory block which is not unlinked by the resource tracker at the exit of this process:
+# the blocks are owned by the store, not by the process creating them.
+def _open_block(name: str, create: bool = False, size: int = 0):
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:  # python < 3.13
+        block = shared_memory.SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister('/' + block.name, 'shared_memory')  # the tracker registers the POSIX name of the block.
+        return block
+
+
+# create a block of shared memory, a stale block of the same name (e.g. left by a crashed process, without manifest)
+# is replaced.
+def _create_block(name: str, size: int):
+    try:
+        return _open_block(name, create=True, size=size)
+    except FileExistsError:
+        stale = shared_memory.SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+        return _open_block(name, create=True, size=size)
+
+
+def _block_name(dataset_id: str, key: str):
+    return 'pe_' + hashlib.blake2b((dataset_id + '/' + key).encode('utf-8'), digest_size=10).hexdigest()
+
+
+# create the directory of the store (mode 0700), and refuse a directory owned by another user or accessible by other users:
+# the manifests name the blocks mapped by every worker process.
+def _check_directory(directory: str):
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError('the shared store directory {} must be a directory owned by this user, '
+                              'without access for other users (mode 0700)'.format(directory))
+
+
+# the categories of a column as json (values and dtype), thus mapping a dataset never unpickles data of the shared memory.
+# return None if the categories are not numbers or text (e.g. timestamps).
+def _encode_categories(categories: pd.Index):
+    if isinstance(categories.dtype, np.dtype) and categories.dtype.kind in 'biuf':
+        dtype = categories.dtype.str
+    elif categories.dtype == object and all(isinstance(value, (str, int, float, bool)) for value in categories):
+        dtype = 'object'
+    else:
+        return None
+    return json.dumps(dict(dtype=dtype, values=categories.tolist())).encode('utf-8')
+
+
+def _decode_categories(data: bytes):
+    categories = json.loads(data.decode('utf-8'))
+    return pd.Index(categories['values'], dtype=object if categories['dtype'] == 'object' else np.dtype(categories['dtype']))
+
+
+def _pid_alive(pid: int):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# the numpy array of a column to share, and the encoded categories of a categorical (or text) column.
+# return None if the column type can not be shared (e.g. an extension type).
+def _column_buffers(s: pd.Series):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes, categories, meta = s.cat.codes.to_numpy(), s.cat.categories, dict(kind='categorical', ordered=bool(s.cat.ordered))
+    elif s.dtype == object:
+        codes, uniques = pd.factorize(s)
+        categories, meta = pd.Index(uniques, dtype=object), dict(kind='object')
+    elif isinstance(s.dtype, np.dtype) and s.dtype.kind in 'biufcmM':
+        return s.to_numpy(), None, dict(kind='array')
+    else:
+        return None
+    categories = _encode_categories(categories)
+    return None if categories is None else (codes, categories, meta)
+
+
+# map a block of shared memory as a read-only numpy array, from the file of the block opened read-only.
+# The array owns the mapping, thus the block stays mapped as long as the array (or any view of it) is alive.
+# raise FileNotFoundError if the block does not exist.
+def _map_block(name: str, dtype: np.dtype, length: int):
+    fd = os.open(os.path.join(SHM_DIR, name), os.O_RDONLY)
+    try:
+        mapping = mmap.mmap(fd, os.fstat(fd).st_size, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+    return np.frombuffer(mapping, dtype=dtype, count=length)
+
+
+# Datasets in shared memory, shared by the server worker processes of one machine.
+# Each numeric column is one block of shared memory, each categorical (or text) column is a block of codes and a block of
+# its categories (json). Other processes map the blocks as read-only numpy arrays, and build the dataframe without copying
+# (the text columns are rebuilt from their codes in each process).
+# The manifest of a dataset (a json file) lists its blocks and the processes referencing it, and is updated under a file lock.
+# Datasets without referencing process are evicted (least recently used first) when the store is full.
+class SharedDatasetStore:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        _check_directory(directory)
+        self._attached = set()  # ids of the datasets referenced by this process
+        self._lock = threading.Lock()
+        atexit.register(self.release_all)
+
+    def _manifest_path(self, dataset_id: str):
+        return os.path.join(self.directory, dataset_id + '.json')
+
+    # lock the store between threads and between processes.
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            _check_directory(self.directory)
+            with open(os.path.join(self.directory, 'store.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest(self, dataset_id: str):
+        try:
+            with open(self._manifest_path(dataset_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, dataset_id: str, manifest: dict):
+        path = self._manifest_path(dataset_id)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _manifests(self):
+        manifests = {}
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                manifest = self._read_manifest(filename[:-len('.json')])
+                if manifest is not None:
+                    manifests[filename[:-len('.json')]] = manifest
+        return manifests
+
+    def __contains__(self, dataset_id: str):
+        return os.path.exists(self._manifest_path(dataset_id))
+
+    # unlink the blocks of a dataset, the processes which have mapped them keep their mapping.
+    def _unlink(self, dataset_id: str, manifest: dict):
+        for column in manifest['columns']:
+            for name in (column['block'], column.get('categories_block')):
+                if name is None:
+                    continue
+                try:
+                    block = shared_memory.SharedMemory(name=name)
+                    block.close()
+                    block.unlink()
+                except FileNotFoundError:
+                    pass
+        os.remove(self._manifest_path(dataset_id))
+
+    # evict the least recently used datasets without referencing (alive) process, until nbytes more bytes fit in the store.
+    def _evict(self, nbytes: int):
+        manifests = self._manifests()
+        total = sum(m['nbytes'] for m in manifests.values())
+        for dataset_id, manifest in sorted(manifests.items(), key=lambda item: item[1]['last_used']):
+            if total + nbytes <= self.max_bytes:
+                break
+            if any(_pid_alive(pid) for pid in manifest['refs']):
+                continue
+            self._unlink(dataset_id, manifest)
+            total -= manifest['nbytes']
+        return total + nbytes <= self.max_bytes
+
+    # copy a dataframe into shared memory, and return the dataframe mapped from the store.
+    # return None if the dataframe can not be shared (e.g. extension types, or the store is full).
+    def put(self, dataset_id: str, df: pd.DataFrame):
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+            return None
+        buffers = []
+        for col in df.columns:
+            column_buffers = _column_buffers(df[col])
+            if column_buffers is None:
+                return None
+            buffers.append((col,) + column_buffers)
+        nbytes = sum(values.nbytes + (0 if categories is None else len(categories)) for _, values, categories, _ in buffers)
+
+        with self._locked():
+            if dataset_id not in self:
+                if not self._evict(nbytes) or (os.path.isdir(SHM_DIR) and _free_bytes(SHM_DIR) < nbytes):
+                    return None
+                columns = []
+                for i, (col, values, categories, meta) in enumerate(buffers):
+                    column = dict(name=col, dtype=values.dtype.str, length=len(values), block=_block_name(dataset_id, str(i)), **meta)
+                    block = _create_block(column['block'], max(values.nbytes, 1))
+                    np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+                    block.close()
+                    if categories is not None:
+                        column['categories_block'] = _block_name(dataset_id, str(i) + '/categories')
+                        column['categories_bytes'] = len(categories)
+                        block = _create_block(column['categories_block'], len(categories))
+                        block.buf[:len(categories)] = categories
+                        block.close()
+                    columns.append(column)
+                self._write_manifest(dataset_id, dict(columns=columns, nbytes=nbytes, refs=[], last_used=time.time()))
+            return self._attach(dataset_id)
+
+    # map a dataset of the store, return None if the dataset is not in the store.
+    def get(self, dataset_id: str):
+        with self._locked():
+            return self._attach(dataset_id)
+
+    def _attach(self, dataset_id: str):
+        manifest = self._read_manifest(dataset_id)
+        if manifest is None:
+            return None
+        columns = {}
+        try:
+            for column in manifest['columns']:
+                values = _map_block(column['block'], np.dtype(column['dtype']), column['length'])
+                if column['kind'] == 'array':
+                    columns[column['name']] = values
+                    continue
+                categories = _decode_categories(_map_block(column['categories_block'], np.uint8, column['categories_bytes']).tobytes())
+                values = pd.Categorical.from_codes(values, categories, ordered=column.get('ordered', False))
+                columns[column['name']] = values if column['kind'] == 'categorical' else values.astype(object)
+        except FileNotFoundError:  # evicted by another process
+            return None
+        df = pd.DataFrame(columns, copy=False)
+
+        if os.getpid() not in manifest['refs']:
+            manifest['refs'].append(os.getpid())
+        manifest['last_used'] = time.time()
+        self._write_manifest(dataset_id, manifest)
+        self._attached.add(dataset_id)
+        return df
+
+    # release the reference of this process to a dataset (e.g. when it is evicted from the memory cache of the process),
+    # thus the dataset can be evicted from the store. The blocks are unmapped once the arrays mapped from them are freed.
+    def release(self, dataset_id: str):
+        if dataset_id not in self._attached:
+            return
+        with self._locked():
+            manifest = self._read_manifest(dataset_id)
+            if manifest is not None and os.getpid() in manifest['refs']:
+                manifest['refs'].remove(os.getpid())
+                self._write_manifest(dataset_id, manifest)
+            self._attached.discard(dataset_id)
+
+    def release_all(self):
+        for dataset_id in list(self._attached):
+            self.release(dataset_id)
+
+
+def _free_bytes(path: str):
+    st = os.statvfs(path)
+    return st.f_bavail * st.f_frsize
+
+
+shared_store = SharedDatasetStore(SHARED_STORE_DIR, SHARED_STORE_MAX_BYTES) if SHARED_STORE_ENABLED else None
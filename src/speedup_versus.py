@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 
 import plotly.graph_objects as go
-import plotly.io as pio   
 
+import numpy as np
 import pandas as pd
-pio.kaleido.scope.mathjax = None
+
+from selection import merge_algorithm_pair
+from repetitions import DEFAULT_REDUCER, prepare_records
+from settings import LARGE_DATA_POINTS_THRESHOLD
 
 class PlotConfig:
     def __init__(self, plot_color, plot_font_color, plot_font_size, plot_xaxis_title, plot_yaxis_title, plot_showlegend,
-    plot_legend_title, plot_width, plot_height):
+    plot_legend_title, plot_width, plot_height, large_data_threshold=LARGE_DATA_POINTS_THRESHOLD):
         self.color = plot_color
         self.font_color = plot_font_color
         self.font_size = plot_font_size
@@ -18,56 +21,47 @@ class PlotConfig:
         self.legend_title = plot_legend_title
         self.width = plot_width
         self.height = plot_height
+        self.large_data_threshold = large_data_threshold
 
 # keys_csr_mtx = 'csr_mtx'
 # keys_nnz = 'nnz'
 # keys_flops = 'GFLOPS(total_time)'
 # keys_hover_data = ['nnz/row', 'mid calc cost', 'mid total cost']
 
-def gen_plot_speedup(csr_data, alg1_name, alg2_name, keys_csr_mtx, keys_nnz, keys_flops, alg_column: str, drop_row_by_col_value, config: PlotConfig):
-    our_data = csr_data[csr_data[alg_column] == alg1_name]
-    other_data = csr_data[csr_data[alg_column] == alg2_name]
+# calculate the speedup of a over b, and split it into the part above 1.0 (speedup_a) and the part below 1.0 (speedup_b).
+# The other part is set to the base line 1.0. A zero speedup (no adaptive data) or an undefined speedup
+# (division by zero or missing value) is drawn at the base line in both parts.
+def split_speedup(a_flops, b_flops):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speedup = a_flops / b_flops
+    speedup = np.where((speedup == 0.0) | ~np.isfinite(speedup), 1.0, speedup)
+    speedup_a = np.where(speedup > 1.0, speedup, 1.0)
+    speedup_b = np.where(speedup > 1.0, 1.0, speedup)
+    return speedup_a, speedup_b
 
-    merged_data = pd.merge(our_data, other_data, how='inner', on=keys_csr_mtx) # inner join
-    if drop_row_by_col_value != None:
-        merged_data.drop(merged_data[(merged_data[drop_row_by_col_value + '_x'] > 0) | (merged_data[drop_row_by_col_value + '_y'] > 0)].index, inplace=True)
+def gen_plot_speedup(csr_data, alg1_name, alg2_name, keys_csr_mtx, keys_nnz, keys_flops, alg_column: str, drop_row_by_col_value, config: PlotConfig, reducer: str = DEFAULT_REDUCER):
+    records = prepare_records(csr_data, keys_csr_mtx, alg_column, keys_flops, drop_row_by_col_value, reducer)
+    merged_data = merge_algorithm_pair(records, alg1_name, alg2_name, keys_csr_mtx, alg_column, None)
     sort_merged_data = merged_data.sort_values(by=keys_nnz + '_x')
+    return gen_plot_speedup_of_merged_pair(sort_merged_data, keys_nnz, keys_flops, config)
 
+# speedup plot of the merged records of 2 algorithms (see merge_algorithm_pair), sorted by x column.
+def gen_plot_speedup_of_merged_pair(sort_merged_data, keys_nnz, keys_flops, config: PlotConfig):
     # get nnz, flat flops, hola flops.
-    nnzs = sort_merged_data[keys_nnz + '_x'].tolist()
-    a_flops = sort_merged_data[keys_flops+'_x'].tolist() # flops of our method
-    b_flops = sort_merged_data[keys_flops+'_y'].tolist() # flops of other method to be compared.
-
-    # calculate speedup
-    speedup_a = []
-    speedup_b = []
-    base_line = []
-
-    N = len(a_flops)
-    for i in range(N):
-        speedup = a_flops[i]/b_flops[i]
-        base_line.append(1.0)
-        if(speedup == 0.0): # no adaptive data
-            speedup_a.append(1.0)
-            speedup_b.append(1.0)
-        else:
-            if(speedup > 1.0):
-                speedup_a.append(speedup)
-                speedup_b.append(1.0)
-            else:
-                speedup_b.append(speedup)
-                speedup_a.append(1.0)
+    nnzs = sort_merged_data[keys_nnz + '_x'].to_numpy()
+    a_flops = sort_merged_data[keys_flops+'_x'].to_numpy(dtype=np.float64) # flops of our method
+    b_flops = sort_merged_data[keys_flops+'_y'].to_numpy(dtype=np.float64) # flops of other method to be compared.
 
+    speedup_a, speedup_b = split_speedup(a_flops, b_flops)
 
     fig = go.Figure([
         go.Scatter(
-            x=nnzs + nnzs[::-1], # nnz, then nnz reversed
-            y=speedup_a + speedup_b[::-1], # speedup_a, then base_line reversed
+            x=np.concatenate([nnzs, nnzs[::-1]]), # nnz, then nnz reversed
+            y=np.concatenate([speedup_a, speedup_b[::-1]]), # speedup_a, then speedup_b reversed
             fill='toself',
             fillcolor=config.color,
             # line=dict(color='rgba(0,100,80,0.6)'),
             hoverinfo="skip",
-            showlegend=config.showlegend,
             mode='none',
             name='Our Adaptive',
         ),
@@ -96,6 +90,7 @@ def gen_plot_speedup(csr_data, alg1_name, alg2_name, keys_csr_mtx, keys_nnz, key
         plot_bgcolor="rgb(255,255,255)",
         width=config.width,
         height=config.height,
+        showlegend=config.showlegend,
         legend_title=config.legend_title,
         margin=dict(l=0, r=0, b=0, t=0),
         font=dict(
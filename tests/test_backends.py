@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+pytest.importorskip('duckdb')
+
+from backends import PandasBackend, DuckDBBackend
+from settings import REDUCERS
+
+STRATEGIES = ['csr', 'ell', 'hyb']
+COLUMNS = ['mtx', 'strategy', 'nnz', 'gflops', 'failed']
+
+
+# records of 200 matrices with 1 to 14 runs of each (matrix, strategy) (thus the trimmed mean cuts some runs), some missing records, missing y values
+# (a (matrix, strategy) may have no y value at all) and failed runs.
+def records(rng):
+    rows = []
+    for i in range(200):
+        nnz = int(rng.integers(1, 100000))
+        for strategy in STRATEGIES:
+            if rng.random() < 0.1:
+                continue
+            for _ in range(rng.integers(1, 15)):
+                rows.append(('m{}'.format(i), strategy, nnz, rng.lognormal(0, 1), int(rng.random() < 0.1)))
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    df.loc[rng.random(len(df)) < 0.05, 'gflops'] = np.nan
+    return df
+
+
+@pytest.fixture(scope='module')
+def backends(tmp_path_factory):
+    df = records(np.random.default_rng(0))
+    path = str(tmp_path_factory.mktemp('backends') / 'records.arrow')
+    df.to_feather(path, compression='uncompressed')
+    return PandasBackend('0' * 32, df), DuckDBBackend('1' * 32, path, COLUMNS)
+
+
+def by_matrix(df, columns):
+    return df[columns].sort_values(by='mtx').reset_index(drop=True)
+
+
+def test_strategies_and_x_range(backends):
+    pandas_backend, duckdb_backend = backends
+    assert duckdb_backend.strategies('strategy') == pandas_backend.strategies('strategy') == STRATEGIES
+    assert duckdb_backend.x_range('nnz') == pandas_backend.x_range('nnz')
+
+
+@pytest.mark.parametrize('reducer', [r for r, _ in REDUCERS])
+@pytest.mark.parametrize('drop', ['failed', None])
+def test_algorithm_pair(backends, reducer, drop):
+    pandas_backend, duckdb_backend = backends
+    args = ('csr', 'hyb', 'mtx', 'strategy', 'nnz', 'gflops', drop, reducer)
+    columns = ['mtx', 'nnz_x', 'gflops_x', 'nnz_y', 'gflops_y']
+    expected = pandas_backend.algorithm_pair(*args)
+    result = duckdb_backend.algorithm_pair(*args)
+    assert result['nnz_x'].is_monotonic_increasing
+    pd.testing.assert_frame_equal(by_matrix(result, columns), by_matrix(expected, columns), check_dtype=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize('reducer', [r for r, _ in REDUCERS])
+@pytest.mark.parametrize('drop', ['failed', None])
+def test_best_records(backends, reducer, drop):
+    pandas_backend, duckdb_backend = backends
+    args = ('nnz', 'gflops', 'mtx', 'strategy', STRATEGIES, drop, reducer)
+    columns = ['mtx', 'strategy', 'nnz', 'gflops', 'group_size']
+    expected = pandas_backend.best_records(*args)
+    result = duckdb_backend.best_records(*args)
+    pd.testing.assert_frame_equal(by_matrix(result, columns), by_matrix(expected, columns), check_dtype=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize('reducer', [r for r, _ in REDUCERS])
+def test_no_selected_strategy(backends, reducer):
+    pandas_backend, duckdb_backend = backends
+    for backend in backends:
+        rows = backend.strategy_rows('mtx', 'strategy', 'gflops', [], 'failed', reducer)
+        assert len(rows) == 0 and {'mtx', 'strategy', 'nnz', 'gflops'} <= set(rows.columns)
+    expected = pandas_backend.best_records('nnz', 'gflops', 'mtx', 'strategy', [], 'failed', reducer)
+    result = duckdb_backend.best_records('nnz', 'gflops', 'mtx', 'strategy', [], 'failed', reducer)
+    assert len(result) == len(expected) == 0 and set(result.columns) == set(expected.columns)
@@ -0,0 +1,47 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from best_perf import best_count_table, print_best, statistics_best_perf_of_selection
+
+
+# best records of 2 segments, the algorithm column is categorical (see normalize_schema) with an unobserved category.
+def categorical_best_records():
+    return pd.DataFrame({
+        'seg': [0, 0, 1, 1, 1],
+        'mtx': ['a', 'b', 'c', 'd', 'e'],
+        'best_flops': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'best_algorithm': pd.Categorical(['csr', 'ell', 'csr', 'csr', 'ell'], categories=['csr', 'ell', 'hyb']),
+        'group_size': [2, 2, 1, 2, 2],
+    })
+
+
+def test_best_count_table_of_categorical_algorithms():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        table = best_count_table(categorical_best_records(), 2, [0, 10, 100])
+    assert table['algo'].tolist() == ['csr', 'ell', 'csr', 'ell']
+    assert table['best_count'].tolist() == [1, 1, 2, 1]
+    assert table['total_count'].tolist() == [2, 2, 3, 3]
+    assert table['incomplete_count'].tolist() == [0, 0, 1, 1]
+    assert table['algo'].dtype == object
+
+
+def test_print_best_of_categorical_algorithms(capsys):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        print_best(categorical_best_records())
+    out = capsys.readouterr().out
+    assert 'csr' in out and 'ell' in out and 'hyb' not in out
+
+
+def test_statistics_of_categorical_strategies():
+    selected = pd.DataFrame({
+        'mtx': ['a', 'a', 'b', 'b'],
+        'strategy': pd.Categorical(['csr', 'ell', 'csr', 'ell'], categories=['csr', 'ell', 'hyb']),
+        'nnz': [1, 1, 20, 20],
+        'gflops': [1.0, 2.0, 3.0, np.nan],
+    })
+    table, _ = statistics_best_perf_of_selection(selected, 'nnz', 'gflops', 'mtx', 'strategy', 2, [0, 10, 100])
+    assert table[['algo', 'xstart', 'best_count']].values.tolist() == [['ell', 0, 1], ['csr', 10, 1]]
@@ -0,0 +1,81 @@
+import base64
+import gzip
+import lzma
+import os
+
+import pandas as pd
+import pytest
+
+import chunked_upload
+import datasets
+from chunked_upload import UploadError, init_upload, append_chunk, complete_upload
+
+CSV = b'mtx,strategy,nnz,gflops\nm1,csr,10,1.5\nm1,ell,10,2.5\nm2,csr,20,3.0\n'
+
+
+@pytest.fixture(autouse=True)
+def directories(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_upload, 'UPLOAD_DIR', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(datasets, 'ARROW_CACHE_DIR', str(tmp_path / 'arrow'))
+    return tmp_path
+
+
+def upload(data, filename, chunk_bytes=16):
+    upload_id = init_upload(filename, len(data), 1000)['upload_id']
+    offset = 0
+    while offset < len(data):
+        offset = append_chunk(upload_id, offset, data[offset:offset + chunk_bytes])
+    return upload_id, complete_upload(upload_id)
+
+
+@pytest.mark.parametrize('filename, compress', [('r.csv', bytes), ('r.csv.gz', gzip.compress), ('r.csv.xz', lzma.compress)])
+def test_compressed_uploads(filename, compress):
+    _, dataset_id = upload(compress(CSV), filename)
+    df = datasets.load_dataset(dataset_id)
+    assert df['gflops'].tolist() == [1.5, 2.5, 3.0] and df['strategy'].astype(str).tolist() == ['csr', 'ell', 'csr']
+
+
+def test_same_id_as_the_page_upload():
+    _, dataset_id = upload(CSV, 'same.csv')
+    contents = 'data:text/csv;base64,' + base64.b64encode(CSV).decode('ascii')
+    assert datasets.register_upload(contents, 'same.csv', None) == dataset_id
+    assert datasets.gen_dataset_id(CSV, 'other.csv') != dataset_id
+
+
+def test_resume_and_repeated_chunks():
+    header, rows = CSV.split(b'\n', 1)
+    data = gzip.compress(header + b'\n' + rows * 50)
+    first = init_upload('resume.csv.gz', len(data), 1)
+    assert first['offset'] == 0
+    half = len(data) // 2
+    assert append_chunk(first['upload_id'], 0, data[:half]) == half
+    assert append_chunk(first['upload_id'], 0, data[:half]) == half  # sent twice: ignored
+    resumed = init_upload('resume.csv.gz', len(data), 1)  # selected again after an interruption
+    assert resumed == dict(upload_id=first['upload_id'], offset=half, dataset_id=None)
+    append_chunk(first['upload_id'], half, data[half:])
+    dataset_id = complete_upload(first['upload_id'])
+    assert len(datasets.load_dataset(dataset_id)) == 150
+    assert init_upload('resume.csv.gz', len(data), 1)['dataset_id'] == dataset_id  # not sent again
+
+
+def test_size_limits(monkeypatch):
+    monkeypatch.setattr(chunked_upload, 'UPLOAD_MAX_BYTES', 100)
+    with pytest.raises(UploadError):
+        init_upload('large.csv', 101, 1)
+    upload_id = init_upload('small.csv', 10, 1)['upload_id']
+    with pytest.raises(UploadError):
+        append_chunk(upload_id, 0, b'x' * 11)
+    with pytest.raises(UploadError):
+        complete_upload(upload_id)  # not complete
+    with pytest.raises(UploadError):
+        init_upload('data.txt', 10, 1)
+
+
+def test_stale_uploads_are_removed(directories, monkeypatch):
+    stale = init_upload('stale.csv', 100, 1)['upload_id']
+    append_chunk(stale, 0, b'x' * 10)
+    for suffix in ('.json', '.part'):
+        os.utime(str(directories / 'uploads' / (stale + suffix)), (0, 0))
+    fresh = init_upload('fresh.csv', 100, 1)['upload_id']
+    assert sorted(os.listdir(directories / 'uploads')) == [fresh + '.json']
+    assert init_upload('stale.csv', 100, 1)['offset'] == 0  # restarts from the beginning
@@ -0,0 +1,41 @@
+import json
+
+import pandas as pd
+
+import cli
+from repetitions import prepare_records
+from segmentation import gen_seg_list
+from segment_statistics import statistics_of_merged_pair
+from selection import merge_algorithm_pair
+
+CSV = ('mtx,strategy,nnz,gflops,failed\n'
+    'm1,csr,10,1.0,0\nm1,ell,10,2.0,0\nm1,ell,10,4.0,0\n'
+    'm2,csr,2000,3.0,0\nm2,ell,2000,1.0,0\n'
+    'm3,csr,50000,2.0,0\nm3,ell,50000,9.0,1\n')
+
+
+def run(tmp_path, *options):
+    data = tmp_path / 'results.csv'
+    data.write_text(CSV)
+    argv = [str(data), '--mtx', 'mtx', '--strategy', 'strategy', '--x', 'nnz', '--y', 'gflops', '--drop', 'failed',
+        '--output', str(tmp_path / 'out'), '--figure-format', '--jobs', '1'] + list(options)
+    return cli.main(argv)
+
+
+def test_tables_only(tmp_path, capsys):
+    assert run(tmp_path, '--pair', 'ell', 'csr', '--perf', 'csr', 'ell', '--segments', '1 1000 100000', '--table-format', 'csv', 'json') == 0
+    out = tmp_path / 'out'
+    assert sorted(p.name for p in out.iterdir()) == ['perf_csr_ell_segments0.csv', 'perf_csr_ell_segments0.json',
+        'speedup_ell_vs_csr_segments0.csv', 'speedup_ell_vs_csr_segments0.json']
+    assert len(capsys.readouterr().out.split()) == 4
+
+    df = pd.read_csv(tmp_path / 'results.csv')
+    merged = merge_algorithm_pair(prepare_records(df, 'mtx', 'strategy', 'gflops', 'failed'), 'ell', 'csr', 'mtx', 'strategy', None)
+    expected, _ = statistics_of_merged_pair(merged.sort_values(by='nnz_x'), 'ell', 'csr', 'nnz', 'gflops', gen_seg_list(df, 'nnz', 'gflops', '1 1000 100000'))
+    pd.testing.assert_frame_equal(pd.read_csv(out / 'speedup_ell_vs_csr_segments0.csv'), expected, check_dtype=False)
+    assert len(json.loads((out / 'speedup_ell_vs_csr_segments0.json').read_text())) == len(expected)
+
+
+def test_failed_report(tmp_path, capsys):
+    assert run(tmp_path, '--pair', 'ell', 'csr', '--perf', 'csr', 'unknown', '--y', 'missing') == 1
+    assert 'failed' in capsys.readouterr().out
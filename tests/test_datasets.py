@@ -0,0 +1,122 @@
+import base64
+import os
+
+import pandas as pd
+import pytest
+
+import datasets
+from datasets import is_dataset_id, gen_dataset_id
+
+
+def test_dataset_ids():
+    assert is_dataset_id(gen_dataset_id(b'a', 'a.csv'))
+    assert is_dataset_id('live-0123456789abcdef-12')
+    for dataset_id in (None, 3, '', '../secret', '0123456789abcdef0123456789abcde/', 'live-../x', 'live-0123456789abcdef-1/..'):
+        assert not is_dataset_id(dataset_id)
+
+
+def test_invalid_ids_do_not_touch_the_cache_directory(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    cache_dir = tmp_path / 'arrow'
+    cache_dir.mkdir()
+    pd.DataFrame({'a': [1, 2]}).to_parquet(tmp_path / 'secret.parquet')
+    monkeypatch.setattr(datasets, 'ARROW_CACHE_DIR', str(cache_dir))
+    dataset_id = os.path.join('..', 'secret')
+
+    assert datasets.dataset_file(dataset_id) is None
+    assert not datasets.is_registered(dataset_id)
+    assert datasets.dataset_columns(dataset_id) is None
+    assert datasets.load_dataset(dataset_id) is None
+    with pytest.raises(ValueError):
+        datasets.arrow_cache_path(dataset_id)
+
+
+def test_schema_reports_are_evicted_with_their_datasets(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'ARROW_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(datasets.dataset_cache, 'max_bytes', 1)  # the cache keeps the newest dataset only.
+    first, second = '1' * 32, '2' * 32
+    datasets.store_dataset(first, pd.DataFrame({'strategy': ['csr', 'ell'] * 10, 'gflops': range(20)}))
+    assert first in datasets.schema_reports
+    datasets.store_dataset(second, pd.DataFrame({'strategy': ['csr', 'ell'] * 10, 'gflops': range(20)}))
+    assert first not in datasets.dataset_cache and first not in datasets.schema_reports
+    assert second in datasets.schema_reports
+
+
+def test_arrow_cache_is_bounded(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    monkeypatch.setattr(datasets, 'ARROW_CACHE_DIR', str(tmp_path))
+    df = pd.DataFrame({'strategy': ['csr', 'ell'] * 100, 'gflops': range(200)})
+    ids = ['{:032x}'.format(i) for i in range(1, 4)]
+    datasets.persist_dataset(ids[0], df)
+    size = os.path.getsize(datasets.arrow_cache_path(ids[0]))
+    monkeypatch.setattr(datasets, 'ARROW_CACHE_MAX_BYTES', 2 * size)
+
+    datasets.persist_dataset(ids[1], df)
+    os.utime(datasets.arrow_cache_path(ids[0]), (0, 0))
+    os.utime(datasets.arrow_cache_path(ids[1]), (1, 1))
+    assert datasets.dataset_file(ids[0]) is not None  # used again: newer than ids[1]
+    datasets.persist_dataset(ids[2], df)
+    assert [datasets.in_arrow_cache(dataset_id) for dataset_id in ids] == [True, False, True]
+
+    monkeypatch.setattr(datasets, 'ARROW_CACHE_MAX_BYTES', 0)
+    datasets.trim_arrow_cache(ids[2])
+    assert [datasets.in_arrow_cache(dataset_id) for dataset_id in ids] == [False, False, True]
+
+
+def data_url(text: str):
+    return 'data:text/csv;base64,' + base64.b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def test_same_upload_is_parsed_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'ARROW_CACHE_DIR', str(tmp_path))
+    parsed = []
+    read_data_file = datasets.read_data_file
+    monkeypatch.setattr(datasets, 'read_data_file', lambda source, filename: parsed.append(filename) or read_data_file(source, filename))
+    contents = data_url('mtx,strategy,gflops\nm1,csr,1.5\nm2,ell,2.5\n')
+
+    dataset_id = datasets.register_upload(contents, 'a.csv', None)
+    assert datasets.register_upload(contents, 'a.csv', None) == dataset_id
+    assert parsed == ['a.csv']
+    assert datasets.load_dataset(dataset_id)['gflops'].tolist() == [1.5, 2.5]
+    assert datasets.register_upload(contents, 'b.csv', None) != dataset_id  # another file name: another dataset
+    assert datasets.register_upload(data_url('not,a\ncsv'), 'c.txt', None) is None
+
+
+def test_dataset_cache_is_bounded_by_bytes():
+    evicted = []
+    cache = datasets.DatasetCache(3 * 8000, on_evict=evicted.append)
+    frames = {str(i): pd.DataFrame({'y': [float(i)] * 1000}) for i in range(4)}  # 8000 bytes each (and the index)
+    for dataset_id, df in frames.items():
+        cache.put(dataset_id, df)
+        cache.get('0')  # the first dataset is used by each request
+    assert evicted == ['1', '2'] and cache.get('0') is frames['0'] and len(cache) == 2
+    assert cache.total_bytes <= cache.max_bytes
+
+    cache.put('large', pd.DataFrame({'y': range(10000)}))  # the newest dataset is kept even above the bound.
+    assert len(cache) == 1 and 'large' in cache
+
+
+def test_reconcile_schemas():
+    frames = [pd.DataFrame({'mtx': ['a'], 'count': [1], 'note': ['x']}),
+        pd.DataFrame({'mtx': ['b'], 'count': ['2'], 'note': [3]}),
+        pd.DataFrame({'mtx': ['c'], 'extra': [1.5]})]
+    datasets.reconcile_schemas(frames)
+    assert pd.api.types.is_numeric_dtype(frames[1]['count'])  # a counter written as text
+    assert frames[0]['note'].tolist() == ['x'] and frames[1]['note'].tolist() == [3]  # not convertible: kept
+
+
+def test_uploaded_files_are_merged(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'ARROW_CACHE_DIR', str(tmp_path))
+    first = data_url('mtx,strategy,gflops\nm1,csr,1.5\nm2,csr,2.5\n')
+    second = data_url('mtx,strategy,gflops,nnz\nm1,ell,3.5,10\n')
+    dataset_id = datasets.register_uploads([first, second], ['a.csv', 'b.csv'], [None, None])
+    assert dataset_id == datasets.gen_merged_dataset_id([gen_dataset_id(base64.b64decode(c.split(',', 1)[1]), n)
+        for c, n in ((first, 'a.csv'), (second, 'b.csv'))])
+    assert datasets.register_uploads([second, first], ['b.csv', 'a.csv'], [None, None]) != dataset_id  # another order
+    assert datasets.register_uploads([first], ['a.csv'], [None]) == datasets.register_upload(first, 'a.csv', None)
+
+    df = datasets.load_dataset(dataset_id)
+    assert df[datasets.SOURCE_FILE_COLUMN].astype(str).tolist() == ['a.csv', 'a.csv', 'b.csv']
+    assert df['gflops'].tolist() == [1.5, 2.5, 3.5]
+    assert df['nnz'].isna().tolist() == [True, True, False]  # missing in the first file
+    assert datasets.register_uploads([first, data_url('not,a\ncsv')], ['a.csv', 'c.txt'], [None, None]) is None
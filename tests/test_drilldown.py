@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from drilldown import DrillDownTable, parse_filter_query
+
+
+@pytest.fixture
+def table():
+    frame = pd.DataFrame({
+        'mtx': ['a', 'b', 'c', 'd', 'e'],
+        'x': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'speedup': [0.5, np.nan, np.inf, 2.0, 0.9],
+        'best': ['csr', None, 'hyb', 'csr_adaptive', 'ell'],
+    })
+    return DrillDownTable(frame, [])
+
+
+def mtx(table, positions):
+    return table.frame['mtx'].to_numpy()[positions].tolist()
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('{speedup} < 1', [('speedup', '<', '1')]),
+    ('{best} contains csr', [('best', 'contains', 'csr')]),
+    ('{speedup} >= 1 && {best} contains "csr"', [('speedup', '>=', '1'), ('best', 'contains', 'csr')]),
+    ('{x} s> 2 && {mtx} i= \'a\'', [('x', '>', '2'), ('mtx', '=', 'a')]),
+    ('{x} ge 2 && {x} ne 3', [('x', '>=', '2'), ('x', '!=', '3')]),
+])
+def test_parse_valid_queries(query, expected):
+    assert parse_filter_query(query) == expected
+
+
+@pytest.mark.parametrize('query', [None, '', 3, ['{x} > 1'], '{x}', '{x} >', '{x} is blank', 'x > 1', '{x > 1', '{} = 1', '&&', '{x} ~ 1'])
+def test_parse_malformed_queries(query):
+    assert parse_filter_query(query) == []
+
+
+def test_malformed_parts_are_ignored():
+    assert parse_filter_query('{x} > && {speedup} < 1 && garbage') == [('speedup', '<', '1')]
+
+
+def test_filter_rows(table):
+    assert mtx(table, table.rows(None, '{speedup} < 1', [])) == ['a', 'e']
+    assert mtx(table, table.rows(None, '{best} contains csr', [])) == ['a', 'd']
+    assert mtx(table, table.rows(None, '{best} contains csr && {speedup} > 1', [])) == ['d']
+    assert mtx(table, table.rows([2.0, 4.0, False], '{speedup} > 0', [])) == ['c']
+    # a number compared with a text column, and a text compared with a numeric column.
+    assert mtx(table, table.rows(None, '{best} = csr', [])) == ['a']
+    assert mtx(table, table.rows(None, '{speedup} < abc', [])) == []
+
+
+def test_unknown_columns_are_ignored(table):
+    assert mtx(table, table.rows(None, '{nope} < 1 && {speedup} < 1', [])) == ['a', 'e']
+    assert mtx(table, table.cached_rows(None, '', [{'column_id': 'nope', 'direction': 'asc'}])) == ['a', 'b', 'c', 'd', 'e']
+
+
+def test_sort_rows(table):
+    positions = table.cached_rows(None, '', [{'column_id': 'speedup', 'direction': 'desc'}])
+    assert mtx(table, positions) == ['c', 'd', 'e', 'a', 'b']  # NaN last
+    positions = table.cached_rows(None, '{x} <= 4', [{'column_id': 'best', 'direction': 'asc'}])
+    assert mtx(table, positions) == ['a', 'd', 'c', 'b']
+
+
+@pytest.mark.parametrize('filter_query, sort_by', [
+    (None, None), (3, 'x'), ('{x', [None, {'direction': 'asc'}, {'column_id': ['x']}]), ('{x} >= "1"', [{'column_id': 'x', 'direction': 1}]),
+])
+def test_malformed_input_does_not_raise(table, filter_query, sort_by):
+    assert len(table.cached_rows(None, filter_query, sort_by)) == 5
@@ -0,0 +1,87 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import figure_export
+from figure_export import FigureExporter, export_key
+
+
+class Figure:
+    def __init__(self, text):
+        self.text = text
+
+    def to_json(self):
+        return self.text
+
+
+# a pool of worker processes exporting in the calling thread, the first `broken_pools` pools fail as if their worker died.
+class Pool:
+    created = []
+    broken_pools = 0
+
+    def __init__(self, **kwargs):
+        self.broken = len(Pool.created) < Pool.broken_pools
+        self.shut_down = False
+        Pool.created.append(self)
+
+    def submit(self, fn, *args):
+        future = Future()
+        if self.broken:
+            future.set_exception(BrokenProcessPool('a worker process died'))
+        else:
+            future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    monkeypatch.setattr(figure_export, 'ProcessPoolExecutor', Pool)
+    monkeypatch.setattr(figure_export, '_figure_to_image', lambda fig_json, fmt: (fmt + ':' + fig_json).encode('utf-8'))
+    Pool.created = []
+    Pool.broken_pools = 0
+    return Pool
+
+
+def test_exports_are_cached(pools):
+    exporter = FigureExporter(1, 1 << 20)
+    built = []
+    def build():
+        built.append(1)
+        return Figure('fig')
+    assert exporter.export('k', build) == b'pdf:fig'
+    assert exporter.export('k', build) == b'pdf:fig'
+    assert len(built) == 1 and len(pools.created) == 1
+
+
+def test_cache_is_bounded_by_bytes(pools):
+    exporter = FigureExporter(1, 20)
+    for key in 'abc':
+        exporter.export(key, lambda: Figure(key * 8))  # 12 bytes each
+    assert list(exporter._images) == ['c'] and exporter.total_bytes == 12
+
+
+def test_broken_pool_is_replaced(pools):
+    pools.broken_pools = 1
+    exporter = FigureExporter(1, 1 << 20)
+    assert exporter.export('k', lambda: Figure('fig')) == b'pdf:fig'
+    assert len(pools.created) == 2 and pools.created[0].shut_down
+    assert exporter._pool is pools.created[1]
+
+
+def test_export_is_retried_once(pools):
+    pools.broken_pools = 2
+    exporter = FigureExporter(1, 1 << 20)
+    with pytest.raises(BrokenProcessPool):
+        exporter.export('k', lambda: Figure('fig'))
+    assert not exporter._pending
+    assert exporter.export('k', lambda: Figure('fig')) == b'pdf:fig'  # by a new pool
+
+
+def test_export_keys():
+    assert export_key('d', 'pdf', a=1, b=2) == export_key('d', 'pdf', b=2, a=1)
+    assert export_key('d', 'pdf', a=1) != export_key('d', 'png', a=1)
+    assert export_key('d', 'pdf', a=1) != export_key('e', 'pdf', a=1)
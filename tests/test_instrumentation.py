@@ -0,0 +1,71 @@
+import tracemalloc
+from collections import deque
+
+import numpy as np
+import pytest
+
+import instrumentation
+from instrumentation import stage, record_value, instrumented_callback, recent_invocations, metrics_summary
+
+
+@pytest.fixture
+def profile(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'PROFILE_ENABLED', True)
+    monkeypatch.setattr(instrumentation, '_records', deque(maxlen=3))
+    yield
+    tracemalloc.stop()
+
+
+def test_disabled_profiling_returns_the_callback(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'PROFILE_ENABLED', False)
+    def callback():
+        return 1
+    assert instrumented_callback(callback) is callback
+    with stage('outside of a callback'):
+        record_value('ignored', 1)
+
+
+def test_stages_and_values_are_recorded(profile):
+    @instrumented_callback
+    def callback(n):
+        with stage('outer'):
+            with stage('inner'):
+                values = np.ones(n)
+            record_value('rows', n)
+        return values.sum()
+
+    assert callback(1 << 20) == 1 << 20
+    record, = recent_invocations()
+    assert record['callback'] == 'callback' and record['error'] is None and record['values']['rows'] == 1 << 20
+    assert record['values']['payload_bytes'] > 0
+    stages = {s['name']: s for s in record['stages']}
+    assert [s['name'] for s in record['stages']] == ['inner', 'outer', 'callback', 'json serialization']
+    assert stages['inner']['peak'] >= 8 << 20 and stages['outer']['peak'] >= stages['inner']['peak']
+    assert record['wall'] >= stages['callback']['wall'] >= stages['outer']['wall'] >= stages['inner']['wall']
+
+
+def test_errors_and_summary(profile):
+    @instrumented_callback
+    def failing():
+        raise KeyError('x')
+
+    @instrumented_callback
+    def ok():
+        return 'ok'
+
+    with pytest.raises(KeyError):
+        failing()
+    for _ in range(3):
+        ok()
+    assert [r['callback'] for r in recent_invocations()] == ['ok', 'ok', 'ok']  # the latest 3 invocations are kept
+    assert [r['callback'] for r in recent_invocations(1)] == ['ok']
+
+    assert failing.__name__ == 'failing'  # dash identifies the callback by its name
+    with pytest.raises(KeyError):
+        failing()
+    assert recent_invocations(1)[0]['error'] == 'KeyError'
+    summary = metrics_summary()
+    assert summary['enabled'] and summary['callbacks']['failing']['errors'] == 1
+    ok_entry = summary['callbacks']['ok']
+    assert ok_entry['count'] == 2 and ok_entry['stages']['callback']['count'] == 2
+    assert ok_entry['wall_max'] <= ok_entry['wall_total']
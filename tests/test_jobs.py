@@ -0,0 +1,84 @@
+import os
+import pickle
+import time
+
+from jobs import JobManager, is_job_id
+
+
+def wait(manager, job_id):
+    for _ in range(200):
+        job = manager.get(job_id)
+        if job is not None and job.is_finished():
+            return job
+        time.sleep(0.01)
+    raise AssertionError('job not finished')
+
+
+def test_job_ids():
+    assert is_job_id('0123456789abcdef0123456789abcdef')
+    for job_id in (None, 1, '', '../../x', '0123456789ABCDEF0123456789ABCDEF', '0123456789abcdef0123456789abcdef/'):
+        assert not is_job_id(job_id)
+
+
+def test_invalid_ids_do_not_touch_the_directory(tmp_path):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'x.json').write_text('{"status": "done"}')
+    (outside / 'x.pickle').write_bytes(pickle.dumps('result'))
+    manager = JobManager(1, 60, str(tmp_path / 'jobs'))
+    job_id = os.path.join('..', 'outside', 'x')
+
+    assert manager.get(job_id) is None
+    manager.cancel(job_id)
+    manager.remove(job_id)
+    assert sorted(os.listdir(outside)) == ['x.json', 'x.pickle']
+
+
+def test_results_are_shared_by_the_directory(tmp_path):
+    directory = str(tmp_path / 'jobs')
+    manager = JobManager(1, 60, directory)
+    job_id = manager.submit(lambda job, a, b: a + b, 1, 2)
+    wait(manager, job_id)
+
+    other = JobManager(1, 60, directory)  # another worker process
+    job = other.get(job_id)
+    assert job.status == 'done' and job.result == 3
+    other.remove(job_id)
+    assert not os.path.exists(os.path.join(directory, job_id + '.pickle'))
+
+
+def test_unsigned_results_are_not_loaded(tmp_path):
+    directory = str(tmp_path / 'jobs')
+    manager = JobManager(1, 60, directory)
+    job_id = manager.submit(lambda job: 'result')
+    wait(manager, job_id)
+
+    with open(os.path.join(directory, job_id + '.pickle'), 'wb') as f:
+        f.write(b'\0' * 32 + pickle.dumps('forged'))
+    assert JobManager(1, 60, directory).get(job_id) is None
+
+
+def test_removed_job_is_not_published_again(tmp_path):
+    directory = str(tmp_path)
+    manager = JobManager(1, 60, directory)
+    job_id = manager.submit(lambda job: 'result')
+    job = wait(manager, job_id)
+    assert job.result == 'result' and job.finished_at is not None
+
+    manager.remove(job_id)
+    job.finish('done', 'late')  # e.g. a worker finishing after the page removed the job
+    assert not [f for f in os.listdir(directory) if f.startswith(job_id)]
+
+
+def test_expired_jobs_of_other_processes_are_swept(tmp_path):
+    directory = str(tmp_path)
+    exited = JobManager(1, 0, directory)  # a worker process which has exited since its job finished
+    job_id = wait(exited, exited.submit(lambda job: 'result')).id
+    (tmp_path / ('0' * 32 + '.pickle')).write_bytes(b'')  # left without status file
+    time.sleep(0.01)
+
+    manager = JobManager(1, 0, directory)
+    wait(manager, manager.submit(lambda job: None))
+    assert not os.path.exists(os.path.join(directory, job_id + '.json'))
+    assert not os.path.exists(os.path.join(directory, job_id + '.pickle'))
+    assert not os.path.exists(os.path.join(directory, '0' * 32 + '.pickle'))
@@ -0,0 +1,121 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from live_source import LiveSource, TailedFile
+from segment_statistics import statistics_in_each_segment
+from best_perf import statistics_best_perf_in_each_segment
+
+STRATEGIES = ['csr', 'ell', 'hyb']
+HEADER = 'mtx,strategy,nnz,gflops,failed\n'
+SEGMENTS = [1, 1000, 10000, 30000, 100001]
+
+
+# result lines of random runs of the matrices (nnz is a property of the matrix), with missing y values and failed runs.
+def lines(rng, matrices: [int]):
+    result = []
+    for i in matrices:
+        for strategy in STRATEGIES:
+            if rng.random() < 0.1:
+                continue
+            gflops = '' if rng.random() < 0.03 else '{:.6f}'.format(rng.lognormal(0, 1))
+            result.append('m{},{},{},{},{}\n'.format(i, strategy, 1 + (i * 7919) % 100000, gflops, int(rng.random() < 0.05)))
+    return result
+
+
+# the complete lines of the result files, as parsed at once.
+def complete_rows(directory: str):
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            data = f.read()
+        frames.append(pd.read_csv(io.BytesIO(data[:data.rfind(b'\n') + 1])))
+    return pd.concat(frames, ignore_index=True)
+
+
+def assert_live_statistics(source: LiveSource, directory: str, reducer: str):
+    df = complete_rows(directory)
+    assert source.table.rows == len(df)
+    speedup = source.speedup_statistics('csr', 'hyb', 'mtx', 'strategy', 'nnz', 'gflops', 'failed', reducer)
+    expected, _ = statistics_in_each_segment(df, 'csr', 'hyb', 'nnz', 'gflops', 'mtx', 'strategy', SEGMENTS, 'failed', reducer)
+    pd.testing.assert_frame_equal(speedup.statistics(SEGMENTS), expected, check_dtype=False, rtol=1e-9)
+
+    best = source.best_perf_statistics('nnz', 'gflops', 'mtx', 'strategy', STRATEGIES, 'failed', reducer)
+    expected, _ = statistics_best_perf_in_each_segment(df, 'nnz', 'gflops', 'mtx', 'strategy', STRATEGIES, SEGMENTS, 'failed', reducer)
+    pd.testing.assert_frame_equal(best.statistics(SEGMENTS).reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+
+
+def append(path: str, text: str):
+    with open(path, 'a') as f:
+        f.write(text)
+
+
+@pytest.mark.parametrize('reducer', ['median', 'best', 'trimmed_mean'])
+def test_appended_batches_match_a_full_recompute(tmp_path, reducer):
+    rng = np.random.default_rng(0)
+    a, b = str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')
+    append(a, HEADER + ''.join(lines(rng, range(300))))
+    source = LiveSource(str(tmp_path))
+    assert source.refresh() > 0
+    assert_live_statistics(source, str(tmp_path), reducer)
+
+    for batch in range(6):
+        # more runs of some matrices (their speedups and best strategies change), a few new matrices,
+        # and a last line still being written.
+        text = ''.join(lines(rng, rng.choice(300, 20, replace=False).tolist() + list(range(300 + 5 * batch, 305 + 5 * batch))))
+        cut = len(text) - 7
+        append(a, text[:cut])
+        if batch == 3:  # a new file
+            append(b, HEADER + ''.join(lines(rng, range(40))))
+        assert source.refresh() > 0
+        assert_live_statistics(source, str(tmp_path), reducer)
+        append(a, text[cut:])
+    assert source.refresh() > 0
+    assert_live_statistics(source, str(tmp_path), reducer)
+
+
+def test_truncated_or_replaced_files_are_read_again(tmp_path):
+    rng = np.random.default_rng(1)
+    path = str(tmp_path / 'a.csv')
+    append(path, HEADER + ''.join(lines(rng, range(200))))
+    source = LiveSource(str(tmp_path))
+    source.refresh()
+    assert_live_statistics(source, str(tmp_path), 'median')
+
+    # truncated: rewritten with fewer rows.
+    with open(path, 'w') as f:
+        f.write(HEADER + ''.join(lines(rng, range(50))))
+    version = source.version
+    source.refresh()
+    assert source.version > version
+    assert_live_statistics(source, str(tmp_path), 'median')
+
+    # replaced by a larger file (a new inode): its offset is not reused.
+    tmp = str(tmp_path / 'a.tmp')
+    with open(tmp, 'w') as f:
+        f.write(HEADER + ''.join(lines(rng, range(400))))
+    os.replace(tmp, path)
+    assert source._files['a.csv'].is_rewritten()
+    source.refresh()
+    assert source._files['a.csv'].offset == os.path.getsize(path)
+    assert_live_statistics(source, str(tmp_path), 'median')
+
+    # removed.
+    os.remove(path)
+    source.refresh()
+    assert source.table.rows == 0 and source.files() == []
+
+
+def test_tailed_file_reads_complete_lines_only(tmp_path):
+    path = str(tmp_path / 'a.csv')
+    append(path, HEADER + 'm1,csr,10,1.5,0\nm1,hyb,10,')
+    tailed = TailedFile(path)
+    assert tailed.read_new_rows()['gflops'].tolist() == [1.5]
+    assert tailed.read_new_rows() is None
+    append(path, '2.5,0\n')
+    rows = tailed.read_new_rows()
+    assert rows['strategy'].tolist() == ['hyb'] and rows['gflops'].tolist() == [2.5]
+    assert not tailed.is_rewritten()
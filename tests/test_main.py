@@ -0,0 +1,55 @@
+import json
+
+import main
+
+
+def test_invalid_job_ids_are_unknown_jobs():
+    for job_id in ('../../x', {'id': 1}, '0' * 31):
+        assert main.page_job_id(job_id) is None
+        result = main.publish_analysis(1, job_id)
+        assert result[0] is None and result[-1] is True
+        assert main.publish_export(1, job_id)[1:] == (None, True)
+
+
+def test_plot_style_numbers_are_validated():
+    style = ['#000', '#111', '18', 'x', 'y', 'yes', 'legend', '1200', '600']
+    config = main.plot_config(*style, '1000')
+    assert (config.font_size, config.width, config.height, config.large_data_threshold, config.showlegend) == (18, 1200, 600, 1000, True)
+    assert main.plot_config(*style).large_data_threshold == main.LARGE_DATA_POINTS_THRESHOLD
+    for font_size, threshold in (('1a', '1000'), (None, '1000'), ('18', ''), ('18', '1e5')):
+        assert main.plot_config(*style[:2], font_size, *style[3:], threshold) is None
+
+
+def test_invalid_plot_style_does_not_start_an_analysis(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(main.job_manager, 'submit', lambda *args, **kwargs: submitted.append(args))
+    style = ['#000', '#111', 'large', 'x', 'y', 'yes', 'legend', '1200', '600', '1000']
+    job_id, poll_disabled, message = main.update_output(1, None, '0' * 32, 'speedup', 'mtx', 'strategy', 'nnz', 'gflops', None,
+        'a', 'b', [], 'median', '', *style)
+    assert not submitted and 'must be integers' in str(message)
+
+
+# apply the operations of a partial update to a figure dict, as the browser does.
+def apply_patch(fig: dict, patch):
+    for op in patch.to_plotly_json()['operations']:
+        assert op['operation'] == 'Assign'
+        *path, key = op['location']
+        target = fig
+        for k in path:
+            target = target.setdefault(k, {}) if isinstance(target, dict) else target[k]
+        target[key] = op['params']['value']
+    return fig
+
+
+def test_restyle_matches_a_rebuilt_figure():
+    import pandas as pd
+    from backends import PandasBackend
+    df = pd.DataFrame({'mtx': ['m{}'.format(i // 3) for i in range(30)], 'strategy': ['a', 'b', 'c'] * 10,
+        'nnz': [(i // 3 + 1) * 100 for i in range(30)], 'gflops': [1.0 + (i * 7 % 11) for i in range(30)]})
+    backend = PandasBackend('f' * 32, df)
+    before = main.plot_config('#f00', '#000', '18', 'nnz', 'gflops', 'yes', 'legend', '1200', '600')
+    after = main.plot_config('#0f0', '#333', '12', 'NNZ', 'GFLOPS', [], 'strategies', '800', '400')
+    for plot_type in main.PLOT_GRAPH_IDS:
+        build = lambda config: main.gen_figure(backend, plot_type, 'mtx', 'strategy', 'nnz', 'gflops', None, 'a', 'b', ['a', 'b', 'c'],
+            'median', config, '300 600').to_json()
+        assert apply_patch(json.loads(build(before)), main.gen_style_patch(plot_type, after)) == json.loads(build(after)), plot_type
@@ -0,0 +1,58 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import pairwise_speedup
+from pairwise_speedup import pivot_selection, pairwise_speedup as pairwise
+
+STRATEGIES = ['csr', 'ell', 'hyb', 'coo']
+
+
+def records(rng, n=60):
+    rows = []
+    for i in range(n):
+        nnz = int(rng.integers(1, 10000))
+        for strategy in STRATEGIES:
+            for _ in range(rng.integers(0, 3)):
+                rows.append(('m{}'.format(i), strategy, nnz, rng.lognormal(0, 1)))
+    df = pd.DataFrame(rows, columns=['mtx', 'strategy', 'nnz', 'gflops'])
+    df.loc[rng.random(len(df)) < 0.05, 'gflops'] = np.nan
+    return df
+
+
+def test_pivot_matches_pivot_table():
+    df = records(np.random.default_rng(0))
+    algs = ['hyb', 'csr', 'ell']
+    tab = df[df['strategy'].isin(algs)]
+    pivot = pivot_selection(tab, 'mtx', 'strategy', 'nnz', 'gflops', algs)
+
+    expected = tab.pivot_table(index='mtx', columns='strategy', values='gflops', aggfunc='mean', sort=False)
+    expected = expected.reindex(index=pivot.mtx_names, columns=pivot.strategies)
+    assert pivot.strategies == algs
+    np.testing.assert_allclose(pivot.y, expected.to_numpy(), rtol=1e-12)
+    np.testing.assert_array_equal(pivot.x, tab.groupby('mtx', sort=False)['nnz'].first().reindex(pivot.mtx_names).to_numpy())
+
+
+def test_pivot_ignores_records_without_matrix_name():
+    tab = pd.DataFrame({'mtx': [np.nan, 'a', 'a', None, 'b'], 'strategy': ['csr', 'csr', 'ell', 'ell', 'csr'],
+        'nnz': [5, 10, 11, 6, 20], 'gflops': [9.0, 1.0, 2.0, 9.0, 3.0]})
+    pivot = pivot_selection(tab, 'mtx', 'strategy', 'nnz', 'gflops', ['csr', 'ell'])
+    assert pivot.mtx_names.tolist() == ['a', 'b']
+    np.testing.assert_array_equal(pivot.x, [10, 20])
+    np.testing.assert_array_equal(pivot.y, [[1.0, 2.0], [3.0, np.nan]])
+
+
+def test_pairwise_speedup_matches_loops(monkeypatch):
+    rng = np.random.default_rng(1)
+    y = rng.lognormal(0, 1, size=(50, 4))
+    y[rng.random(y.shape) < 0.2] = np.nan
+    y[0, 0] = 0.0  # not positive: not valid
+    monkeypatch.setattr(pairwise_speedup, 'BEAT_CHUNK_ELEMENTS', 64)  # several chunks of matrices
+
+    geomean, beat_count, total_count = pairwise(y)
+    for i, j in itertools.product(range(4), repeat=2):
+        both = np.isfinite(y[:, i]) & np.isfinite(y[:, j]) & (y[:, i] > 0) & (y[:, j] > 0)
+        assert total_count[i, j] == both.sum()
+        assert beat_count[i, j] == (y[both, i] >= y[both, j]).sum()
+        np.testing.assert_allclose(geomean[i, j], np.exp(np.mean(np.log(y[both, i] / y[both, j]))), rtol=1e-9)
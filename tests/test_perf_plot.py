@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from speedup_versus import PlotConfig
+from perf_plot import downsample_min_max, gen_plot_performance_of_selection
+
+
+def config(large_data_threshold):
+    return PlotConfig('#00f', '#000', 18, 'nnz', 'gflops', True, 'legend', 100, 600, large_data_threshold)
+
+
+def records(rng, n=5000):
+    return pd.DataFrame({'mtx': ['m{}'.format(i) for i in range(n)], 'strategy': rng.choice(['csr', 'ell'], n),
+        'nnz': rng.integers(1, 1000000, n), 'gflops': rng.lognormal(0, 1, n)})
+
+
+def test_downsampling_keeps_the_extremes_of_each_bin():
+    rng = np.random.default_rng(0)
+    tab = records(rng)
+    tab.loc[:9, 'nnz'] = 0  # not drawable on the log axis
+    tab.loc[10:19, 'gflops'] = np.nan
+    kept = downsample_min_max(tab, 'strategy', 'nnz', 'gflops', 100)
+    assert len(kept) <= 2 * 2 * 100 and kept.index.is_monotonic_increasing
+
+    drawable = tab.iloc[20:]
+    log_x = np.log10(drawable['nnz'])
+    x_bin = np.minimum(((log_x - log_x.min()) / (log_x.max() - log_x.min()) * 100).astype(int), 99)
+    groups = drawable.groupby([drawable['strategy'], x_bin])['gflops']
+    expected = set(groups.idxmin()) | set(groups.idxmax())
+    assert set(kept.index) == expected
+
+
+def test_downsampling_of_a_single_x_value():
+    tab = pd.DataFrame({'strategy': ['a', 'a', 'a', 'b'], 'nnz': [10, 10, 10, 10], 'gflops': [2.0, 1.0, 3.0, 5.0]})
+    assert downsample_min_max(tab, 'strategy', 'nnz', 'gflops', 10).index.tolist() == [1, 2, 3]
+    assert len(downsample_min_max(tab.assign(nnz=-1), 'strategy', 'nnz', 'gflops', 10)) == 0
+
+
+def test_large_data_is_rendered_by_webgl():
+    tab = records(np.random.default_rng(1))
+    fig = gen_plot_performance_of_selection(tab, 'mtx', 'strategy', 'nnz', 'gflops', config(1000))
+    assert {trace.type for trace in fig.data} == {'scattergl'}
+    drawn = sum(len(trace.x) for trace in fig.data)
+    assert fig.layout.meta == dict(points_drawn=drawn, points_total=len(tab)) and drawn < len(tab)
+    assert max(max(trace.y) for trace in fig.data) == tab['gflops'].max()
+    assert min(min(trace.y) for trace in fig.data) == tab['gflops'].min()
+
+
+def test_small_data_is_drawn_completely():
+    tab = records(np.random.default_rng(2), 200)
+    fig = gen_plot_performance_of_selection(tab, 'mtx', 'strategy', 'nnz', 'gflops', config(1000))
+    assert {trace.type for trace in fig.data} == {'scatter'}
+    assert fig.layout.meta == dict(points_drawn=200, points_total=200)
@@ -0,0 +1,58 @@
+import numpy as np
+
+from pairwise_speedup import StrategyPivot
+from performance_profile import PROFILE_TAUS, PerformanceProfile, performance_ratios, statistics_profile_in_each_segment
+
+
+def test_ratios_on_ties_and_invalid_values():
+    y = np.array([[2.0, 2.0, 1.0],
+                  [np.nan, 0.0, -1.0],  # no valid value: skipped
+                  [4.0, np.nan, 0.0],
+                  [np.inf, 1.0, 3.0]])
+    ratios, kept = performance_ratios(y)
+    assert kept.tolist() == [True, False, True, True]
+    np.testing.assert_array_equal(ratios, [[1.0, 1.0, 2.0], [1.0, np.inf, np.inf], [np.inf, 3.0, 1.0]])
+
+    ratios, kept = performance_ratios(np.full((2, 2), np.nan))
+    assert ratios.shape == (0, 2) and not kept.any()
+    profile = PerformanceProfile(ratios)
+    assert profile.fractions([1.0, 2.0]).tolist() == [[0.0, 0.0], [0.0, 0.0]] and profile.max_ratio() == 1.0
+    taus, rho = profile.steps(0, 2.0, 100)
+    assert taus.tolist() == [1.0, 2.0] and rho.tolist() == [0.0, 0.0]
+
+
+# rho_s(tau) counted matrix by matrix.
+def rho(ratios, s, tau):
+    return np.mean(ratios[:, s] <= tau)
+
+
+def test_fractions_and_steps_match_counting():
+    rng = np.random.default_rng(0)
+    y = np.round(rng.lognormal(0, 0.5, size=(200, 3)), 1)  # many ties
+    y[rng.random(y.shape) < 0.1] = np.nan
+    ratios, _ = performance_ratios(y)
+    profile = PerformanceProfile(ratios)
+    taus = [1.0, 1.1, 1.5, 2.0, 10.0]
+    expected = [[rho(ratios, s, tau) for s in range(3)] for tau in taus]
+    np.testing.assert_allclose(profile.fractions(taus), expected)
+
+    tau_end = profile.max_ratio() * 1.5
+    for s in range(3):
+        step_taus, step_rho = profile.steps(s, tau_end, 1000)
+        assert len(np.unique(step_taus[1:-1])) == len(step_taus) - 2  # one step per distinct ratio
+        np.testing.assert_allclose(step_rho[1:], [rho(ratios, s, tau) for tau in step_taus[1:]])
+        assert step_taus[-1] == tau_end and step_rho[0] == 0.0
+
+        sampled_taus, sampled_rho = profile.steps(s, tau_end, 10)
+        assert len(sampled_taus) == 10 and sampled_taus[0] == 1.0 and np.isclose(sampled_taus[-1], tau_end)
+        np.testing.assert_allclose(sampled_rho, [rho(ratios, s, tau) for tau in sampled_taus])
+
+
+def test_statistics_in_each_segment():
+    y = np.array([[1.0, 2.0], [3.0, 3.0], [np.nan, np.nan], [1.0, 4.0]])
+    pivot = StrategyPivot(np.array(['a', 'b', 'c', 'd']), ['csr', 'ell'], np.array([10, 20, 30, 200]), y)
+    df, columns = statistics_profile_in_each_segment(pivot, [1, 100, 1000])
+    assert df['total_count'].tolist() == [3, 3, 2, 2, 1, 1]  # the matrix without a valid value is skipped
+    assert df['within_1'].tolist() == [1 / 3, 1.0, 0.5, 1.0, 0.0, 1.0]
+    assert df['within_2'].tolist() == [2 / 3, 1.0, 1.0, 1.0, 0.0, 1.0]
+    assert [c['id'] for c in columns][4:] == ['within_' + '{:g}'.format(tau).replace('.', '_') for tau in PROFILE_TAUS]
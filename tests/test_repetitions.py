@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from settings import REDUCERS
+from repetitions import TRIM_RATIO, collapse_repetitions, reduce_groups, prepare_records
+
+
+# the reduced value of one group, with the values sorted one by one.
+def reference(values, reducer):
+    values = np.sort(values[~np.isnan(values)])
+    if len(values) == 0:
+        return np.nan
+    if reducer == 'median':
+        return np.median(values)
+    if reducer == 'min':
+        return values[0]
+    if reducer == 'best':
+        return values[-1]
+    cut = int(np.floor(len(values) * TRIM_RATIO))
+    return values[cut:len(values) - cut].mean()
+
+
+def records(rng):
+    rows = []
+    for i in range(40):
+        for strategy in ('csr', 'ell'):
+            for run in range(rng.integers(1, 25)):
+                rows.append(('m{}'.format(i), strategy, i * 10, run, rng.lognormal(0, 1)))
+    df = pd.DataFrame(rows, columns=['mtx', 'strategy', 'nnz', 'run', 'gflops'])
+    df.loc[rng.random(len(df)) < 0.1, 'gflops'] = np.nan
+    df.loc[(df['mtx'] == 'm0') & (df['strategy'] == 'ell'), 'gflops'] = np.nan  # a group without any value
+    return df
+
+
+@pytest.mark.parametrize('reducer', [r[0] for r in REDUCERS])
+def test_each_reducer_matches_the_reference(reducer):
+    df = records(np.random.default_rng(0))
+    collapsed = collapse_repetitions(df, 'mtx', 'strategy', 'gflops', reducer)
+    first = df.groupby(['mtx', 'strategy'], sort=False).head(1)
+    assert collapsed.index.tolist() == first.index.tolist()  # the first record of each group, in order
+    assert (collapsed['run'] == 0).all()
+
+    expected = [reference(group['gflops'].to_numpy(), reducer) for _, group in df.groupby(['mtx', 'strategy'], sort=False)]
+    np.testing.assert_allclose(collapsed['gflops'].to_numpy(), expected, rtol=1e-12)
+    assert np.isnan(collapsed['gflops'].iloc[1])
+
+    group = df.groupby(['mtx', 'strategy'], sort=False).ngroup().to_numpy()
+    np.testing.assert_allclose(reduce_groups(df['gflops'], group, len(expected), reducer), expected, rtol=1e-12)
+
+
+def test_records_without_repetition_are_kept():
+    df = pd.DataFrame({'mtx': ['a', 'a', 'b'], 'strategy': ['csr', 'ell', 'csr'], 'gflops': [1.0, 2.0, 3.0]})
+    assert collapse_repetitions(df, 'mtx', 'strategy', 'gflops') is df
+    with pytest.raises(ValueError):
+        collapse_repetitions(pd.concat([df, df]), 'mtx', 'strategy', 'gflops', 'mean')
+
+
+def test_failed_runs_are_dropped_before_collapsing():
+    df = pd.DataFrame({'mtx': ['a'] * 3 + [np.nan] * 2, 'strategy': ['csr'] * 5,
+        'gflops': [1.0, 2.0, 100.0, 4.0, 6.0], 'failed': [0, 0, 1, 0, 0]})
+    collapsed = prepare_records(df, 'mtx', 'strategy', 'gflops', 'failed', 'best')
+    assert collapsed['gflops'].tolist() == [2.0, 6.0]  # records without a matrix name are one group
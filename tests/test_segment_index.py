@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from segment_index import SpeedupIndex, BestPerfIndex, best_of_matrices, RANGE_BLOCK_SIZE
+from segment_statistics import segment_speedup_table
+from best_perf import statistics_best_perf_of_selection
+from segmentation import segment_bounds
+
+STRATEGIES = ['csr', 'ell', 'hyb', 'merge']
+
+
+# a random ascending segmentation of the x values, with repeated boundaries (empty segments)
+# and boundaries out of the x range.
+def random_segments(rng, x):
+    values = list(rng.choice(x, size=rng.integers(1, 12)))
+    values += [values[0], x.min() - 5, x.max() + 5]
+    return segment_bounds(values, x.min(), x.max())
+
+
+# merged records of 2 algorithms (see merge_algorithm_pair), with missing, zero and negative y values,
+# thus the speedups include NaN, inf, -inf and 0.
+def merged_pair(rng, n: int):
+    y_a = rng.lognormal(0, 1, n)
+    y_b = rng.lognormal(0, 1, n)
+    y_a[rng.random(n) < 0.05] = np.nan
+    y_b[rng.random(n) < 0.05] = np.nan
+    y_b[rng.random(n) < 0.02] = 0.0
+    y_a[rng.random(n) < 0.02] = 0.0
+    y_a[rng.random(n) < 0.01] = -1.0
+    x = rng.integers(1, 100000, n).astype(np.float64)
+    return pd.DataFrame({'nnz_x': x, 'gflops_x': y_a, 'gflops_y': y_b}).sort_values(by='nnz_x')
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_speedup_index_matches_segment_speedup_table(seed):
+    rng = np.random.default_rng(seed)
+    merged = merged_pair(rng, 3 * RANGE_BLOCK_SIZE + int(rng.integers(0, RANGE_BLOCK_SIZE)))
+    x = merged['nnz_x'].to_numpy()
+    index = SpeedupIndex(merged, 'a', 'b', 'nnz', 'gflops', (x.min(), x.max()))
+    for _ in range(10):
+        segments = random_segments(rng, x)
+        expected = segment_speedup_table(merged, 'a', 'b', 'nnz', 'gflops', segments)
+        pd.testing.assert_frame_equal(index.statistics(segments), expected, check_dtype=False, rtol=1e-9)
+
+
+def test_speedup_index_of_nan_and_inf_segments():
+    merged = pd.DataFrame({
+        'nnz_x': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0],
+        'gflops_x': [np.nan, 1.0, 1.0, 2.0, -1.0, 1.0, 3.0],
+        'gflops_y': [1.0, np.nan, 0.0, 1.0, 0.0, 0.0, 1.0],
+    })
+    index = SpeedupIndex(merged, 'a', 'b', 'nnz', 'gflops', (1.0, 7.0))
+    # only NaN, inf and a finite speedup, -inf and inf, empty, the whole range.
+    for segments in ([1, 3], [3, 5], [5, 7], [7, 7, 8], [0, 1, 9]):
+        expected = segment_speedup_table(merged, 'a', 'b', 'nnz', 'gflops', segments)
+        pd.testing.assert_frame_equal(index.statistics(segments), expected, check_dtype=False)
+
+
+# records of the selected strategies (see select_strategy_rows): x is a property of the matrix, some records are missing
+# (incomplete matrices) and some y values are missing (matrices without any y are skipped).
+def selected_records(rng, n_matrices: int):
+    mtx = np.repeat(['m{}'.format(i) for i in range(n_matrices)], len(STRATEGIES))
+    x = np.repeat(rng.integers(1, 100000, n_matrices), len(STRATEGIES)).astype(np.float64)
+    y = rng.lognormal(0, 1, len(mtx))
+    y[rng.random(len(mtx)) < 0.1] = np.nan
+    df = pd.DataFrame({'mtx': mtx, 'strategy': STRATEGIES * n_matrices, 'nnz': x, 'gflops': y})
+    return df[rng.random(len(df)) > 0.1].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_best_perf_index_matches_best_count_table(seed):
+    rng = np.random.default_rng(seed)
+    selected = selected_records(rng, 800)
+    x = selected['nnz'].to_numpy()
+    index = BestPerfIndex(best_of_matrices(selected, 'nnz', 'gflops', 'mtx', 'strategy'), 'nnz', 'strategy', len(STRATEGIES), (x.min(), x.max()))
+    for _ in range(10):
+        segments = random_segments(rng, x)
+        expected, _ = statistics_best_perf_of_selection(selected, 'nnz', 'gflops', 'mtx', 'strategy', len(STRATEGIES), segments)
+        result = index.statistics(segments)
+        pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
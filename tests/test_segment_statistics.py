@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from segment_statistics import statistics_in_each_segment, log_anslysis, SEGMENT_TABLE_COLUMNS
+from segmentation import assign_segments, is_ascending, parse_segment_conf, gen_seg_list
+
+STRATEGIES = ['csr', 'ell', 'hyb']
+
+
+# records of 300 matrices with missing records, missing y values and failed runs.
+def records(rng):
+    rows = []
+    for i in range(300):
+        nnz = int(rng.integers(1, 100000))
+        for strategy in STRATEGIES:
+            if rng.random() < 0.1:
+                continue
+            rows.append(('m{}'.format(i), strategy, nnz, rng.lognormal(0, 1), int(rng.random() < 0.1)))
+    df = pd.DataFrame(rows, columns=['mtx', 'strategy', 'nnz', 'gflops', 'failed'])
+    df.loc[rng.random(len(df)) < 0.05, 'gflops'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('drop', ['failed', None])
+def test_single_pass_matches_the_loop_over_segments(seed, drop):
+    rng = np.random.default_rng(seed)
+    df = records(rng)
+    segments = gen_seg_list(df, 'nnz', 'gflops', ' '.join(str(v) for v in rng.integers(1, 100000, 6)))
+    table, _ = statistics_in_each_segment(df, 'csr', 'hyb', 'nnz', 'gflops', 'mtx', 'strategy', segments, drop)
+
+    expected = pd.DataFrame([log_anslysis(df, 'csr', 'hyb', 'nnz', 'gflops', 'mtx', 'strategy', drop, segments[i], segments[i + 1])
+        for i in range(len(segments) - 1)], columns=SEGMENT_TABLE_COLUMNS)
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, rtol=1e-9)
+
+
+def test_overlapping_segments_are_analysed_one_by_one():
+    df = records(np.random.default_rng(3))
+    segments = [1, 50000, 1000, 100000]  # not ascending: the second range overlaps the first one.
+    table, _ = statistics_in_each_segment(df, 'csr', 'ell', 'nnz', 'gflops', 'mtx', 'strategy', segments, None)
+    expected = [log_anslysis(df, 'csr', 'ell', 'nnz', 'gflops', 'mtx', 'strategy', None, segments[i], segments[i + 1])
+        for i in range(len(segments) - 1)]
+    assert table['total_count'].tolist() == [row[8] for row in expected]
+    assert table['total_count'][1] == 0  # an empty (reversed) range
+
+
+def test_assign_segments():
+    x = np.array([0, 1, 5, 9, 10, 11, 20])
+    assert assign_segments(x, [1, 5, 5, 10]).tolist() == [-1, 0, 2, 2, -1, -1, -1]
+    assert is_ascending([1, 5, 5, 10]) and not is_ascending([1, 10, 5])
+
+
+def test_parse_segment_conf():
+    values, invalid = parse_segment_conf('1000, 2.5;1e4\nlog:10:1000:3 x log:0:10:2 inf')
+    assert values == [1000, 2.5, 10000, 10, 100, 1000]
+    assert invalid == ['x', 'log:0:10:2', 'inf']
+    assert parse_segment_conf(None) == ([], [])
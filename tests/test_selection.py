@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from selection import SelectionCache, value_bytes, cached_algorithm_pair, cached_strategy_rows
+
+
+def test_concurrent_callers_compute_a_key_once():
+    cache = SelectionCache(4)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = [None] * 8
+    def call(i):
+        results[i] = cache.get_or_compute(('pair', 'dataset'), compute)
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(results))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_nested_keys_and_eviction():
+    cache = SelectionCache(2)
+    assert cache.get_or_compute('pair', lambda: cache.get_or_compute('prepared', lambda: 1) + 1) == 2
+    cache.get_or_compute('other', lambda: 3)
+    assert cache.get_or_compute('prepared', lambda: 4) == 4  # evicted, least recently used.
+    assert cache.get_or_compute('other', lambda: 5) == 3
+
+
+def test_failed_compute_is_not_cached():
+    cache = SelectionCache(4)
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise LookupError('dataset evicted')
+
+    errors = []
+    def wait():
+        started.wait()
+        try:
+            cache.get_or_compute('key', lambda: 'computed again')
+        except LookupError as e:
+            errors.append(e)
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    with pytest.raises(LookupError):
+        cache.get_or_compute('key', fail)
+    waiter.join()
+    assert len(errors) == 1  # the waiting caller gets the exception of the computing caller.
+    assert cache.get_or_compute('key', lambda: 'computed again') == 'computed again'
+
+
+def test_eviction_by_memory():
+    cache = SelectionCache(16, max_bytes=3 * 8000)
+    for key in range(4):
+        cache.get_or_compute(key, lambda: pd.DataFrame({'y': np.zeros(1000)}))  # 8000 bytes each (and the index)
+    assert cache.get_or_compute(0, lambda: 'evicted') == 'evicted'
+    assert cache.total_bytes <= cache.max_bytes
+
+    cache.get_or_compute('large', lambda: np.zeros(10000))  # the newest selection is kept even above the bound.
+    assert isinstance(cache.get_or_compute('large', lambda: None), np.ndarray)
+
+
+def test_value_bytes_of_nested_values():
+    frame = pd.DataFrame({'mtx': ['a', 'b'], 'y': [1.0, 2.0]})
+
+    class Index:
+        def __init__(self):
+            self.x = np.zeros(10)
+            self.tables = [np.zeros(5), np.zeros(5)]
+    assert value_bytes((frame, Index())) == frame.memory_usage(index=True, deep=True).sum() + 160
+
+
+def test_selections_of_different_columns_are_cached_apart():
+    df = pd.DataFrame({'mtx': ['a', 'a', 'b', 'b'], 'strategy': ['x', 'y', 'x', 'y'], 'gflops': [1.0, 2.0, 3.0, 4.0], 'nnz': [10, 10, 20, 20]})
+    dataset_id = os.urandom(16).hex()
+    few = cached_strategy_rows(dataset_id, df[['mtx', 'strategy', 'gflops']], 'mtx', 'strategy', 'gflops', ['x', 'y'], None)
+    more = cached_strategy_rows(dataset_id, df, 'mtx', 'strategy', 'gflops', ['x', 'y'], None)
+    assert 'nnz' not in few.columns and 'nnz' in more.columns
+    pair = cached_algorithm_pair(dataset_id, df, 'x', 'y', 'mtx', 'strategy', 'nnz', 'gflops', None)
+    assert pair['gflops_y'].tolist() == [2.0, 4.0]
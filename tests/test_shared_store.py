@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared_store
+from shared_store import SharedDatasetStore
+
+pytestmark = pytest.mark.skipif(shared_store.fcntl is None or not os.path.isdir(shared_store.SHM_DIR), reason='no POSIX shared memory')
+
+
+def test_put_and_map_read_only(tmp_path):
+    store = SharedDatasetStore(str(tmp_path), 1 << 26)
+    dataset_id = os.urandom(16).hex()
+    df = pd.DataFrame({'mtx': ['a', 'b', 'a'], 'nnz': [10, 20, 30], 'gflops': [1.5, np.nan, 2.0],
+        'strategy': pd.Categorical(['x', 'y', 'x'])})
+    try:
+        shared = store.put(dataset_id, df)
+        mapped = store.get(dataset_id)
+        for result in (shared, mapped):
+            pd.testing.assert_frame_equal(result, df)
+        values = mapped['nnz'].to_numpy()
+        assert not values.flags.writeable
+        with pytest.raises(ValueError):
+            values[0] = 1
+    finally:
+        store.release(dataset_id)
+        with store._locked():
+            store._unlink(dataset_id, store._read_manifest(dataset_id))
+    assert store.get(dataset_id) is None
+
+
+def test_categories_are_not_pickled(tmp_path):
+    store = SharedDatasetStore(str(tmp_path), 1 << 26)
+    dataset_id = os.urandom(16).hex()
+    df = pd.DataFrame({'mixed': ['a', 1, 2.5, np.nan], 'threads': pd.Categorical([4, 8, 4, 16]),
+        'ratio': pd.Categorical([0.5, 0.25, 0.5, 1.0], ordered=True)})
+    try:
+        pd.testing.assert_frame_equal(store.put(dataset_id, df), df)
+        for column in store._read_manifest(dataset_id)['columns']:
+            if 'categories_block' in column:
+                data = shared_store._map_block(column['categories_block'], np.uint8, column['categories_bytes']).tobytes()
+                assert data.startswith(b'{')
+    finally:
+        store.release(dataset_id)
+        with store._locked():
+            store._unlink(dataset_id, store._read_manifest(dataset_id))
+
+
+def test_directory_of_other_users_is_refused(tmp_path):
+    store_dir = tmp_path / 'store'
+    SharedDatasetStore(str(store_dir), 1 << 26)
+    assert store_dir.stat().st_mode & 0o777 == 0o700
+
+    store_dir.chmod(0o777)
+    with pytest.raises(PermissionError):
+        SharedDatasetStore(str(store_dir), 1 << 26)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from speedup_versus import PlotConfig, split_speedup, gen_plot_speedup
+
+CONFIG = PlotConfig('#00f', '#000', 18, 'nnz', 'speedup', True, 'legend', 1200, 600)
+
+
+# the former row-by-row loop of gen_plot_speedup (for finite y values, not dividing by zero).
+def split_speedup_loop(a_flops, b_flops):
+    speedup_a, speedup_b = [], []
+    for a, b in zip(a_flops, b_flops):
+        speedup = a / b
+        if speedup == 0.0:  # no adaptive data
+            speedup_a.append(1.0)
+            speedup_b.append(1.0)
+        elif speedup > 1.0:
+            speedup_a.append(speedup)
+            speedup_b.append(1.0)
+        else:
+            speedup_b.append(speedup)
+            speedup_a.append(1.0)
+    return speedup_a, speedup_b
+
+
+def test_split_speedup_matches_the_loop():
+    rng = np.random.default_rng(0)
+    a, b = rng.lognormal(0, 1, 1000), rng.lognormal(0, 1, 1000)
+    a[:50] = 0.0
+    b[50:60] = a[50:60]  # speedup 1.0
+    speedup_a, speedup_b = split_speedup(a, b)
+    expected_a, expected_b = split_speedup_loop(a, b)
+    np.testing.assert_array_equal(speedup_a, expected_a)
+    np.testing.assert_array_equal(speedup_b, expected_b)
+
+
+def test_undefined_speedups_are_drawn_at_the_base_line():
+    speedup_a, speedup_b = split_speedup(np.array([1.0, np.nan, 1.0, 2.0]), np.array([0.0, 1.0, np.nan, 1.0]))
+    np.testing.assert_array_equal(speedup_a, [1.0, 1.0, 1.0, 2.0])
+    np.testing.assert_array_equal(speedup_b, [1.0, 1.0, 1.0, 1.0])
+
+
+def test_speedup_area_trace():
+    df = pd.DataFrame({'mtx': ['m1', 'm2', 'm3'] * 2, 'strategy': ['a'] * 3 + ['b'] * 3,
+        'nnz': [30, 10, 20] * 2, 'gflops': [3.0, 1.0, 1.0, 1.0, 2.0, 1.0]})
+    fig = gen_plot_speedup(df, 'a', 'b', 'mtx', 'nnz', 'gflops', 'strategy', None, CONFIG)
+    trace = fig.data[0]
+    np.testing.assert_array_equal(trace.x, [10, 20, 30, 30, 20, 10])  # sorted by x, then reversed
+    np.testing.assert_array_equal(trace.y, [1.0, 1.0, 3.0, 1.0, 1.0, 0.5])
+    assert trace.fillcolor == CONFIG.color and fig.layout.width == CONFIG.width and fig.layout.font.size == CONFIG.font_size
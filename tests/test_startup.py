@@ -0,0 +1,22 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# the app is built in a new interpreter, as a worker process does.
+_SCRIPT = '''
+import json, sys
+import main
+rules = sorted(rule.rule for rule in main.app.server.url_map.iter_rules())
+heavy = [name for name in ('pandas', 'numpy', 'pyarrow', 'plotly.express', 'kaleido', 'duckdb') if name in sys.modules]
+print(json.dumps(dict(rules=rules, heavy=heavy)))
+'''
+
+
+def test_app_is_built_without_the_analysis_packages():
+    result = subprocess.run([sys.executable, '-c', _SCRIPT], capture_output=True, text=True, cwd=SRC_DIR, check=True)
+    report = json.loads(result.stdout.splitlines()[-1])
+    assert report['heavy'] == []
+    assert {'/metrics', '/upload/init', '/upload/<upload_id>'} <= set(report['rules'])